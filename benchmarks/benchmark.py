@@ -15,11 +15,24 @@ Fail if performance degrades >5%:
 """
 
 import copy
+import dataclasses
 import random
 
 import pytest
 
-from patchdiff import apply, diff, produce
+from patchdiff import (
+    DiffCache,
+    DiffSession,
+    apply,
+    diff,
+    diff_many,
+    diff_stats,
+    first_difference,
+    iapply,
+    produce,
+    to_json,
+)
+from patchdiff.fingerprint import Fingerprints
 from patchdiff.pointer import Pointer
 
 # Optional observ integration for benchmarks
@@ -30,6 +43,14 @@ try:
 except ImportError:
     OBSERV_AVAILABLE = False
 
+# Optional NumPy integration for benchmarks
+try:
+    import numpy as np
+
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
 # Set seed for reproducibility
 random.seed(42)
 
@@ -182,6 +203,140 @@ def test_list_diff_similar_nested_localized_changes(benchmark, size):
     benchmark(diff, a, b)
 
 
+def _make_scattered_record_edits(n: int, n_edits: int) -> tuple[list, list]:
+    """Lists of nested records, the second a deep copy (as if
+    deserialized) with `n_edits` records inserted or deleted at random
+    positions, so nothing is shared by identity and little is trimmed."""
+    rng = random.Random(42)
+    a = [_nested_dict_item(i) for i in range(n)]
+    b = copy.deepcopy(a)
+    for k in range(n_edits):
+        if k % 2:
+            del b[rng.randrange(len(b))]
+        else:
+            b.insert(rng.randrange(len(b) + 1), _nested_dict_item(-1 - k))
+    return a, b
+
+
+@pytest.mark.benchmark(group="list-diff-scattered-records")
+@pytest.mark.parametrize("n_edits", [20, 200])
+def test_list_diff_scattered_record_edits(benchmark, n_edits):
+    """Benchmark: edits scattered over 1000 distinct nested records."""
+    a, b = _make_scattered_record_edits(1000, n_edits)
+    benchmark(diff, a, b)
+
+
+@pytest.mark.benchmark(group="list-diff-scattered-records")
+@pytest.mark.parametrize("n_edits", [20, 200])
+def test_list_diff_scattered_record_edits_fingerprints(benchmark, n_edits):
+    """Benchmark: as above, with fingerprints kept across calls (the
+    elements are interned by digest before the edit search)."""
+    a, b = _make_scattered_record_edits(1000, n_edits)
+    fps = Fingerprints()
+    diff(a, b, fingerprints=fps)
+    benchmark(diff, a, b, fingerprints=fps)
+
+
+@pytest.mark.benchmark(group="list-diff-scattered-records")
+@pytest.mark.parametrize("n_edits", [20, 200])
+def test_list_diff_scattered_record_edits_fingerprints_cold(benchmark, n_edits):
+    """Benchmark: as above, with fingerprints for each call only, so
+    that every call hashes both lists."""
+    a, b = _make_scattered_record_edits(1000, n_edits)
+    benchmark(diff, a, b, fingerprints=True)
+
+
+@pytest.mark.benchmark(group="list-diff-pairing")
+def test_list_diff_pairing_position(benchmark):
+    """Benchmark: 200 records inserted or deleted among 1000, with the
+    changed records of each hunk paired by position."""
+    a, b = _make_scattered_record_edits(1000, 200)
+    benchmark(diff, a, b)
+
+
+@pytest.mark.benchmark(group="list-diff-pairing")
+def test_list_diff_pairing_similarity(benchmark):
+    """Benchmark: as above, with pairing="similarity"."""
+    a, b = _make_scattered_record_edits(1000, 200)
+    benchmark(diff, a, b, pairing="similarity")
+
+
+def _make_edited_records(n: int, n_edits: int) -> tuple[list, list]:
+    """Lists of nested records, with the nested values of `n_edits`
+    records changed in place, so the diff recurses into every edited
+    pair (in both directions, unless forward only)."""
+    rng = random.Random(42)
+    a = [_nested_dict_item(i) for i in range(n)]
+    b = copy.deepcopy(a)
+    for record in rng.sample(b, n_edits):
+        record["tags"][1] = "changed"
+        record["meta"]["nested"]["x"].insert(1, -1)
+    return a, b
+
+
+@pytest.mark.benchmark(group="diff-forward-only")
+def test_list_diff_edited_records(benchmark):
+    """Benchmark: 300 of 1000 nested records edited in place."""
+    a, b = _make_edited_records(1000, 300)
+    benchmark(diff, a, b)
+
+
+@pytest.mark.benchmark(group="diff-forward-only")
+def test_list_diff_edited_records_forward_only(benchmark):
+    """Benchmark: as above, without building the reverse operations."""
+    a, b = _make_edited_records(1000, 300)
+    benchmark(diff, a, b, reverse=False)
+
+
+def _make_low_similarity_records(n: int) -> tuple[list, list]:
+    """Lists of nested records that share a fifth of their records."""
+    rng = random.Random(42)
+    a = [_nested_dict_item(i) for i in range(n)]
+    b = list(a)
+    for _ in range(n * 4 // 5):
+        del b[rng.randrange(len(b))]
+    for k in range(n * 4 // 5):
+        b.insert(rng.randrange(len(b) + 1), _nested_dict_item(-1 - k))
+    return a, b
+
+
+@pytest.mark.benchmark(group="list-diff-low-similarity")
+def test_list_diff_low_similarity_myers(benchmark):
+    """Benchmark: 1000 records, a fifth of them shared, with Myers."""
+    a, b = _make_low_similarity_records(1000)
+    benchmark(diff, a, b)
+
+
+@pytest.mark.benchmark(group="list-diff-low-similarity")
+def test_list_diff_low_similarity_patience(benchmark):
+    """Benchmark: as above, with algorithm="patience"."""
+    a, b = _make_low_similarity_records(1000)
+    benchmark(diff, a, b, algorithm="patience")
+
+
+def _make_reordered_records(n: int, n_moves: int) -> tuple[list, list]:
+    """Lists of nested records where `n_moves` records changed place."""
+    a = [_nested_dict_item(i) for i in range(n)]
+    b = list(a)
+    for k in range(n_moves):
+        b.insert(k * n // n_moves, b.pop(n - 1 - k * n // n_moves))
+    return a, b
+
+
+@pytest.mark.benchmark(group="list-diff-moves")
+def test_list_diff_reordered_records(benchmark):
+    """Benchmark: 10 of 1000 nested records moved, as removes and adds."""
+    a, b = _make_reordered_records(1000, 10)
+    benchmark(diff, a, b)
+
+
+@pytest.mark.benchmark(group="list-diff-moves")
+def test_list_diff_reordered_records_moves(benchmark):
+    """Benchmark: as above, with moves=True."""
+    a, b = _make_reordered_records(1000, 10)
+    benchmark(diff, a, b, moves=True)
+
+
 # ========================================
 # Dict Diff Benchmarks
 # ========================================
@@ -216,11 +371,460 @@ def test_dict_diff_large_common(benchmark, n):
     benchmark(diff, a, b)
 
 
+@pytest.mark.benchmark(group="dict-diff-single-pass")
+@pytest.mark.parametrize("changed", [False, True])
+def test_dict_diff_records_copy(benchmark, changed):
+    """Benchmark: a deep copy of 5000 records, equal or with one leaf
+    changed (each level walks its children once)."""
+    a = {f"k{i}": _nested_dict_item(i) for i in range(5000)}
+    b = copy.deepcopy(a)
+    if changed:
+        b["k2500"]["meta"]["nested"]["x"][0] = -1
+    benchmark(diff, a, b)
+
+
+@pytest.mark.benchmark(group="dict-diff-single-pass")
+@pytest.mark.parametrize("changed", [False, True])
+def test_dict_diff_flat_copy(benchmark, changed):
+    """Benchmark: a copy of a flat dict of 50000 scalars, equal or with
+    one value changed."""
+    a = {str(i): i for i in range(50_000)}
+    b = dict(a)
+    if changed:
+        b["25000"] = -1
+    benchmark(diff, a, b)
+
+
+def _make_deep_leaf_change_docs(depth: int, breadth: int) -> tuple[dict, dict]:
+    """Pair of nested dicts (distinct objects) that differ in one leaf at
+    the bottom of the first branch."""
+    random.seed(7)
+    a = generate_nested_dict(depth, breadth)
+    b = copy.deepcopy(a)
+    node = b
+    while isinstance(node.get("key_0"), dict):
+        node = node["key_0"]
+    node["key_0"] = -1
+    return a, b
+
+
+def _small_document_pairs(count):
+    pairs = []
+    for i in range(count):
+        a = {"id": i, "tags": ["a", "b", "c"], "meta": {"seen": False}}
+        b = {"id": i, "tags": ["a", "b", "d"], "meta": {"seen": i % 2 == 0}}
+        pairs.append((a, b))
+    return pairs
+
+
+@pytest.mark.benchmark(group="dict-diff-small")
+def test_dict_diff_small_documents(benchmark):
+    """Benchmark: 1000 diffs of small documents, where the per-call
+    overhead (options, context) counts as much as the diff."""
+    pairs = _small_document_pairs(1000)
+
+    def run():
+        for a, b in pairs:
+            diff(a, b)
+
+    benchmark(run)
+
+
+@pytest.mark.benchmark(group="dict-diff-small")
+def test_dict_diff_small_scalars(benchmark):
+    """Benchmark: 1000 diffs of two scalars (pure per-call overhead)."""
+
+    def run():
+        for i in range(1000):
+            diff(i, i + 1)
+
+    benchmark(run)
+
+
+@pytest.mark.benchmark(group="dict-diff-deep")
+def test_dict_diff_deep_leaf_change(benchmark):
+    """Benchmark: one leaf changed at the bottom of a depth=6 document."""
+    a, b = _make_deep_leaf_change_docs(6, 5)
+    benchmark(diff, a, b)
+
+
+@pytest.mark.benchmark(group="dict-diff-deep")
+def test_dict_diff_deep_leaf_change_fingerprints(benchmark):
+    """Benchmark: as above, with a fingerprint cache kept across calls
+    (the documents aren't mutated between rounds)."""
+    a, b = _make_deep_leaf_change_docs(6, 5)
+    fingerprints = Fingerprints()
+    benchmark(diff, a, b, fingerprints=fingerprints)
+
+
+@pytest.mark.benchmark(group="dict-diff-deep")
+def test_dict_diff_deep_leaf_change_fingerprints_cold(benchmark):
+    """Benchmark: as above, with fingerprints for each call only: every
+    call hashes both documents, where `==` stops at the first
+    difference."""
+    a, b = _make_deep_leaf_change_docs(6, 5)
+    benchmark(diff, a, b, fingerprints=True)
+
+
+@pytest.mark.benchmark(group="dict-diff-deep")
+def test_dict_diff_narrow_chain_fingerprints_cold(benchmark):
+    """Benchmark: the 2000-level chain below with fingerprints for each
+    call only, which pay off where comparing every level is quadratic."""
+    a, b = _make_chain_docs(2000)
+    benchmark(diff, a, b, fingerprints=True)
+
+
+def _make_chain_docs(depth: int) -> tuple[dict, dict]:
+    """Pair of chains of `depth` nested dicts (distinct objects) that
+    differ at the bottom, like a syntax tree or a linked list."""
+    a = b = None
+    for level in range(depth):
+        a = {"next": a, "value": level}
+        b = {"next": b, "value": level if level else -1}
+    return a, b
+
+
+@pytest.mark.benchmark(group="dict-diff-deep")
+def test_dict_diff_narrow_chain(benchmark):
+    """Benchmark: one leaf changed at the bottom of a 2000-level chain,
+    deeper than the diff recurses."""
+    a, b = _make_chain_docs(2000)
+    benchmark(diff, a, b)
+
+
+@pytest.mark.benchmark(group="dict-diff-deep")
+def test_list_diff_nested_lists(benchmark):
+    """Benchmark: lists nested 20 levels deep, changed at every level,
+    so every level pairs and pads a replace."""
+    a = b = 0
+    for level in range(20):
+        a = [level, a, "x"]
+        b = [level, b, "y"]
+    benchmark(diff, a, b)
+
+
+def _make_rewritten_records(n: int) -> tuple[dict, dict]:
+    """Dicts of nested records, of which every tenth was rewritten
+    almost entirely."""
+    a = {f"r{i}": _nested_dict_item(i) for i in range(n)}
+    b = copy.deepcopy(a)
+    for i in range(0, n, 10):
+        b[f"r{i}"] = _nested_dict_item(-1 - i)
+        b[f"r{i}"]["id"] = i
+    return a, b
+
+
+@pytest.mark.benchmark(group="dict-diff-cost-model")
+def test_dict_diff_rewritten_records(benchmark):
+    """Benchmark: 100 of 1000 records rewritten, diffed down to the
+    leaves."""
+    a, b = _make_rewritten_records(1000)
+    benchmark(diff, a, b)
+
+
+@pytest.mark.benchmark(group="dict-diff-cost-model")
+def test_dict_diff_rewritten_records_max_depth(benchmark):
+    """Benchmark: as above, replacing the records wholesale."""
+    a, b = _make_rewritten_records(1000)
+    benchmark(diff, a, b, max_depth=1)
+
+
+@pytest.mark.benchmark(group="dict-diff-cost-model")
+def test_dict_diff_rewritten_records_replace_ratio(benchmark):
+    """Benchmark: as above, replacing the records where that is
+    smaller."""
+    a, b = _make_rewritten_records(1000)
+    benchmark(diff, a, b, replace_ratio=0.5)
+
+
+@pytest.mark.benchmark(group="first-difference")
+def test_dict_diff_scattered_changes(benchmark):
+    """Benchmark: diff 1000 records, of which every tenth was
+    rewritten, to find out whether anything changed."""
+    a, b = _make_rewritten_records(1000)
+    benchmark(diff, a, b, reverse=False)
+
+
+@pytest.mark.benchmark(group="first-difference")
+def test_first_difference_scattered_changes(benchmark):
+    """Benchmark: as above, stopping at the first change."""
+    a, b = _make_rewritten_records(1000)
+    benchmark(first_difference, a, b)
+
+
+@pytest.mark.benchmark(group="first-difference")
+def test_first_difference_scattered_record_edits(benchmark):
+    """Benchmark: the first change in a list of records, past its
+    unchanged prefix."""
+    a, b = _make_scattered_record_edits(2000, 20)
+    benchmark(first_difference, a, b)
+
+
+def _make_copy_on_write_states(n: int) -> tuple[dict, dict]:
+    """Pair of states where the second copies only the path to one
+    changed record and shares everything else with the first."""
+    state = {"items": [_nested_dict_item(i) for i in range(n)], "meta": {"v": 1}}
+    items = list(state["items"])
+    items[n // 2] = {**items[n // 2], "name": "changed"}
+    return state, {**state, "items": items}
+
+
+@pytest.mark.benchmark(group="dict-diff-copy-on-write")
+def test_diff_copy_on_write_update(benchmark):
+    """Benchmark: one record changed in a 5000-record copy-on-write state."""
+    a, b = _make_copy_on_write_states(5000)
+    benchmark(diff, a, b)
+
+
+@pytest.mark.benchmark(group="dict-diff-copy-on-write")
+def test_diff_copy_on_write_update_trust_identity(benchmark):
+    """Benchmark: as above, with trust_identity=True."""
+    a, b = _make_copy_on_write_states(5000)
+    benchmark(diff, a, b, trust_identity=True)
+
+
+@pytest.mark.benchmark(group="diff-session-in-place")
+def test_diff_in_place_state_against_copy(benchmark):
+    """Benchmark: one record changed in place in a 5000-record state,
+    diffed against a deep copy taken after the previous change."""
+    state = {"items": [_nested_dict_item(i) for i in range(5000)]}
+    previous = copy.deepcopy(state)
+    ticks = iter(range(10**9))
+
+    def run():
+        nonlocal previous
+        state["items"][2500]["name"] = f"changed{next(ticks)}"
+        result = diff(previous, state)
+        previous = copy.deepcopy(state)
+        return result
+
+    benchmark(run)
+
+
+@pytest.mark.benchmark(group="diff-session-in-place")
+def test_diff_session_in_place_state(benchmark):
+    """Benchmark: as above, with a DiffSession(copy=True)."""
+    state = {"items": [_nested_dict_item(i) for i in range(5000)]}
+    session = DiffSession(state, copy=True)
+    ticks = iter(range(10**9))
+
+    def run():
+        state["items"][2500]["name"] = f"changed{next(ticks)}"
+        return session.diff(state)
+
+    benchmark(run)
+
+
+def _subscriber_snapshots() -> tuple[dict, dict]:
+    """Two versions of a 5000-record state, as separate deep copies
+    (as if each was deserialized), with one record changed."""
+    a = {"items": [_nested_dict_item(i) for i in range(5000)]}
+    b = copy.deepcopy(a)
+    b["items"][2500]["name"] = "changed"
+    return a, b
+
+
+@pytest.mark.benchmark(group="diff-cache")
+def test_diff_repeated_pair(benchmark):
+    """Benchmark: the same pair of snapshots diffed again."""
+    a, b = _subscriber_snapshots()
+    benchmark(diff, a, b)
+
+
+@pytest.mark.benchmark(group="diff-cache")
+def test_diff_cache_repeated_pair(benchmark):
+    """Benchmark: as above, from a DiffCache."""
+    a, b = _subscriber_snapshots()
+    cache = DiffCache()
+    cache.diff(a, b)
+    benchmark(cache.diff, a, b)
+
+
+@dataclasses.dataclass
+class _Record:
+    id: int
+    name: str
+    tags: list
+    meta: dict
+
+
+def _make_dataclass_records(n: int) -> tuple[list, list]:
+    """Pair of lists of dataclass records, with a tenth of them edited."""
+    a = [_Record(**_nested_dict_item(i)) for i in range(n)]
+    b = [_Record(**_nested_dict_item(i)) for i in range(n)]
+    for record in b[::10]:
+        record.tags = [*record.tags, "new"]
+    return a, b
+
+
+@pytest.mark.benchmark(group="registered-types")
+def test_diff_dataclass_records(benchmark):
+    """Benchmark: 1000 dataclass records, a tenth of them edited."""
+    a, b = _make_dataclass_records(1000)
+    benchmark(diff, a, b)
+
+
+@pytest.mark.benchmark(group="registered-types")
+def test_diff_dataclass_records_as_dicts(benchmark):
+    """Benchmark: as above, converting the records to dicts first."""
+    a, b = _make_dataclass_records(1000)
+    benchmark(
+        lambda: diff(
+            [dataclasses.asdict(record) for record in a],
+            [dataclasses.asdict(record) for record in b],
+        )
+    )
+
+
+def _make_edited_points(n: int) -> tuple[dict, dict]:
+    """Pair of states holding a tuple of `n` points, with one
+    coordinate changed."""
+    points = tuple((i, i * 2) for i in range(n))
+    edited = (*points[: n // 2], (n // 2, -1), *points[n // 2 + 1 :])
+    return {"points": points}, {"points": edited}
+
+
+@pytest.mark.benchmark(group="tuple-diff")
+def test_diff_tuple_of_points(benchmark):
+    """Benchmark: one coordinate changed in a tuple of 10k points,
+    replaced wholesale."""
+    a, b = _make_edited_points(10_000)
+    benchmark(lambda: to_json(diff(a, b)[0]))
+
+
+@pytest.mark.benchmark(group="tuple-diff")
+def test_diff_tuple_of_points_immutables(benchmark):
+    """Benchmark: as above, diffed into with immutables=True."""
+    a, b = _make_edited_points(10_000)
+    benchmark(lambda: to_json(diff(a, b, immutables=True)[0]))
+
+
+def _make_client_states(n: int, clients: int) -> tuple[list, list[list]]:
+    """A list of `n` records and `clients` copies of it, each with a
+    record moved and another edited."""
+    rng = random.Random(13)
+    base = [_nested_dict_item(i) for i in range(n)]
+    targets = []
+    for _ in range(clients):
+        target = copy.deepcopy(base)
+        target.append(target.pop(rng.randrange(n)))
+        target[rng.randrange(n)]["name"] = "edited"
+        targets.append(target)
+    return base, targets
+
+
+@pytest.mark.benchmark(group="diff-many")
+def test_diff_each_client_state(benchmark):
+    """Benchmark: a 1000-record list diffed against 20 client states,
+    one diff call per state, with the patience algorithm."""
+    base, targets = _make_client_states(1000, 20)
+    benchmark(lambda: [diff(base, target, algorithm="patience") for target in targets])
+
+
+@pytest.mark.benchmark(group="diff-many")
+def test_diff_many_client_states(benchmark):
+    """Benchmark: as above, with diff_many."""
+    base, targets = _make_client_states(1000, 20)
+    benchmark(diff_many, base, targets, algorithm="patience")
+
+
+def _make_sharded_states(shards: int, records: int) -> tuple[dict, dict]:
+    """Pair of large states keyed by shard, with a fifth of the records
+    in every shard edited."""
+    rng = random.Random(11)
+    a = {
+        f"shard_{i}": [
+            {"id": j, "tags": [rng.randint(0, 9) for _ in range(20)], "v": j}
+            for j in range(records)
+        ]
+        for i in range(shards)
+    }
+    b = copy.deepcopy(a)
+    for shard in b.values():
+        for record in rng.sample(shard, records // 5):
+            record["tags"] = [rng.randint(0, 9) for _ in range(20)]
+            record["v"] = -1
+    return a, b
+
+
+@pytest.mark.benchmark(group="dict-diff-parallel")
+def test_dict_diff_sharded(benchmark):
+    """Benchmark: 200 shards of 50 records, serially."""
+    a, b = _make_sharded_states(200, 50)
+    benchmark(diff, a, b)
+
+
+@pytest.mark.benchmark(group="dict-diff-parallel")
+def test_dict_diff_sharded_workers(benchmark):
+    """Benchmark: as above, with workers=4 (pool startup included)."""
+    a, b = _make_sharded_states(200, 50)
+    benchmark(diff, a, b, workers=4)
+
+
+# ========================================
+# NumPy Array Benchmarks
+# ========================================
+
+
+def _make_array_states(size: int) -> tuple[dict, dict]:
+    """Pair of states holding a large float array, with a few elements
+    of the second one changed."""
+    rng = np.random.default_rng(42)
+    a = {"weights": rng.random(size), "step": 1}
+    b = {"weights": a["weights"].copy(), "step": 2}
+    b["weights"][rng.integers(0, size, 5)] = 0.0
+    return a, b
+
+
+@pytest.mark.skipif(not NUMPY_AVAILABLE, reason="numpy not installed")
+@pytest.mark.benchmark(group="numpy-array")
+def test_diff_array_few_changes(benchmark):
+    """Benchmark: 5 elements changed in a 1M-element float array."""
+    a, b = _make_array_states(1_000_000)
+    benchmark(diff, a, b)
+
+
+@pytest.mark.skipif(not NUMPY_AVAILABLE, reason="numpy not installed")
+@pytest.mark.benchmark(group="numpy-array")
+def test_iapply_array_few_changes(benchmark):
+    """Benchmark: write 5 changed elements back into a 1M-element array."""
+    a, b = _make_array_states(1_000_000)
+    ops, _ = diff(a, b)
+    benchmark(iapply, a, ops)
+
+
 # ========================================
 # Set Diff Benchmarks
 # ========================================
 
 
+def _make_edited_text(size: int) -> tuple[dict, dict]:
+    """A document with a long text field, and one with a word of it
+    changed."""
+    rng = random.Random(42)
+    lines = []
+    while sum(map(len, lines)) < size:
+        lines.append(" ".join(f"w{rng.randint(0, 999)}" for _ in range(12)) + "\n")
+    text = "".join(lines)
+    middle = len(text) // 2
+    return {"text": text}, {"text": text[:middle] + "edit" + text[middle + 4 :]}
+
+
+@pytest.mark.benchmark(group="string-splice")
+def test_diff_long_text_edit(benchmark):
+    """Benchmark: a word changed in a 200 KB text, spliced."""
+    a, b = _make_edited_text(200_000)
+    benchmark(diff, a, b, splice_strings=1000)
+
+
+@pytest.mark.benchmark(group="string-splice")
+def test_iapply_long_text_splice(benchmark):
+    """Benchmark: applying that splice."""
+    a, b = _make_edited_text(200_000)
+    ops, _ = diff(a, b, splice_strings=1000)
+    benchmark(iapply, a, ops)
+
+
 @pytest.mark.benchmark(group="set-diff")
 def test_set_diff_1000_elements(benchmark):
     """Benchmark: Sets with 1000 elements, 10% difference."""
@@ -871,3 +1475,99 @@ def test_produce_copy_mode_dict(benchmark):
         return produce(state, recipe, in_place=False)
 
     benchmark(run)
+
+
+def _telemetry_snapshots() -> tuple[dict, dict]:
+    """Two versions of a state with a large telemetry subtree that
+    changed throughout, and one changed setting."""
+    a = {
+        "settings": {f"s{i}": i for i in range(100)},
+        "telemetry": {f"m{i}": {"t": i, "v": i % 7} for i in range(5000)},
+    }
+    b = copy.deepcopy(a)
+    b["settings"]["s50"] = -1
+    for sample in b["telemetry"].values():
+        sample["v"] += 1
+    return a, b
+
+
+@pytest.mark.benchmark(group="dict-diff-path-filter")
+def test_dict_diff_telemetry(benchmark):
+    """Benchmark: diff a state with a changed telemetry subtree."""
+    a, b = _telemetry_snapshots()
+    benchmark(diff, a, b)
+
+
+@pytest.mark.benchmark(group="dict-diff-path-filter")
+def test_dict_diff_telemetry_excluded(benchmark):
+    """Benchmark: as above, with the telemetry subtree excluded."""
+    a, b = _telemetry_snapshots()
+    benchmark(diff, a, b, exclude=["/telemetry"])
+
+
+def _measure_patches(a, b):
+    ops, rops = diff(a, b)
+    return len(to_json(ops)), len(to_json(rops))
+
+
+@pytest.mark.benchmark(group="diff-stats")
+def test_dict_diff_telemetry_to_json(benchmark):
+    """Benchmark: diff a state with a changed telemetry subtree and
+    serialize the patches to measure them."""
+    a, b = _telemetry_snapshots()
+    benchmark(_measure_patches, a, b)
+
+
+@pytest.mark.benchmark(group="diff-stats")
+def test_diff_stats_telemetry(benchmark):
+    """Benchmark: as above, measuring them without building them."""
+    a, b = _telemetry_snapshots()
+    benchmark(diff_stats, a, b)
+
+
+@pytest.mark.benchmark(group="diff-stats")
+def test_list_diff_rewritten_records_to_json(benchmark):
+    """Benchmark: diff 1000 records, of which every tenth was
+    rewritten, and serialize the patches to measure them."""
+    a, b = _make_rewritten_records(1000)
+    benchmark(_measure_patches, a, b)
+
+
+@pytest.mark.benchmark(group="diff-stats")
+def test_diff_stats_rewritten_records(benchmark):
+    """Benchmark: as above, measuring them without building them."""
+    a, b = _make_rewritten_records(1000)
+    benchmark(diff_stats, a, b)
+
+
+def _cached_records(caches_changed: bool) -> tuple[dict, dict]:
+    """Two versions of 20000 records with a cache each, of which one
+    record changed (and maybe every cache)."""
+    a = {"items": [{"id": i, "name": f"n{i}", "cache": {"k": i}} for i in range(20000)]}
+    b = copy.deepcopy(a)
+    if caches_changed:
+        for item in b["items"]:
+            item["cache"]["k"] += 1
+    b["items"][10000]["name"] = "changed"
+    return a, b
+
+
+@pytest.mark.benchmark(group="list-diff-path-filter")
+def test_list_diff_records(benchmark):
+    """Benchmark: diff records of which one changed."""
+    a, b = _cached_records(caches_changed=False)
+    benchmark(diff, a, b)
+
+
+@pytest.mark.benchmark(group="list-diff-path-filter")
+def test_list_diff_records_cache_excluded(benchmark):
+    """Benchmark: as above, leaving the caches out."""
+    a, b = _cached_records(caches_changed=False)
+    benchmark(diff, a, b, exclude=["/items/*/cache"])
+
+
+@pytest.mark.benchmark(group="list-diff-path-filter")
+def test_list_diff_records_changed_cache_excluded(benchmark):
+    """Benchmark: as above, with every cache changed."""
+    a, b = _cached_records(caches_changed=True)
+    benchmark(diff, a, b, exclude=["/items/*/cache"])
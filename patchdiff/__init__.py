@@ -3,6 +3,12 @@ from importlib.metadata import version
 __version__ = version("patchdiff")
 
 from .apply import apply, iapply
+from .cache import DiffCache
+from .compare import first_difference, has_changes
 from .diff import diff
+from .many import diff_many
 from .produce import produce
 from .serialize import to_json
+from .session import DiffSession
+from .stats import diff_stats
+from .stream import iter_diff
@@ -1,9 +1,11 @@
 from __future__ import annotations
 
-from copy import deepcopy
+from collections.abc import Sequence
 from typing import Any, cast
 
+from .arrays import is_array, write_range
 from .pointer import Pointer
+from .registry import _adapters, snapshot
 from .types import Diffable, Operation
 
 # Immutable types that can never contain (or be) shared mutable state, so
@@ -11,76 +13,169 @@ from .types import Diffable, Operation
 _SCALAR_TYPES = frozenset({int, float, complex, bool, str, bytes, type(None)})
 
 
-def iapply(obj: Diffable, patches: list[Operation]) -> Diffable:
+def _pop(obj: Diffable, ptr: Pointer) -> tuple[Any, Any]:
+    """Remove the value addressed by `ptr` from `obj`, returning `obj`
+    (or the new root, when that was rebuilt) and the value."""
+    target = ptr.evaluate(obj)
+    parent: Any = target[0]
+    value: Any = target[2]
+    if value is None and hasattr(parent, "append"):
+        # A list element addressed by a string token (of a parsed
+        # pointer): look it up by integer index.
+        value = parent[int(cast("str", target[1]))]
+    return _write_path(obj, ptr, "remove", None, None), value
+
+
+def _kind(parent: Any) -> str:
+    """The kind of container `parent` looks like, by its methods."""
+    if hasattr(parent, "keys"):
+        return "dict"
+    if hasattr(parent, "append"):
+        return "list"
+    if is_array(parent):
+        return "array"
+    return "set"
+
+
+def _write(parent: Any, kind: str, op: str, key: Any, value: Any) -> None:
+    """Add, replace or remove (by `op`) the child at `key` of `parent`,
+    a container of `kind`."""
+    if kind == "dict":
+        if op == "remove":
+            del parent[key]
+        else:  # add/replace
+            parent[key] = value
+    elif kind == "list":
+        if key.__class__ is not int:
+            try:
+                key = int(key)
+            except ValueError:
+                pass
+
+        if op == "replace":
+            parent[key] = value
+        elif op == "add":
+            if key == "-":
+                parent.append(value)
+            else:
+                parent.insert(key, value)
+        else:  # remove
+            del parent[key]
+    elif kind == "array":
+        if op != "replace":
+            raise ValueError(f"Can't {op} elements of a NumPy array")
+        write_range(parent, key, value)
+    else:  # set
+        if op == "add":
+            parent.add(value)
+        else:  # remove
+            parent.remove(key)
+
+
+# Builtin copies of the views of registered types, by kind.
+_VIEW_COPIES: dict[str, Any] = {"dict": dict, "list": list, "set": set}
+
+
+def _write_path(obj: Any, ptr: Pointer, op: str, value: Any, patch: Any) -> Any:
+    """Apply one operation (`patch` holds its other fields), returning
+    `obj`, or the new root when that was rebuilt."""
+    target = ptr.evaluate(obj)
+    parent: Any = target[0]
+    key: Any = target[1]
+    if op == "splice":
+        # Strings are immutable: the spliced string replaces the old.
+        text = target[2]
+        if text is None:
+            # A list element addressed by a string token (of a
+            # parsed pointer): look it up by integer index.
+            text = parent[int(key)]
+        offset = patch["offset"]
+        value = text[:offset] + value + text[offset + patch["delete"] :]
+        op = "replace"
+    # Dispatch on the parent's exact class first (the overwhelmingly
+    # common case), then on the registered types (a single lookup),
+    # falling back to duck typing for container look-alikes such as
+    # observ proxies.
+    parent_cls = parent.__class__
+    if parent_cls is dict:
+        kind = "dict"
+    elif parent_cls is list:
+        kind = "list"
+    elif (adapter := _adapters[parent_cls]) is None:
+        kind = _kind(parent)
+    elif adapter.build is None:
+        kind = adapter.kind
+    else:
+        # Patch a builtin copy of the view, and build the value from it.
+        # Values of immutable types are built anew, and written in their
+        # place in turn.
+        view = _VIEW_COPIES[adapter.kind](
+            parent if adapter.view is None else adapter.view(parent)
+        )
+        _write(view, adapter.kind, op, key, value)
+        built = adapter.build(parent, view)
+        if built is parent:
+            return obj
+        if len(ptr.tokens) == 1:
+            return built
+        return _write_path(obj, Pointer(ptr.tokens[:-1]), "replace", built, None)
+    _write(parent, kind, op, key, value)
+    return obj
+
+
+def iapply(obj: Diffable, patches: Sequence[Operation]) -> Diffable:
     """Apply a list of patches to an object, in place.
 
     Patch values are deep-copied as they are written, so mutating the
     patched object afterwards never writes through into the patch list
     (and vice versa).
 
+    Values of immutable registered types (see
+    [`register`][patchdiff.registry.register]), such as named tuples,
+    can't be changed in place: they are rebuilt, and written in their
+    parent in turn. If `obj` itself is one of those, the rebuilt object
+    is returned instead.
+
     Args:
         obj: The object to mutate.
         patches: Operations as returned by [`diff`][patchdiff.diff.diff]
             or [`produce`][patchdiff.produce.produce].
 
     Returns:
-        The same object, mutated.
+        The same object, mutated (or the rebuilt object, see above).
     """
     if not patches:
         return obj
     scalar_types = _SCALAR_TYPES
-    copy_value = deepcopy
+    copy_value = snapshot
     for patch in patches:
         # The interpreter below is duck-typed on purpose (dict/list/set
         # look-alikes such as observ proxies must work), so the operation
         # is unpacked once into dynamically-typed locals.
         op_dict = cast("dict[str, Any]", patch)
-        ptr: Pointer = op_dict["path"]
         op: str = op_dict["op"]
-        target = ptr.evaluate(obj)
-        parent: Any = target[0]
-        key: Any = target[1]
         value: Any = None
-        if op != "remove":
+        if op == "move":
+            # A move is a remove followed by an add (RFC 6902), and the
+            # target path is resolved after the removal. The value only
+            # changes place, so it isn't copied.
+            obj, value = _pop(obj, op_dict["from"])
+            op = "add"
+        elif op != "remove":
             value = op_dict["value"]
             if value.__class__ not in scalar_types:
                 value = copy_value(value)
-        # Dispatch on the parent's exact class first (the overwhelmingly
-        # common case), falling back to duck typing for container
-        # look-alikes such as observ proxies.
-        parent_cls = parent.__class__
-        if parent_cls is dict or (parent_cls is not list and hasattr(parent, "keys")):
-            if op == "remove":
-                del parent[key]
-            else:  # add/replace
-                parent[key] = value
-        elif parent_cls is list or hasattr(parent, "append"):
-            if key.__class__ is not int:
-                try:
-                    key = int(key)
-                except ValueError:
-                    pass
-
-            if op == "replace":
-                parent[key] = value
-            elif op == "add":
-                if key == "-":
-                    parent.append(value)
-                else:
-                    parent.insert(key, value)
-            else:  # remove
-                del parent[key]
-        else:  # set
-            if op == "add":
-                parent.add(value)
-            else:  # remove
-                parent.remove(key)
+        obj = _write_path(obj, op_dict["path"], op, value, op_dict)
     return obj
 
 
-def apply(obj: Diffable, patches: list[Operation]) -> Diffable:
+def apply(obj: Diffable, patches: Sequence[Operation]) -> Diffable:
     """Apply a list of patches to a deep copy of an object.
 
+    The copy is made with [`snapshot`][patchdiff.registry.snapshot], so
+    the values of registered types in `obj` are copied with their
+    type's snapshot function.
+
     Args:
         obj: The object to copy and patch; it is left unchanged.
         patches: Operations as returned by [`diff`][patchdiff.diff.diff]
@@ -89,4 +184,4 @@ def apply(obj: Diffable, patches: list[Operation]) -> Diffable:
     Returns:
         The patched copy.
     """
-    return iapply(deepcopy(obj), patches)
+    return iapply(snapshot(obj), patches)
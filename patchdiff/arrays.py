@@ -0,0 +1,132 @@
+"""NumPy array support: arrays are diffed element-wise, as leaves.
+
+NumPy is optional and never imported here. An array can only exist once
+something else has imported NumPy, so `is_array` looks the module up in
+`sys.modules` and everything else takes it from there.
+
+An array is changed in place by `replace` operations on ranges of its
+elements, addressed by a `"start:stop"` path token (a half-open range of
+flat, C-order positions). When too much of it changed, or its shape or
+dtype did, it is replaced wholesale instead.
+"""
+
+from __future__ import annotations
+
+import sys
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    from .pointer import Pointer
+    from .types import Operation
+
+# Changed runs at most this many unchanged elements apart are written as
+# a single range: copying a few unchanged elements is cheaper (in patch
+# size and apply time) than another operation.
+_RANGE_GAP = 8
+
+# What a range operation costs on top of the elements it holds, in
+# elements.
+_RANGE_COST = 16
+
+# An array is replaced wholesale when the range operations would cost
+# more than this fraction of it.
+_REPLACE_RATIO = 0.5
+
+# Element kinds (see `numpy.dtype.kind`) for which NaN (or NaT) occurs
+# and never equals itself.
+_NAN_KINDS = frozenset("fcmM")
+
+
+def is_array(value: Any) -> bool:
+    """Return whether `value` is a NumPy array."""
+    numpy = sys.modules.get("numpy")
+    return numpy is not None and isinstance(value, numpy.ndarray)
+
+
+def _changed(a: Any, b: Any) -> Any:
+    """Return the positions at which the flat arrays `a` and `b` differ,
+    counting NaNs in the same position as equal."""
+    numpy = sys.modules["numpy"]
+    changed = numpy.flatnonzero(a != b)
+    if changed.size and a.dtype.kind in _NAN_KINDS:
+        a_changed = a[changed]
+        b_changed = b[changed]
+        changed = changed[~(numpy.isnan(a_changed) & numpy.isnan(b_changed))]
+    return changed
+
+
+def arrays_equal(a: Any, b: Any) -> bool:
+    """Return whether two arrays have the same shape, dtype and elements,
+    with NaN equal to NaN."""
+    if a.shape != b.shape or a.dtype != b.dtype:
+        return False
+    return not _changed(a.reshape(-1), b.reshape(-1)).size
+
+
+def diff_arrays(
+    input: Any,
+    output: Any,
+    ptr: Pointer,
+    reverse: bool = True,
+    replace_ratio: float | None = None,
+) -> tuple[list[Operation], list[Operation]]:
+    """Diff two values of which at least one is a NumPy array.
+
+    Arrays of the same shape and dtype are compared in a few vectorized
+    passes and yield a `replace` for each range of changed elements
+    (NaN equals NaN), unless they would cost more than `replace_ratio`
+    (`_REPLACE_RATIO` by default) of the array; anything else is
+    replaced wholesale. Without `reverse`, the reverse operations are
+    left out.
+    """
+    if (
+        is_array(input)
+        and is_array(output)
+        and input.shape == output.shape
+        and input.dtype == output.dtype
+    ):
+        numpy = sys.modules["numpy"]
+        a = input.reshape(-1)
+        b = output.reshape(-1)
+        changed = _changed(a, b)
+        if not changed.size:
+            return [], []
+        breaks = numpy.flatnonzero(numpy.diff(changed) > _RANGE_GAP + 1)
+        starts = changed[numpy.concatenate(([0], breaks + 1))]
+        stops = changed[numpy.concatenate((breaks, [changed.size - 1]))] + 1
+        cost = int((stops - starts).sum()) + _RANGE_COST * len(starts)
+        if replace_ratio is None:
+            replace_ratio = _REPLACE_RATIO
+        if cost <= replace_ratio * a.size:
+            ops: list[Operation] = []
+            rops: list[Operation] = []
+            for start, stop in zip(starts.tolist(), stops.tolist(), strict=True):
+                range_ptr = ptr.append(f"{start}:{stop}")
+                ops.append(
+                    {"op": "replace", "path": range_ptr, "value": b[start:stop].copy()}
+                )
+                if reverse:
+                    rops.append(
+                        {
+                            "op": "replace",
+                            "path": range_ptr,
+                            "value": a[start:stop].copy(),
+                        }
+                    )
+            return ops, rops
+    if not reverse:
+        return [{"op": "replace", "path": ptr, "value": output}], []
+    return [{"op": "replace", "path": ptr, "value": output}], [
+        {"op": "replace", "path": ptr, "value": input}
+    ]
+
+
+def write_range(array: Any, token: Any, value: Any) -> None:
+    """Write `value` into `array` at a `"start:stop"` range token (or a
+    single flat position), as one bulk assignment."""
+    start, sep, stop = str(token).partition(":")
+    index = slice(int(start), int(stop)) if sep else int(start)
+    if array.ndim == 1:
+        array[index] = value
+    else:
+        array.flat[index] = value
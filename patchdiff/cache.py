@@ -0,0 +1,123 @@
+"""Diff caches: the diffs between pairs of immutable snapshots, looked
+up by the snapshots' identity."""
+
+from __future__ import annotations
+
+import weakref
+from collections import OrderedDict
+from functools import partial
+from typing import Any
+
+from .diff import diff
+from .types import Diffable, Operation
+
+# The operations of a cached diff, which are never handed out (see
+# `_copy`).
+type _Patch = list[Operation]
+
+# A cached diff: (input, output, ops, reverse_ops), with the states held
+# as `_hold` returns them.
+type _Entry = tuple[Any, Any, _Patch, _Patch]
+
+
+def _hold(value: Any, callback: Any) -> Any:
+    """Return a weak reference to `value` that calls `callback` once it
+    is gone, or `value` itself if it can't be weakly referenced."""
+    try:
+        return weakref.ref(value, callback)
+    except TypeError:
+        return value
+
+
+def _copy(ops: _Patch) -> list[Operation]:
+    """Return a new list of copies of the cached operations, for one
+    caller to change as it likes."""
+    return [op.copy() for op in ops]
+
+
+class DiffCache:
+    """A least-recently-used cache of diffs between pairs of states,
+    looked up by the identity of the states.
+
+    Asking for the diff of a pair that is still cached returns copies of
+    its operations, in time linear in their number rather than in the
+    size of the states. That suits
+    states that are immutable snapshots, such as versions built with
+    [`produce`][patchdiff.produce.produce], whose diffs are asked for
+    repeatedly (by several subscribers, say).
+
+    Handing a pair to the cache declares both states immutable: the
+    cache can't tell when a state was changed in place, and would keep
+    returning its old diff. Call
+    [`invalidate`][patchdiff.cache.DiffCache.invalidate] before changing
+    a state after all.
+
+    A cached diff holds its states weakly where their type allows, and
+    is dropped once either of them is gone. Builtin dicts, lists and
+    sets can't be weakly referenced, so the cache holds those until
+    their diff is evicted, which is what keeps their ids from being
+    reused while cached.
+
+    Args:
+        maxsize: How many diffs to keep: the least recently used one is
+            evicted to make room for a new one.
+        **options: Passed on to [`diff`][patchdiff.diff.diff].
+    """
+
+    __slots__ = ("_entries", "_maxsize", "_options")
+
+    def __init__(self, maxsize: int = 128, **options: Any) -> None:
+        if maxsize < 1:
+            raise ValueError(f"maxsize must be at least 1, not {maxsize}")
+        self._maxsize = maxsize
+        self._options = options
+        # (id(input), id(output)) -> entry, least recently used first.
+        self._entries: OrderedDict[tuple[int, int], _Entry] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def diff(
+        self, input: Diffable, output: Diffable
+    ) -> tuple[list[Operation], list[Operation]]:
+        """Return the diff of `input` and `output`, from the cache if it
+        has it.
+
+        Returns:
+            `(ops, reverse_ops)`, as [`diff`][patchdiff.diff.diff]
+            returns them: new lists of copies of the cached operation
+            dicts on every call, which the caller may change. The values
+            in the operations are shared between calls, though, and must
+            not be changed.
+        """
+        key = (id(input), id(output))
+        entries = self._entries
+        entry = entries.get(key)
+        if entry is not None:
+            entries.move_to_end(key)
+            return _copy(entry[2]), _copy(entry[3])
+        patch, reverse_patch = diff(input, output, **self._options)
+        discard = partial(self._discard, key)
+        entries[key] = (
+            _hold(input, discard),
+            _hold(output, discard),
+            patch,
+            reverse_patch,
+        )
+        if len(entries) > self._maxsize:
+            entries.popitem(last=False)
+        return _copy(patch), _copy(reverse_patch)
+
+    def _discard(self, key: tuple[int, int], ref: weakref.ref) -> None:
+        """Drop a cached diff one of whose states is gone."""
+        self._entries.pop(key, None)
+
+    def invalidate(self, value: Diffable) -> None:
+        """Forget the diffs from and to `value`, to change it in place."""
+        value_id = id(value)
+        for key in [key for key in self._entries if value_id in key]:
+            del self._entries[key]
+
+    def clear(self) -> None:
+        """Forget all cached diffs."""
+        self._entries.clear()
@@ -0,0 +1,284 @@
+"""Early-exit comparisons: whether two documents differ, and where they
+first do, without diffing them."""
+
+from __future__ import annotations
+
+from collections.abc import Callable, Iterator
+from typing import Any
+
+from .diff import _NOTHING, _Context, _dispatcher, _tolerant_equal
+from .fingerprint import Fingerprints
+from .paths import _LEFT_OUT, PathFilter, PathPatterns
+from .pointer import Pointer
+from .types import Diffable
+
+# What the walk looks into next: a pair of values at a path that are
+# known to differ, or the path of a difference (see `_list_children`).
+# A pair also holds the path to report should anything below it differ,
+# if that isn't the path of the difference itself.
+type _Step = tuple[Any, Any, Pointer, Pointer | None] | Pointer
+
+
+def _equal(input: Any, output: Any, ctx: _Context, state: Any) -> bool | None:
+    """Whether `diff` finds nothing between `input` and `output`, at a
+    path whose filter state is `state`, or `None` if they are nested too
+    deeply to tell without looking into them. A value that only one
+    side has (`_NOTHING` on the other) only counts when it is left
+    out."""
+    if input is output or state is _LEFT_OUT:
+        return True
+    if input is _NOTHING or output is _NOTHING:
+        return False
+    equal = ctx.equal
+    paths = ctx.paths
+    try:
+        if state is not None and paths is not None:
+            return paths.equal(state, equal, input, output)
+        return bool(input == output if equal is None else equal(input, output))
+    except ValueError:
+        # No truth value: NumPy arrays, or containers holding them.
+        return _tolerant_equal(equal, input, output)
+    except RecursionError:
+        # Nested too deeply for `==`: the walk looks into the values
+        # instead, and goes on should nothing below them differ.
+        return None
+
+
+def _differs(input: Any, output: Any, ptr: Pointer, ctx: _Context) -> Pointer:
+    """Values that `diff` replaces or splices differ at `ptr`."""
+    return ptr
+
+
+def _differs_unless_equal(input: Any, output: Any, ptr: Pointer, ctx: _Context) -> Any:
+    """Sets and arrays differ at `ptr` unless they are equal (with
+    `trust_identity`, equal ones that aren't the same object get here,
+    and `diff` finds nothing in them)."""
+    return iter(()) if _tolerant_equal(None, input, output) else ptr
+
+
+def _dict_children(
+    input: Any, output: Any, ptr: Pointer, ctx: _Context
+) -> Iterator[_Step]:
+    """The pairs of values that differ under each key, in the order
+    `diff_dicts` walks them: the input's keys, then the output's own."""
+    paths = ctx.paths
+    child_ptr = ptr.append
+    get = output.get
+    for key, value in input.items():
+        other = get(key, _NOTHING)
+        if value is other:
+            continue
+        if paths is None:
+            if not _equal(value, other, ctx, None):
+                yield value, other, child_ptr(key), None
+        else:
+            key_ptr = child_ptr(key)
+            if not _equal(value, other, ctx, paths.state(key_ptr)):
+                yield value, other, key_ptr, None
+    for key in output:
+        if key not in input:
+            key_ptr = child_ptr(key)
+            if paths is None or paths.state(key_ptr) is not _LEFT_OUT:
+                yield _NOTHING, output[key], key_ptr, None
+
+
+def _list_children(
+    input: Any, output: Any, ptr: Pointer, ctx: _Context
+) -> Iterator[_Step]:
+    """The pairs of elements that differ, by position.
+
+    Positions only line up while the lists are as long: when they
+    aren't, elements were added or removed, and the first position that
+    differs is where the lists do (elements too deep to compare are
+    looked into, and differ there if anything below them does).
+    """
+    paths = ctx.paths
+    equal = ctx.equal
+    child_ptr = ptr.append
+    m, n = len(input), len(output)
+    start = 0
+    if paths is None:
+        # Skip the common prefix without pointers or calls.
+        limit = min(m, n)
+        try:
+            while start < limit:
+                item = input[start]
+                other = output[start]
+                if item is not other and not (
+                    item == other if equal is None else equal(item, other)
+                ):
+                    break
+                start += 1
+        except (ValueError, RecursionError):
+            pass
+    for index in range(start, max(m, n)):
+        item = input[index] if index < m else _NOTHING
+        other = output[index] if index < n else _NOTHING
+        if item is other:
+            continue
+        item_ptr = child_ptr(index)
+        same = _equal(
+            item, other, ctx, None if paths is None else paths.state(item_ptr)
+        )
+        if m == n:
+            if not same:
+                yield item, other, item_ptr, None
+        elif same is None:
+            yield item, other, item_ptr, item_ptr
+        elif not same:
+            yield item_ptr
+
+
+# Return the children of two values that differ, as an iterator of
+# `_Step`s, or the path of the values if they differ as a whole: the
+# values are dispatched like `_dispatch` does, so the walk descends
+# exactly where `diff` would.
+_look_into = _dispatcher(
+    _dict_children,
+    _list_children,
+    _differs_unless_equal,
+    _differs,
+    _differs_unless_equal,
+    _differs,
+)
+
+
+def first_difference(
+    input: Diffable,
+    output: Diffable,
+    ptr: Pointer | None = None,
+    *,
+    fingerprints: Fingerprints | bool = False,
+    trust_identity: bool = False,
+    eq: Callable[[Any, Any], bool] | None = None,
+    rel_tol: float | None = None,
+    abs_tol: float | None = None,
+    immutables: bool = False,
+    include: PathPatterns | None = None,
+    exclude: PathPatterns | None = None,
+) -> Pointer | None:
+    """Return the path of the first place where `input` and `output`
+    differ, or `None` if [`diff`][patchdiff.diff.diff] would find no
+    difference between them.
+
+    The documents are walked the way `diff` walks them, with the same
+    comparisons, but only into the first child that differs (and on to
+    the next one should nothing below it). Nothing is aligned and no
+    operations are built, so finding a difference costs about as much
+    as comparing the documents with `==`, however much else changed.
+
+    The path is the deepest one at which the values differ: a dict key
+    that only one side has, or a value that `diff` would replace (or
+    diff as a set, an array or a string). Lists are compared element
+    by element while they are as long; otherwise elements were added or
+    removed, and the path is the first index at which the lists
+    differ.
+
+    Args:
+        input: The source object.
+        output: The target object.
+        ptr: Pointer prefix of the returned path.
+        fingerprints: As for `diff`.
+        trust_identity: As for `diff`.
+        eq: As for `diff`.
+        rel_tol: As for `diff`.
+        abs_tol: As for `diff`.
+        immutables: As for `diff`.
+        include: As for `diff`.
+        exclude: As for `diff`.
+
+    Returns:
+        The path of the first difference, or `None`.
+    """
+    if ptr is None:
+        ptr = Pointer()
+    if fingerprints is True:
+        fingerprints = Fingerprints(maxsize=None)
+    ctx = _Context(
+        fingerprints if isinstance(fingerprints, Fingerprints) else None,
+        trust_identity,
+        immutables=immutables,
+        paths=(
+            None
+            if include is None and exclude is None
+            else PathFilter(include, exclude)
+        ),
+        eq=eq,
+        rel_tol=rel_tol,
+        abs_tol=abs_tol,
+    )
+    if _equal(input, output, ctx, None if ctx.paths is None else ctx.paths.state(ptr)):
+        return None
+    # A stack of the children of the values on the current path, each
+    # an iterator that resumes where the walk left it, with the path to
+    # report of a difference below them (if not its own).
+    stack: list[tuple[Iterator[_Step], Pointer | None]] = [
+        (iter([(input, output, ptr, None)]), None)
+    ]
+    while stack:
+        steps, report = stack[-1]
+        for step in steps:
+            if isinstance(step, Pointer):
+                return step if report is None else report
+            input, output, ptr, at = step
+            found = _look_into(input, output, ptr, ctx)
+            if isinstance(found, Pointer):
+                return found if report is None else report
+            stack.append((found, at if report is None else report))
+            break
+        else:
+            stack.pop()
+    return None
+
+
+def has_changes(
+    input: Diffable,
+    output: Diffable,
+    ptr: Pointer | None = None,
+    *,
+    fingerprints: Fingerprints | bool = False,
+    trust_identity: bool = False,
+    eq: Callable[[Any, Any], bool] | None = None,
+    rel_tol: float | None = None,
+    abs_tol: float | None = None,
+    immutables: bool = False,
+    include: PathPatterns | None = None,
+    exclude: PathPatterns | None = None,
+) -> bool:
+    """Return whether [`diff`][patchdiff.diff.diff] would find any
+    difference between `input` and `output`, stopping at the first one
+    (see [`first_difference`][patchdiff.compare.first_difference]).
+
+    Args:
+        input: The source object.
+        output: The target object.
+        ptr: Pointer prefix that `include` and `exclude` patterns start
+            with, as for `diff`.
+        fingerprints: As for `diff`.
+        trust_identity: As for `diff`.
+        eq: As for `diff`.
+        rel_tol: As for `diff`.
+        abs_tol: As for `diff`.
+        immutables: As for `diff`.
+        include: As for `diff`.
+        exclude: As for `diff`.
+
+    Returns:
+        Whether the documents differ.
+    """
+    return (
+        first_difference(
+            input,
+            output,
+            ptr,
+            fingerprints=fingerprints,
+            trust_identity=trust_identity,
+            eq=eq,
+            rel_tol=rel_tol,
+            abs_tol=abs_tol,
+            immutables=immutables,
+            include=include,
+            exclude=exclude,
+        )
+        is not None
+    )
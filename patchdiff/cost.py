@@ -0,0 +1,149 @@
+"""The cost model of `diff`: how much a diff of two values takes, and
+when it is replaced by a single `replace` operation instead (with the
+`max_depth`, `max_ops_per_node` and `replace_ratio` options).
+"""
+
+from __future__ import annotations
+
+import math
+from collections.abc import Callable
+from typing import TYPE_CHECKING, Any
+
+from .arrays import is_array
+from .pointer import Pointer
+
+if TYPE_CHECKING:
+    from .diff import _Context
+    from .types import Operation
+
+# What a splice operation costs on top of the text it inserts, in
+# characters (about what its offset and delete count take in JSON).
+_SPLICE_COST = 32
+
+# The types `_size` counts as a single node (strings aside).
+_SCALAR_TYPES = frozenset({int, float, complex, bool, bytes, type(None)})
+
+
+def _replace(
+    input: Any, output: Any, ptr: Pointer, ctx: _Context
+) -> tuple[list[Operation], list[Operation]]:
+    """Replace `input` by `output` wholesale."""
+    if not ctx.reverse:
+        return [{"op": "replace", "path": ptr, "value": output}], []
+    return [{"op": "replace", "path": ptr, "value": output}], [
+        {"op": "replace", "path": ptr, "value": input}
+    ]
+
+
+def _size(value: Any, limit: float, sizes: dict[int, tuple[Any, int]]) -> int:
+    """Count the nodes of `value` (containers and the scalars in them,
+    with strings counting once per `_SPLICE_COST` characters and arrays
+    once per element), stopping once there are more than `limit`.
+
+    `sizes` holds the values counted in full before, with their sizes,
+    by id: those count at once, so counting a value whose children were
+    counted (at the level below) doesn't count them again."""
+    size = 0
+    stack = [value]
+    while stack and size <= limit:
+        item = stack.pop()
+        cls = item.__class__
+        if cls is dict or cls in (list, tuple, set, frozenset):
+            counted = sizes.get(id(item))
+            if counted is not None and counted[0] is item:
+                size += counted[1]
+                continue
+            stack.extend(item.values() if cls is dict else item)
+        elif cls is str:
+            size += len(item) // _SPLICE_COST
+        elif cls not in _SCALAR_TYPES and is_array(item):
+            size += item.size - 1
+        size += 1
+    return size
+
+
+def _full_size(value: Any, sizes: dict[int, tuple[Any, int]]) -> int:
+    """Count all the nodes of `value` (see `_size`), and remember its
+    size in `sizes`."""
+    size = _size(value, math.inf, sizes)
+    if value.__class__ not in _SCALAR_TYPES:
+        # The value is held too, so that its id isn't reused.
+        sizes[id(value)] = (value, size)
+    return size
+
+
+def _diff_limited(
+    input: Any,
+    output: Any,
+    ptr: Pointer,
+    ctx: _Context,
+    dispatch: Callable[
+        [Any, Any, Pointer, _Context], tuple[list[Operation], list[Operation]]
+    ],
+) -> tuple[list[Operation], list[Operation]]:
+    """Diff two values that are known to differ under the cost model:
+    replace them wholesale when the diff would go deeper than
+    `max_depth`, or take more than `max_ops` operations, or when those
+    operations (counting the values they hold) would be larger than
+    `replace_ratio` times the output value.
+
+    `max_depth` is checked first and stops the descent right there, and
+    so does `max_ops` for dicts that already add and remove more keys
+    than that. The others are only known once the value was diffed.
+    The root is always diffed into: a patch can't replace it. Values
+    that are diffed into are diffed with `dispatch` (`_dispatch`).
+    """
+    depth = len(ptr.tokens)
+    if depth <= ctx.root_depth:
+        return dispatch(input, output, ptr, ctx)
+    if ctx.max_depth is not None and depth >= ctx.max_depth:
+        return _replace(input, output, ptr, ctx)
+    max_ops = ctx.max_ops
+    if (
+        max_ops is not None
+        and input.__class__ is dict
+        and output.__class__ is dict
+        # A move stands for a removed and an added key.
+        and len(input.keys() ^ output.keys()) // (2 if ctx.moves else 1) > max_ops
+    ):
+        return _replace(input, output, ptr, ctx)
+    if max_ops is None and ctx.replace_ratio is None:
+        return dispatch(input, output, ptr, ctx)
+    walk = ctx.walk
+    collected = 0 if walk is None else len(walk.tasks)
+    ops, rops = dispatch(input, output, ptr, ctx)
+    if walk is not None and len(walk.tasks) > collected:
+        # Some children were too deep to diff yet (see `_Walk`): the
+        # checks below need all of the operations.
+        return walk.collect(input, output, ptr, ctx, (ops, rops))
+    if _over_limits(input, output, ptr, ops, ctx):
+        return _replace(input, output, ptr, ctx)
+    return ops, rops
+
+
+def _over_limits(
+    input: Any, output: Any, ptr: Pointer, ops: list[Operation], ctx: _Context
+) -> bool:
+    """Whether `ops`, all of the operations of diffing `input` into
+    `output`, take more than `max_ops`, or are larger than
+    `replace_ratio` times the output value (see `_diff_limited`)."""
+    if (
+        (len(ops) == 1 and ops[0]["path"] == ptr)
+        or is_array(input)
+        or is_array(output)
+        or output.__class__ is str
+    ):
+        # Replaced wholesale already, or an array or string, with a cost
+        # model of its own (see `diff_arrays` and `diff_strings`).
+        return False
+    max_ops = ctx.max_ops
+    if max_ops is not None and len(ops) > max_ops:
+        return True
+    ratio = ctx.replace_ratio
+    if ratio is not None:
+        sizes = ctx.sizes
+        cost = sum(
+            1 + _full_size(op["value"], sizes) if "value" in op else 1 for op in ops
+        )
+        return cost > ratio * _size(output, cost / ratio, sizes)
+    return False
@@ -1,99 +1,492 @@
 from __future__ import annotations
 
-from typing import Any, cast
+import math
+from collections import Counter
+from collections.abc import Callable, Iterator, Mapping
+from copy import copy
+from functools import partial
+from itertools import accumulate
+from typing import TYPE_CHECKING, Any, Literal, TypedDict, Unpack, cast
 
+from .arrays import arrays_equal, diff_arrays, is_array
+from .cost import _SPLICE_COST, _diff_limited, _replace
+from .edits import _myers_script, _patience_script
+from .fingerprint import Fingerprints
+from .paths import _LEFT_OUT, PathFilter, PathPatterns
 from .pointer import Pointer
+from .registry import _adapters
 from .types import Diffable, Operation
+from .walk import _LEAF_TYPES, _Walk, _walk
+
+if TYPE_CHECKING:
+    from concurrent.futures import Executor
 
 # Types that are always diffed atomically (replaced wholesale): scalars,
-# plus tuples and frozensets, which diff() never descends into.
+# plus tuples and frozensets, which diff() only descends into with
+# `immutables=True`.
 _ATOMIC_TYPES = frozenset(
     {int, float, complex, bool, str, bytes, type(None), tuple, frozenset}
 )
 
 
-def _myers_script(a: list, b: list) -> list[tuple[str, int, int]]:
-    """Compute a shortest edit script between a and b with Myers' greedy
-    algorithm (An O(ND) Difference Algorithm and Its Variations, 1986).
-
-    Returns forward-ordered entries ("del", i, j) / ("ins", i, j) where
-    (i, j) are the pre-operation cursors: "del" removes a[i] while the
-    output cursor is at j, "ins" inserts b[j] at input cursor i. Runs of
-    equal elements produce no entries.
-
-    Time is O((m+n)·D) and memory O(D²) for D actual differences, so
-    nearly-equal lists are cheap regardless of their size. To keep the
-    worst case (barely anything in common) from degenerating into a
-    quadratic search for a shortest script nobody benefits from, the
-    search gives up once D exceeds half the combined length — the lists
-    then share less than a quarter of their elements, and the whole
-    region is emitted as a single hunk (which the replace pairing turns
-    into element-wise replaces, exactly what the old DP produced for
-    such inputs). Small regions are always solved exactly.
+def _trusting_equal(a: Any, b: Any) -> bool:
+    """Equality under the trust-identity assumption: containers are equal
+    only if they are the same object, atomic values compare with `==`."""
+    return a is b or (a.__class__ in _ATOMIC_TYPES and a == b)
+
+
+def _trusting_walking_equal(
+    leaf: Callable[[Any, Any], bool],
+    unequal: dict[tuple[int, int], tuple[Any, Any]],
+    a: Any,
+    b: Any,
+) -> bool:
+    """`_trusting_equal`, comparing atomic values with `_walking_equal`."""
+    return a is b or (
+        a.__class__ in _ATOMIC_TYPES and _walking_equal(leaf, unequal, a, b)
+    )
+
+
+def _tolerant_equal(equal: Callable[[Any, Any], bool] | None, a: Any, b: Any) -> bool:
+    """`equal` (or `==`) for values whose comparison may have no truth
+    value: NumPy arrays compare with `arrays_equal`, dicts, lists and
+    tuples holding them item by item, and anything else that can't be
+    compared is unequal. So are values nested too deeply to compare:
+    diffing into them tells, a level further down."""
+    if is_array(a) or is_array(b):
+        return is_array(a) and is_array(b) and arrays_equal(a, b)
+    try:
+        try:
+            return bool(a == b) if equal is None else bool(equal(a, b))
+        except ValueError:
+            pass
+        cls = a.__class__
+        if cls is not b.__class__ or cls not in (dict, list, tuple) or len(a) != len(b):
+            return False
+        if cls is dict:
+            return a.keys() == b.keys() and all(
+                _tolerant_equal(None, a[key], b[key]) for key in a
+            )
+        return all(_tolerant_equal(None, x, y) for x, y in zip(a, b, strict=True))
+    except RecursionError:
+        return False
+
+
+def _walking_equal(
+    leaf: Callable[[Any, Any], bool],
+    unequal: dict[tuple[int, int], tuple[Any, Any]],
+    a: Any,
+    b: Any,
+) -> bool:
+    """`==` on dicts, lists and tuples, and on values of registered types
+    (through their views), by walking them, with `leaf` comparing
+    anything else: values of other types, or of different types.
+
+    Values nested too deeply to compare by recursion are walked with a
+    stack instead, and the pairs of containers on the path to a
+    difference are remembered in `unequal` (by id, holding them so that
+    their ids aren't reused). Comparing one of them again, as a diff
+    does a level further down, finds it unequal at once, so a change
+    deep down a document is walked to once rather than from every level
+    above it.
     """
-    m, n = len(a), len(b)
-    if not m:
-        return [("ins", 0, j) for j in range(n)]
-    if not n:
-        return [("del", i, 0) for i in range(m)]
-
-    max_cost = (m + n) // 2
-    if max_cost < 64:
-        max_cost = m + n  # always exact below the cutoff floor
-
-    # v[offset + k] = furthest x reached on diagonal k (k = x - y) with
-    # the current number of edits d.
-    offset = m + n
-    v = [0] * (2 * offset + 2)
-    trace = []
-    d_final = -1
-    for d in range(offset + 1):
-        if d > max_cost:
-            # Too expensive: emit the whole region as one hunk.
-            return [("del", i, 0) for i in range(m)] + [("ins", m, j) for j in range(n)]
-        # Snapshot the diagonals the backtrack for round d needs (the
-        # state after round d-1); only [-d, d] is ever read.
-        trace.append(v[offset - d : offset + d + 1])
-        lo, hi = offset - d, offset + d
-        for vi in range(lo, hi + 1, 2):  # vi = offset + k
-            if vi == lo or (vi != hi and v[vi - 1] < v[vi + 1]):
-                x = v[vi + 1]  # step down: insertion
-            else:
-                x = v[vi - 1] + 1  # step right: deletion
-            y = x - vi + offset  # y = x - k
-            while x < m and y < n and a[x] == b[y]:  # follow the snake
-                x += 1
-                y += 1
-            v[vi] = x
-            if x >= m and y >= n:
-                d_final = d
+    if (
+        unequal
+        and (known := unequal.get((id(a), id(b)))) is not None
+        and known[0] is a
+        and known[1] is b
+    ):
+        return False
+    try:
+        return _walk_equal(leaf, a, b)
+    except RecursionError:
+        return _walking_equal_deep(leaf, unequal, a, b)
+
+
+def _walk_equal(leaf: Callable[[Any, Any], bool], a: Any, b: Any) -> bool:
+    """`_walking_equal`, by recursion."""
+    if a is b:
+        return True
+    cls = a.__class__
+    if cls is not b.__class__:
+        return leaf(a, b)
+    if cls is dict:
+        kind = "dict"
+    elif cls is list or cls is tuple:
+        kind = "list"
+    elif cls in _ATOMIC_TYPES or (adapter := _adapters[cls]) is None:
+        return leaf(a, b)
+    else:
+        kind = adapter.kind
+        if kind == "set":
+            # Set elements are found by hash, which no leaf can change.
+            return leaf(a, b)
+        if view := adapter.view:
+            a, b = view(a), view(b)
+    if len(a) != len(b):
+        return False
+    if kind == "dict":
+        get = b.get
+        for key, value in a.items():
+            other = get(key, _NOTHING)
+            if other is _NOTHING or not _walk_equal(leaf, value, other):
+                return False
+        return True
+    for value, other in zip(a, b, strict=True):
+        if not _walk_equal(leaf, value, other):
+            return False
+    return True
+
+
+def _walking_equal_deep(
+    leaf: Callable[[Any, Any], bool],
+    unequal: dict[tuple[int, int], tuple[Any, Any]],
+    a: Any,
+    b: Any,
+) -> bool:
+    """`_walking_equal` for values nested too deeply to compare by
+    recursion, with a stack of its own."""
+    # The containers being walked, with an iterator over their items
+    # and, for dicts, the lookup of the other side's values (or `None`
+    # for lists). The first entry holds the pair to compare.
+    stack: list[tuple[Any, Any, Iterator[Any], Any]] = [
+        (None, None, iter(((a, b),)), None)
+    ]
+    while stack:
+        _, _, items, get = stack[-1]
+        item = next(items, None)
+        if item is None:
+            stack.pop()
+            continue
+        if get is None:
+            a, b = item
+        else:
+            key, a = item
+            b = get(key, _NOTHING)
+            if b is _NOTHING:
+                break
+        if a is b:
+            continue
+        if (
+            unequal
+            and (known := unequal.get((id(a), id(b)))) is not None
+            and known[0] is a
+            and known[1] is b
+        ):
+            break
+        cls = a.__class__
+        if cls is not b.__class__:
+            if leaf(a, b):
+                continue
+            break
+        if cls is dict:
+            kind = "dict"
+            a_items, b_items = a, b
+        elif cls is list or cls is tuple:
+            kind = "list"
+            a_items, b_items = a, b
+        elif cls in _ATOMIC_TYPES or (adapter := _adapters[cls]) is None:
+            if leaf(a, b):
+                continue
+            break
+        else:
+            kind = adapter.kind
+            if kind == "set":
+                if leaf(a, b):
+                    continue
                 break
-        if d_final >= 0:
+            if view := adapter.view:
+                a_items, b_items = view(a), view(b)
+            else:
+                a_items, b_items = a, b
+        if len(a_items) != len(b_items):
             break
+        if kind == "dict":
+            stack.append((a, b, iter(a_items.items()), b_items.get))
+        else:
+            stack.append((a, b, zip(a_items, b_items, strict=True), None))
+    else:
+        return True
+    for a, b, _, _ in stack[1:]:
+        unequal[id(a), id(b)] = a, b
+    return False
+
+
+# The types of the numbers that `rel_tol` and `abs_tol` apply to.
+_NUMBER_TYPES = frozenset({int, float})
+
+
+def _close(
+    rel_tol: float,
+    abs_tol: float,
+    eq: Callable[[Any, Any], bool] | None,
+    a: Any,
+    b: Any,
+) -> bool:
+    """Compare floats (with each other, or with ints) with
+    `math.isclose`, counting NaN equal to NaN, and anything else with
+    `eq` (or `==`)."""
+    if (
+        a.__class__ in _NUMBER_TYPES
+        and b.__class__ in _NUMBER_TYPES
+        and (a.__class__ is float or b.__class__ is float)
+    ):
+        try:
+            return math.isclose(a, b, rel_tol=rel_tol, abs_tol=abs_tol) or (
+                math.isnan(a) and math.isnan(b)
+            )
+        except OverflowError:
+            # An int too large for a float is not close to any float.
+            return False
+    return a == b if eq is None else eq(a, b)
+
+
+type ListKey = Callable[[Any], Any]
+type ListAlgorithm = Literal["myers", "patience"]
+
+_LIST_ALGORITHMS = frozenset({"myers", "patience"})
+
+type ListPairing = Literal["position", "similarity"]
+
+_LIST_PAIRINGS = frozenset({"position", "similarity"})
+
+
+class DiffOptions(TypedDict, total=False):
+    """The options of [`diff`][patchdiff.diff.diff], as keyword
+    arguments (see there)."""
+
+    fingerprints: Fingerprints | bool
+    trust_identity: bool
+    eq: Callable[[Any, Any], bool] | None
+    rel_tol: float | None
+    abs_tol: float | None
+    key: ListKey | Mapping[str | Pointer, ListKey] | None
+    moves: bool
+    algorithm: ListAlgorithm
+    pairing: ListPairing
+    reverse: bool
+    max_depth: int | None
+    max_ops_per_node: int | None
+    replace_ratio: float | None
+    splice_strings: int | None
+    immutables: bool
+    include: PathPatterns | None
+    exclude: PathPatterns | None
+    workers: int | Executor | None
+
+
+# Types that `_diff` dispatches without comparing them with `==` first
+# (see there): their diffs walk them comparing their children, and come
+# up empty for equal values.
+_WALKED_TYPES = frozenset({dict, list, set})
+
+# Tags unhashable values by fingerprint without colliding with any
+# hashable value (no value can contain this object).
+_DIGEST_TAG = object()
+
+# What a dict lookup returns for a missing key, where `None` could be a
+# value.
+_NOTHING = object()
+
+
+def _path_tokens(ptr: Pointer) -> tuple[str, ...]:
+    """Normalize a pointer for path lookups: list indices in diff
+    pointers are ints, in parsed pointers they are strings."""
+    return tuple(str(token) for token in ptr.tokens)
+
+
+class _Context:
+    """Per-call diff settings, threaded through the recursion.
+
+    `equal` replaces `==` for the equality checks that decide whether to
+    descend into a pair of values; `None` means plain `==`, which the
+    hot loops inline rather than calling through a function. Identical
+    objects are always equal and never reach `equal`. The caller's `eq`
+    and tolerances (`rel_tol`, `abs_tol`) make it a `_walking_equal`
+    that compares the values below containers with them.
+
+    `key` matches list elements by key for every list, `path_keys` only
+    for the lists at the given (normalized) paths.
+
+    `fingerprints` is the caller's cache, or one for this call only
+    (made when it is first used, which most diffs never do). It
+    matches values for `moves` and lets the patience `algorithm`
+    recognize unhashable values. When equality is decided by the
+    caller's fingerprints, list elements are also interned (see
+    `_intern`) before they are aligned.
+
+    Without `reverse`, only the forward operations are built and the
+    reverse operation lists stay empty.
+
+    `splice_strings` is the length from which strings are diffed into
+    `splice` operations (see `diff_strings`), if at all.
+
+    `max_depth`, `max_ops` and `replace_ratio` are the cost model (see
+    `_diff_limited`), which `limited` tells is in use. It applies below
+    the diff's root, at paths longer than `root_depth`; `max_depth` is
+    a path length too.
+
+    `descend` diffs a pair of child values that dicts and lists recurse
+    into, and the pairs that `_walk` starts from and collects. It is
+    `_diff`, except where `_diff_level` collects the pairs (for the
+    parallel engine and `iter_diff`) to diff them later. `walk` is the
+    state of the `_walk` that the diff is a part of, if any, which
+    collects the pairs of values that are too deep to recurse into.
+
+    `paths` holds the `include` and `exclude` patterns, if any (see
+    `PathFilter`); containers look up their state by their pointer.
+    """
+
+    __slots__ = (
+        "_fingerprints",
+        "algorithm",
+        "descend",
+        "equal",
+        "immutables",
+        "intern",
+        "key",
+        "limited",
+        "max_depth",
+        "max_ops",
+        "moves",
+        "pairing",
+        "path_keys",
+        "paths",
+        "replace_ratio",
+        "reverse",
+        "root_depth",
+        "sizes",
+        "splice_strings",
+        "walk",
+    )
 
-    # Backtrack from (m, n) to (0, 0), emitting one edit per round.
-    script: list[tuple[str, int, int]] = []
-    x, y = m, n
-    for d in range(d_final, 0, -1):
-        vprev = trace[d]  # covers k in [-d, d]; index with k + d
-        k = x - y
-        if k == -d or (k != d and vprev[k - 1 + d] < vprev[k + 1 + d]):
-            prev_k = k + 1  # arrived by insertion
+    def __init__(
+        self,
+        fingerprints: Fingerprints | None = None,
+        trust_identity: bool = False,
+        key: ListKey | Mapping[str | Pointer, ListKey] | None = None,
+        moves: bool = False,
+        algorithm: ListAlgorithm = "myers",
+        reverse: bool = True,
+        max_depth: int | None = None,
+        max_ops: int | None = None,
+        replace_ratio: float | None = None,
+        root_depth: int = 0,
+        splice_strings: int | None = None,
+        immutables: bool = False,
+        pairing: ListPairing = "position",
+        paths: PathFilter | None = None,
+        eq: Callable[[Any, Any], bool] | None = None,
+        rel_tol: float | None = None,
+        abs_tol: float | None = None,
+    ) -> None:
+        if algorithm not in _LIST_ALGORITHMS:
+            raise ValueError(f"Unknown list diff algorithm: {algorithm!r}")
+        if pairing not in _LIST_PAIRINGS:
+            raise ValueError(f"Unknown list pairing: {pairing!r}")
+        if max_ops is not None and max_ops < 1:
+            raise ValueError(f"max_ops_per_node must be at least 1, not {max_ops}")
+        if replace_ratio is not None and replace_ratio <= 0:
+            raise ValueError(f"replace_ratio must be positive, not {replace_ratio}")
+        leaf = eq
+        if rel_tol is not None or abs_tol is not None:
+            if (rel_tol or 0.0) < 0 or (abs_tol or 0.0) < 0:
+                raise ValueError("rel_tol and abs_tol must not be negative")
+            leaf = partial(_close, rel_tol or 0.0, abs_tol or 0.0, eq)
+        if leaf is not None and fingerprints is not None:
+            # Fingerprints tell exactly equal values apart.
+            raise ValueError("eq, rel_tol and abs_tol can't be used with fingerprints")
+        self.algorithm = algorithm
+        self.descend = _diff
+        self.equal: Callable[[Any, Any], bool] | None
+        if trust_identity:
+            self.equal = (
+                _trusting_equal
+                if leaf is None
+                else partial(_trusting_walking_equal, leaf, {})
+            )
+        elif fingerprints is not None:
+            self.equal = fingerprints.equal
+        elif leaf is not None:
+            self.equal = partial(_walking_equal, leaf, {})
         else:
-            prev_k = k - 1  # arrived by deletion
-        prev_x = vprev[prev_k + d]
-        prev_y = prev_x - prev_k
-        if prev_k == k + 1:
-            script.append(("ins", prev_x, prev_y))
+            self.equal = None
+        # Interning digests every element once. That beats comparing
+        # digests over and over, but not comparing with a (C-level) ==,
+        # which usually stops at the first difference.
+        self.intern = fingerprints is not None and not trust_identity
+        self.key: ListKey | None = None
+        self.path_keys: dict[tuple[str, ...], ListKey] | None = None
+        if key is not None and isinstance(key, Mapping):
+            self.path_keys = {
+                _path_tokens(
+                    Pointer.from_str(path) if isinstance(path, str) else path
+                ): fn
+                for path, fn in key.items()
+            }
         else:
-            script.append(("del", prev_x, prev_y))
-        x, y = prev_x, prev_y
-    script.reverse()
-    return script
+            self.key = key
+        self.moves = moves
+        self.reverse = reverse
+        self.max_depth = max_depth
+        self.max_ops = max_ops
+        self.replace_ratio = replace_ratio
+        self.root_depth = root_depth
+        self.splice_strings = splice_strings
+        self.immutables = immutables
+        self.pairing = pairing
+        self.paths = paths
+        self.limited = not (
+            max_depth is None and max_ops is None and replace_ratio is None
+        )
+        self.walk: _Walk | None = None
+        # The sizes of the values the cost model counted (see `_size`).
+        self.sizes: dict[int, tuple[Any, int]] = {}
+        self._fingerprints = fingerprints
+
+    @property
+    def fingerprints(self) -> Fingerprints:
+        """The fingerprint cache, made on first use if the caller gave
+        none."""
+        fingerprints = self._fingerprints
+        if fingerprints is None:
+            fingerprints = self._fingerprints = Fingerprints(maxsize=None)
+        return fingerprints
+
+    @fingerprints.setter
+    def fingerprints(self, fingerprints: Fingerprints) -> None:
+        self._fingerprints = fingerprints
+
+    def list_key(self, ptr: Pointer) -> ListKey | None:
+        """Return the key function for the list at `ptr`, if any."""
+        if self.path_keys is None:
+            return self.key
+        return self.path_keys.get(_path_tokens(ptr))
+
+    def tag(self, item: Any) -> Any:
+        """Return a hashable stand-in for `item` that is equal for equal
+        items: the item itself, or its fingerprint if it is unhashable
+        (`None` if it has neither)."""
+        try:
+            hash(item)
+        except TypeError:
+            digest = self.fingerprints.digest(item)
+            return None if digest is None else (_DIGEST_TAG, digest)
+        return item
+
+    def tolerant(self) -> _Context:
+        """Return a copy of this context whose `equal` tolerates values
+        that `==` can't compare (see `_tolerant_equal`)."""
+        ctx = copy(self)
+        ctx.equal = partial(_tolerant_equal, self.equal)
+        return ctx
 
 
 def _pad_ops(
-    intermediate: list[dict[str, Any]], list_len: int, ptr: Pointer
+    intermediate: list[dict[str, Any]],
+    list_len: int,
+    ptr: Pointer,
+    ctx: _Context,
 ) -> list[Operation]:
     """Convert intermediate ops (absolute indices) into patch operations.
 
@@ -102,71 +495,375 @@ def _pad_ops(
     tracks that running offset. Replaces recurse through diff() so
     paired containers turn into deep paths instead of wholesale element
     replacement.
+
+    Only the forward operations of those replaces are used (the reverse
+    ops pad the replaces in the other direction), so they are diffed
+    without the reverse ones: building both at every level would diff
+    each pair of nested lists twice per level of nesting.
     """
     padded: list[Operation] = []
     padding = 0
-    for op in intermediate:
-        kind = op["op"]
-        if kind == "add":
-            padded_idx = op["idx"] + 1 + padding
-            idx_token = padded_idx if padded_idx < list_len + padding else "-"
-            padded.append(
-                {
-                    "op": "add",
-                    "path": ptr.append(idx_token),
-                    "value": op["value"],
-                }
-            )
-            padding += 1
-        elif kind == "remove":
-            padded.append(
-                {
-                    "op": "remove",
-                    "path": ptr.append(op["idx"] + padding),
-                }
-            )
-            padding -= 1
-        else:  # replace
-            replace_ptr = ptr.append(op["idx"] + padding)
-            replace_ops, _ = diff(op["original"], op["value"], replace_ptr)
-            padded.extend(replace_ops)
+    reverse = ctx.reverse
+    ctx.reverse = False
+    try:
+        for op in intermediate:
+            kind = op["op"]
+            if kind == "add":
+                padded_idx = op["idx"] + 1 + padding
+                idx_token = padded_idx if padded_idx < list_len + padding else "-"
+                padded.append(
+                    {
+                        "op": "add",
+                        "path": ptr.append(idx_token),
+                        "value": op["value"],
+                    }
+                )
+                padding += 1
+            elif kind == "remove":
+                padded.append(
+                    {
+                        "op": "remove",
+                        "path": ptr.append(op["idx"] + padding),
+                    }
+                )
+                padding -= 1
+            else:  # replace
+                replace_ptr = ptr.append(op["idx"] + padding)
+                replace_ops, _ = ctx.descend(
+                    op["original"], op["value"], replace_ptr, ctx
+                )
+                padded.extend(replace_ops)
+    finally:
+        ctx.reverse = reverse
     return padded
 
 
-def diff_lists(
-    input: list, output: list, ptr: Pointer
-) -> tuple[list[Operation], list[Operation]]:
+def _emit_hunk(
+    ops: list[dict[str, Any]],
+    source: list,
+    target: list,
+    dels: list[int],
+    inss: list[int],
+    pairs: list[tuple[int, int]],
+    start: int,
+    prefix: int,
+) -> None:
+    """Append the intermediate ops that turn one hunk of `source` into
+    the matching hunk of `target`.
+
+    The hunk removes `dels` (source indices, ascending from `start`) and
+    inserts `inss` (target indices), except for `pairs` of (deletion,
+    insertion) that become a replace instead. Pairs must ascend on both
+    sides. Between pairs, removes come first and adds go right after
+    the last source position consumed so far.
+    """
+    cursor = start
+    d = s = 0
+    for pair_d, pair_s in (*pairs, (-1, -1)):  # sentinel flushes the rest
+        while d < len(dels) and dels[d] != pair_d:
+            ops.append({"op": "remove", "idx": dels[d] + prefix})
+            cursor = dels[d] + 1
+            d += 1
+        while s < len(inss) and inss[s] != pair_s:
+            ops.append(
+                {"op": "add", "idx": cursor - 1 + prefix, "value": target[inss[s]]}
+            )
+            s += 1
+        if pair_d < 0:
+            break
+        ops.append(
+            {
+                "op": "replace",
+                "idx": pair_d + prefix,
+                "original": source[pair_d],
+                "value": target[pair_s],
+            }
+        )
+        cursor = pair_d + 1
+        d += 1
+        s += 1
+
+
+def _emit_kept(
+    ops: list[dict[str, Any]],
+    rops: list[dict[str, Any]] | None,
+    source: list,
+    target: list,
+    i: int,
+    j: int,
+    end: int,
+    prefix: int,
+    ctx: _Context,
+) -> None:
+    """Append replaces for the aligned pairs (source[i], target[j]),
+    (source[i + 1], target[j + 1]), ... up to source index `end`, in
+    both directions (forward only without `rops`), skipping pairs that
+    are equal."""
+    equal = ctx.equal
+    for offset in range(end - i):
+        original = source[i + offset]
+        value = target[j + offset]
+        if original is value or (
+            original == value if equal is None else equal(original, value)
+        ):
+            continue
+        ops.append(
+            {
+                "op": "replace",
+                "idx": i + offset + prefix,
+                "original": original,
+                "value": value,
+            }
+        )
+        if rops is None:
+            continue
+        rops.append(
+            {
+                "op": "replace",
+                "idx": j + offset + prefix,
+                "original": value,
+                "value": original,
+            }
+        )
+
+
+# Elements of a hunk that have less than this share of their items in
+# common aren't paired by similarity (see `_similar_pairs`); scalars
+# always pair with this weight, as a replace beats a remove and an add.
+_MIN_SIMILARITY = 0.5
+
+# Hunks with more (deletion, insertion) pairs than this to weigh are
+# paired by position instead.
+_PAIRING_BUDGET = 4096
+
+
+def _similarity(a: dict | list, b: dict | list) -> float:
+    """Return the share of their items that two dicts (key and value) or
+    lists (elements, regardless of order if they are hashable) have in
+    common."""
+    size = max(len(a), len(b))
+    if not size:
+        return 1.0
+    try:
+        if isinstance(a, dict) and isinstance(b, dict):
+            common = 0
+            for key, value in a.items():
+                other = b.get(key, _NOTHING)
+                if other is value or (other is not _NOTHING and other == value):
+                    common += 1
+        else:
+            try:
+                common = (Counter(a) & Counter(b)).total()
+            except TypeError:  # unhashable elements: compare by position
+                common = sum(1 for x, y in zip(a, b) if x is y or x == y)
+    except (ValueError, RecursionError):  # values that can't be compared
+        return 0.0
+    return common / size
+
+
+def _pair_weight(a: Any, b: Any) -> float:
+    """Return how much pairing `a` with `b` is worth (0 if they shouldn't
+    pair): the similarity of two dicts or two lists, if it is enough."""
+    cls = a.__class__
+    if cls is dict or cls is list:
+        if b.__class__ is not cls:
+            return 0.0
+        similarity = _similarity(a, b)
+        return similarity if similarity >= _MIN_SIMILARITY else 0.0
+    if b.__class__ is dict or b.__class__ is list:
+        return 0.0
+    return _MIN_SIMILARITY
+
+
+def _similar_pairs(
+    source: list, target: list, dels: list[int], inss: list[int]
+) -> list[tuple[int, int]]:
+    """Pair the deletions of a hunk with its insertions by similarity:
+    the pairs of the largest total weight (see `_pair_weight`) that
+    ascend on both sides, found like a longest common subsequence.
+
+    Hunks with more than `_PAIRING_BUDGET` candidate pairs are paired
+    by position, like without similarity.
+    """
+    k, n = len(dels), len(inss)
+    if k * n > _PAIRING_BUDGET:
+        return list(zip(dels, inss, strict=False))
+    weights = [[_pair_weight(source[d], target[s]) for s in inss] for d in dels]
+    # best[i][j]: the largest total weight for dels[i:] and inss[j:].
+    best = [[0.0] * (n + 1) for _ in range(k + 1)]
+    for i in range(k - 1, -1, -1):
+        row, below, weight_row = best[i], best[i + 1], weights[i]
+        for j in range(n - 1, -1, -1):
+            value = max(below[j], row[j + 1])
+            if (weight := weight_row[j]) and below[j + 1] + weight > value:
+                value = below[j + 1] + weight
+            row[j] = value
+    pairs: list[tuple[int, int]] = []
+    i = j = 0
+    while i < k and j < n:
+        weight = weights[i][j]
+        if weight and best[i][j] == best[i + 1][j + 1] + weight:
+            pairs.append((dels[i], inss[j]))
+            i += 1
+            j += 1
+        elif best[i][j] == best[i + 1][j]:
+            i += 1
+        else:
+            j += 1
+    return pairs
+
+
+type _Hunk = tuple[list[int], list[int], int, int]
+
+
+def _intern(
+    a: list, b: list, fingerprints: Fingerprints
+) -> tuple[list[int], list[int]] | None:
+    """Map the elements of `a` and `b` to small ints that are equal
+    exactly when the elements' fingerprints are, so that aligning the
+    lists compares ints instead of calling `fingerprints.equal` (and
+    looking up two digests) for every comparison.
+
+    Returns `None` if an element has no fingerprint.
+    """
+    digest = fingerprints.digest
+    classes: dict[bytes, int] = {}
+    interned: list[list[int]] = []
+    for items in (a, b):
+        ids: list[int] = []
+        for item in items:
+            item_digest = digest(item)
+            if item_digest is None:
+                return None
+            class_id = classes.get(item_digest)
+            if class_id is None:
+                class_id = classes[item_digest] = len(classes)
+            ids.append(class_id)
+        interned.append(ids)
+    return interned[0], interned[1]
+
+
+# Lists (and tuples) are compared at least this many elements at a
+# time while looking for their common prefix and suffix: few enough
+# that the elements compared again, one at a time, once a chunk
+# differs are few too.
+_LIST_CHUNK = 64
+
+# The types whose slices are compared that way.
+_SLICED_TYPES = frozenset({list, tuple})
+
+
+def _align_lists(
+    input: list,
+    output: list,
+    key: ListKey | None,
+    ctx: _Context,
+) -> tuple[int, list, list, list[_Hunk]]:
+    """Align two lists: strip their common prefix and suffix and group
+    the edit script for what remains into hunks.
+
+    Returns `(prefix, sub_input, sub_output, hunks)`, where each hunk is
+    `(dels, inss, i, j)`: the deleted sub_input indices, the inserted
+    sub_output indices, and the cursors at which the hunk starts.
+    """
     m_full, n_full = len(input), len(output)
+    equal = ctx.equal
 
     # Strip common prefix so the edit search only covers the changed region.
     prefix = 0
     prefix_limit = min(m_full, n_full)
-    while prefix < prefix_limit and input[prefix] == output[prefix]:
+    chunked = (
+        equal is None
+        and input.__class__ in _SLICED_TYPES
+        and output.__class__ is input.__class__
+        and prefix_limit > 0
+        and input[0].__class__ in _ATOMIC_TYPES
+    )
+    if chunked:
+        # Comparing slices compares their elements like the loops below
+        # do (by identity, then `==`), but at C speed. The slices grow
+        # while they are equal and shrink again once they aren't; equal
+        # lists are found without slicing them at all. That compares
+        # some elements twice, which only pays off for atomic ones
+        # (judging by the first), whose `==` is cheap.
+        step = _LIST_CHUNK
+        if m_full == n_full and input == output:
+            prefix = prefix_limit
+        while prefix < prefix_limit:
+            if input[prefix : prefix + step] == output[prefix : prefix + step]:
+                prefix += step
+                step *= 2
+            elif step > _LIST_CHUNK:
+                step //= 2
+            else:
+                break
+        prefix = min(prefix, prefix_limit)
+    while prefix < prefix_limit:
+        input_item = input[prefix]
+        output_item = output[prefix]
+        if input_item is not output_item and not (
+            input_item == output_item
+            if equal is None
+            else equal(input_item, output_item)
+        ):
+            break
         prefix += 1
 
     # Strip common suffix without crossing into the prefix region.
     suffix = 0
-    while (
-        suffix < (m_full - prefix)
-        and suffix < (n_full - prefix)
-        and input[m_full - 1 - suffix] == output[n_full - 1 - suffix]
-    ):
+    suffix_limit = min(m_full, n_full) - prefix
+    if chunked:
+        step = _LIST_CHUNK
+        while step >= _LIST_CHUNK:
+            if suffix + step <= suffix_limit and (
+                input[m_full - suffix - step : m_full - suffix]
+                == output[n_full - suffix - step : n_full - suffix]
+            ):
+                suffix += step
+                step *= 2
+            else:
+                step //= 2
+    while suffix < suffix_limit:
+        input_item = input[m_full - 1 - suffix]
+        output_item = output[n_full - 1 - suffix]
+        if input_item is not output_item and not (
+            input_item == output_item
+            if equal is None
+            else equal(input_item, output_item)
+        ):
+            break
         suffix += 1
 
     sub_input = input[prefix : m_full - suffix]
     sub_output = output[prefix : n_full - suffix]
 
     # Group the edit script into hunks: maximal runs of edits with no
-    # kept element in between. Within a hunk deletions come first (the
-    # backtrack's tie-breaking guarantees it), so hunk boundaries are
-    # exactly the places where an edit doesn't start at the previous
-    # edit's end cursor.
-    hunks: list[tuple[list[int], list[int], int, int]] = []
+    # kept element in between. Consecutive edits in a hunk (deletions
+    # and insertions in any order) each start at the previous edit's end
+    # cursor, so hunk boundaries are exactly the places where one
+    # doesn't.
+    hunks: list[_Hunk] = []
     dels: list[int] = []
     inss: list[int] = []
     hunk_i = hunk_j = 0
     post: tuple[int, int] | None = None
-    for kind, i, j in _myers_script(sub_input, sub_output):
+    a, b = sub_input, sub_output
+    if key is not None:
+        # Align by key: elements with the same key are the same record,
+        # whatever else about them changed.
+        a = [key(item) for item in sub_input]
+        b = [key(item) for item in sub_output]
+        equal = None
+    elif ctx.intern and len(a) + len(b) > 2 and a and b:
+        interned = _intern(a, b, ctx.fingerprints)
+        if interned is not None:
+            a, b = interned
+            equal = None
+    if ctx.algorithm == "patience":
+        script = _patience_script(a, b, equal, ctx.tag)
+    else:
+        script = _myers_script(a, b, equal)
+    for kind, i, j in script:
         if post is not None and (i, j) != post:
             hunks.append((dels, inss, hunk_i, hunk_j))
             dels, inss = [], []
@@ -181,86 +878,588 @@ def diff_lists(
             post = (i, j + 1)
     if dels or inss:
         hunks.append((dels, inss, hunk_i, hunk_j))
+    return prefix, sub_input, sub_output, hunks
 
+
+def _list_ops(
+    sub_input: list,
+    sub_output: list,
+    hunks: list[_Hunk],
+    prefix: int,
+    m_full: int,
+    n_full: int,
+    key: ListKey | None,
+    ptr: Pointer,
+    ctx: _Context,
+) -> tuple[list[Operation], list[Operation]]:
+    """Turn aligned hunks (see `_align_lists`) into patch operations in
+    both directions."""
     # Emit intermediate operations per hunk: the k-th deletion pairs
     # with the k-th insertion as a replace (recursed into by _pad_ops),
+    # or with the insertion most like it with `pairing="similarity"`;
     # the unpaired remainder becomes plain removes or adds. Indexes are
     # emitted in sub-list coordinates and shifted by `prefix` so they
-    # refer to positions in the original input/output.
+    # refer to positions in the original input/output. The reverse ops
+    # are the same hunks with the roles of input and output swapped.
+    #
+    # Keyed hunks hold different records on either side, so nothing in
+    # them is paired; instead the aligned elements between hunks (same
+    # key) are the pairs, and are recursed into where they differ.
     ops: list[dict[str, Any]] = []
-    rops: list[dict[str, Any]] = []
+    rops: list[dict[str, Any]] | None = [] if ctx.reverse else None
+    kept_i = kept_j = 0
     for dels, inss, hunk_i, hunk_j in hunks:
-        paired = min(len(dels), len(inss))
-        for t in range(paired):
-            di, sj = dels[t], inss[t]
-            ops.append(
-                {
-                    "op": "replace",
-                    "idx": di + prefix,
-                    "original": sub_input[di],
-                    "value": sub_output[sj],
-                }
+        if key is not None:
+            _emit_kept(
+                ops, rops, sub_input, sub_output, kept_i, kept_j, hunk_i, prefix, ctx
+            )
+            pairs = []
+        elif ctx.pairing == "similarity" and dels and inss:
+            pairs = _similar_pairs(sub_input, sub_output, dels, inss)
+        else:
+            # Pairing by position, in both directions at once: what
+            # `_emit_hunk` emits for the pairs of the first deletions
+            # and insertions, written out for the common case.
+            paired = min(len(dels), len(inss))
+            for t in range(paired):
+                di, sj = dels[t], inss[t]
+                ops.append(
+                    {
+                        "op": "replace",
+                        "idx": di + prefix,
+                        "original": sub_input[di],
+                        "value": sub_output[sj],
+                    }
+                )
+                if rops is not None:
+                    rops.append(
+                        {
+                            "op": "replace",
+                            "idx": sj + prefix,
+                            "original": sub_output[sj],
+                            "value": sub_input[di],
+                        }
+                    )
+            # After the hunk the cursors sit past its last deletion and
+            # insertion (or where the hunk started, without any).
+            if len(dels) > paired:
+                add_idx = (inss[-1] if inss else hunk_j - 1) + prefix
+                for di in dels[paired:]:
+                    ops.append({"op": "remove", "idx": di + prefix})
+                    if rops is not None:
+                        rops.append(
+                            {"op": "add", "idx": add_idx, "value": sub_input[di]}
+                        )
+            elif len(inss) > paired:
+                add_idx = (dels[-1] if dels else hunk_i - 1) + prefix
+                for sj in inss[paired:]:
+                    ops.append({"op": "add", "idx": add_idx, "value": sub_output[sj]})
+                    if rops is not None:
+                        rops.append({"op": "remove", "idx": sj + prefix})
+            continue
+        _emit_hunk(ops, sub_input, sub_output, dels, inss, pairs, hunk_i, prefix)
+        if rops is not None:
+            _emit_hunk(
+                rops,
+                sub_output,
+                sub_input,
+                inss,
+                dels,
+                [(sj, di) for di, sj in pairs],
+                hunk_j,
+                prefix,
             )
-            rops.append(
-                {
-                    "op": "replace",
-                    "idx": sj + prefix,
-                    "original": sub_output[sj],
-                    "value": sub_input[di],
-                }
+        kept_i, kept_j = hunk_i + len(dels), hunk_j + len(inss)
+    if key is not None:
+        _emit_kept(
+            ops,
+            rops,
+            sub_input,
+            sub_output,
+            kept_i,
+            kept_j,
+            len(sub_input),
+            prefix,
+            ctx,
+        )
+
+    if rops is None:
+        return _pad_ops(ops, m_full, ptr, ctx), []
+    return _pad_ops(ops, m_full, ptr, ctx), _pad_ops(rops, n_full, ptr, ctx)
+
+
+def _match_moves(
+    sub_input: list,
+    sub_output: list,
+    hunks: list[_Hunk],
+    key: ListKey | None,
+    ctx: _Context,
+) -> list[tuple[int, int]]:
+    """Pair deleted with inserted elements that are the same value (by
+    fingerprint) or, for keyed lists, the same record (by key).
+
+    Returns ascending `(deletion, insertion)` pairs; equal values pair
+    up in order. Elements without a fingerprint or key are never moved.
+    """
+    tag = key
+    if tag is None:
+        tag = ctx.fingerprints.digest
+    sources: dict[Any, list[int]] = {}
+    for dels, _, _, _ in hunks:
+        for i in dels:
+            if (item_tag := tag(sub_input[i])) is not None:
+                sources.setdefault(item_tag, []).append(i)
+    if not sources:
+        return []
+    for queue in sources.values():
+        queue.reverse()  # pop() from the end yields the first deletion
+    moved: list[tuple[int, int]] = []
+    for _, inss, _, _ in hunks:
+        for j in inss:
+            queue = sources.get(tag(sub_output[j]))
+            if queue:
+                moved.append((queue.pop(), j))
+    moved.sort()
+    return moved
+
+
+def _move_ops(
+    region: list,
+    moved: list[tuple[int, int]],
+    kept: list[tuple[int, int]],
+    prefix: int,
+    list_len: int,
+    ptr: Pointer,
+) -> tuple[list[Operation], list]:
+    """Return the move operations that put the `moved` elements of
+    `region` (the changed part of a list, starting at `prefix`) in
+    target order, and the region as it is after them.
+
+    `moved` and `kept` hold (source, target) index pairs. Each moved
+    element goes right after the element that precedes it in the target
+    among those that are kept or moved, so afterwards all of them are
+    in target order and align again.
+    """
+    placed = sorted([(j, i, False) for i, j in kept] + [(j, i, True) for i, j in moved])
+    tail = list_len - prefix - len(region)
+    order = list(range(len(region)))
+    ops: list[Operation] = []
+    anchor = -1
+    for _, i, is_moved in placed:
+        if is_moved:
+            from_idx = order.index(i)
+            del order[from_idx]
+            to_idx = order.index(anchor) + 1 if anchor >= 0 else 0
+            order.insert(to_idx, i)
+            if to_idx != from_idx:
+                ops.append(
+                    {
+                        "op": "move",
+                        "from": ptr.append(from_idx + prefix),
+                        "path": ptr.append(
+                            to_idx + prefix if to_idx < len(order) - 1 or tail else "-"
+                        ),
+                    }
+                )
+        anchor = i
+    return ops, [region[i] for i in order]
+
+
+def _diff_moved_lists(
+    input: list,
+    output: list,
+    prefix: int,
+    sub_input: list,
+    sub_output: list,
+    hunks: list[_Hunk],
+    moved: list[tuple[int, int]],
+    key: ListKey | None,
+    ptr: Pointer,
+    ctx: _Context,
+) -> tuple[list[Operation], list[Operation]]:
+    """Diff two lists with moves: first move the `moved` elements into
+    place, then diff the reordered list against the target as usual.
+    The reverse ops do the same starting from the output."""
+    kept: list[tuple[int, int]] = []
+    kept_i = kept_j = 0
+    for dels, inss, hunk_i, hunk_j in (*hunks, ([], [], len(sub_input), 0)):
+        kept.extend(
+            (kept_i + offset, kept_j + offset) for offset in range(hunk_i - kept_i)
+        )
+        kept_i, kept_j = hunk_i + len(dels), hunk_j + len(inss)
+
+    directions = [(input, output, sub_input, moved, kept)]
+    if ctx.reverse:
+        directions.append(
+            (
+                output,
+                input,
+                sub_output,
+                [(j, i) for i, j in moved],
+                [(j, i) for i, j in kept],
             )
-        if len(dels) > paired:
-            # After the hunk the output cursor sits past its last
-            # insertion (or where the hunk started, if it had none).
-            add_idx = (inss[-1] if inss else hunk_j - 1) + prefix
-            for di in dels[paired:]:
-                ops.append({"op": "remove", "idx": di + prefix})
-                rops.append({"op": "add", "idx": add_idx, "value": sub_input[di]})
-        elif len(inss) > paired:
-            add_idx = (dels[-1] if dels else hunk_i - 1) + prefix
-            for sj in inss[paired:]:
-                ops.append({"op": "add", "idx": add_idx, "value": sub_output[sj]})
-                rops.append({"op": "remove", "idx": sj + prefix})
-
-    return _pad_ops(ops, m_full, ptr), _pad_ops(rops, n_full, ptr)
+        )
+    results: list[list[Operation]] = []
+    # Each direction only takes the forward operations of its pass.
+    reverse = ctx.reverse
+    ctx.reverse = False
+    try:
+        for source, target, sub_source, pairs, aligned in directions:
+            ops, region = _move_ops(
+                sub_source, sorted(pairs), aligned, prefix, len(source), ptr
+            )
+            reordered = [
+                *source[:prefix],
+                *region,
+                *source[prefix + len(sub_source) :],
+            ]
+            # The moved elements now align, so this pass only has the
+            # remaining edits (and the changes inside moved records) left.
+            rest = _align_lists(reordered, target, key, ctx)
+            ops.extend(
+                _list_ops(
+                    rest[1],
+                    rest[2],
+                    rest[3],
+                    rest[0],
+                    len(reordered),
+                    len(target),
+                    key,
+                    ptr,
+                    ctx,
+                )[0]
+            )
+            results.append(ops)
+    finally:
+        ctx.reverse = reverse
+    return results[0], results[1] if reverse else []
+
+
+def diff_lists(
+    input: list, output: list, ptr: Pointer, ctx: _Context | None = None
+) -> tuple[list[Operation], list[Operation]]:
+    if ctx is None:
+        ctx = _Context()
+    try:
+        return _diff_lists(input, output, ptr, ctx)
+    except (ValueError, RecursionError):
+        # Some elements can't be compared with `==` (NumPy arrays, whose
+        # `==` is element-wise, or containers holding them, or values
+        # nested too deeply for it).
+        return _diff_lists(input, output, ptr, ctx.tolerant())
+
+
+def _diff_lists(
+    input: list, output: list, ptr: Pointer, ctx: _Context
+) -> tuple[list[Operation], list[Operation]]:
+    if ctx.paths is not None and (state := ctx.paths.state(ptr)) is not None:
+        return _diff_filtered_lists(input, output, ptr, ctx, state)
+    key = ctx.list_key(ptr)
+    prefix, sub_input, sub_output, hunks = _align_lists(input, output, key, ctx)
+    if not hunks and key is None:
+        # Equal lists (keyed ones may still differ inside their records).
+        return [], []
+    if ctx.moves and hunks:
+        moved = _match_moves(sub_input, sub_output, hunks, key, ctx)
+        if moved:
+            return _diff_moved_lists(
+                input,
+                output,
+                prefix,
+                sub_input,
+                sub_output,
+                hunks,
+                moved,
+                key,
+                ptr,
+                ctx,
+            )
+    return _list_ops(
+        sub_input,
+        sub_output,
+        hunks,
+        prefix,
+        len(input),
+        len(output),
+        key,
+        ptr,
+        ctx,
+    )
+
+
+def _diff_filtered_lists(
+    input: list, output: list, ptr: Pointer, ctx: _Context, state: Any
+) -> tuple[list[Operation], list[Operation]]:
+    """Diff two lists at a path at `state` (see `PathFilter`), below
+    which something is left out.
+
+    When the patterns only name the elements by wildcard, they all have
+    the same state, and the lists are aligned as usual, with elements
+    that only differ in what is left out counting as equal. When they
+    name elements by index, the elements are paired by position (see
+    `_diff_positional_lists`).
+    """
+    if state.positional:
+        return _diff_positional_lists(input, output, ptr, ctx, state)
+    element = state.other
+    if element is _LEFT_OUT:
+        return [], []
+
+    caller = ctx
+
+    def descend(
+        input: Any, output: Any, ptr: Pointer, ctx: _Context
+    ) -> tuple[list[Operation], list[Operation]]:
+        # The elements are diffed with the caller's context (in the
+        # directions asked for, see `_pad_ops`).
+        reverse = caller.reverse
+        caller.reverse = ctx.reverse
+        try:
+            return caller.descend(input, output, ptr, caller)
+        finally:
+            caller.reverse = reverse
+
+    list_ctx = copy(ctx)
+    list_ctx.paths = None
+    list_ctx.descend = descend
+    if element is not None:
+        list_ctx.equal = partial(
+            cast("PathFilter", ctx.paths).equal, element, ctx.equal
+        )
+        # Fingerprints cover what is left out too.
+        list_ctx.intern = False
+    return _diff_lists(input, output, ptr, list_ctx)
+
+
+def _diff_positional_lists(
+    input: list, output: list, ptr: Pointer, ctx: _Context, state: Any
+) -> tuple[list[Operation], list[Operation]]:
+    """Diff two lists whose elements the patterns name by index (see
+    `_diff_filtered_lists`): the elements at the same index are diffed
+    into, unless they are left out, and the elements only one list has
+    are removed or added, unless all of them are left out."""
+    ops: list[Operation] = []
+    rops: list[Operation] = []
+    equal = ctx.equal
+    step = state.step
+    common = min(len(input), len(output))
+    for index in range(common):
+        child = step(str(index))
+        input_item = input[index]
+        output_item = output[index]
+        if child is _LEFT_OUT or input_item is output_item:
+            continue
+        if child is None:
+            try:
+                if (
+                    input_item == output_item
+                    if equal is None
+                    else equal(input_item, output_item)
+                ):
+                    continue
+            except (ValueError, RecursionError):
+                pass
+        item_ops, item_rops = ctx.descend(
+            input_item, output_item, ptr.append(index), ctx
+        )
+        ops.extend(item_ops)
+        rops.extend(item_rops)
+    length = max(len(input), len(output))
+    if all(step(str(index)) is _LEFT_OUT for index in range(common, length)):
+        return ops, rops
+    # Removes at the end of a list all address the same index.
+    end_ptr = ptr.append(common)
+    dash_ptr = ptr.append("-")
+    ops.extend({"op": "remove", "path": end_ptr} for _ in input[common:])
+    ops.extend(
+        {"op": "add", "path": dash_ptr, "value": value} for value in output[common:]
+    )
+    if ctx.reverse:
+        rops.extend({"op": "remove", "path": end_ptr} for _ in output[common:])
+        rops.extend(
+            {"op": "add", "path": dash_ptr, "value": value} for value in input[common:]
+        )
+    return ops, rops
+
+
+def _diff_filtered_dicts(
+    input: dict, output: dict, ptr: Pointer, ctx: _Context, state: Any
+) -> tuple[list[Any], list[Any], list[Operation], list[list[Operation]]]:
+    """The walk of `diff_dicts` for dicts at a path at `state` (see
+    `PathFilter`), below which something is left out.
+
+    Keys that are left out are skipped before their values are looked
+    at. Values with something left out below them are diffed into
+    rather than compared, as `==` would compare all of them.
+
+    Returns the removed keys, the added keys, and the operations and
+    reverse operations of the common keys.
+    """
+    removed_keys: list[Any] = []
+    common_ops: list[Operation] = []
+    common_rops_chunks: list[list[Operation]] = []
+    equal = ctx.equal
+    step = state.step
+    for key, input_value in input.items():
+        child = step(key if key.__class__ is str else str(key))
+        if child is _LEFT_OUT:
+            continue
+        output_value = output.get(key, _NOTHING)
+        if output_value is _NOTHING:
+            removed_keys.append(key)
+            continue
+        if input_value is output_value:
+            continue
+        if child is None:
+            try:
+                if (
+                    input_value == output_value
+                    if equal is None
+                    else equal(input_value, output_value)
+                ):
+                    continue
+            except (ValueError, RecursionError):
+                # No truth value: _diff compares them again, and finds out.
+                pass
+        key_ops, key_rops = ctx.descend(input_value, output_value, ptr.append(key), ctx)
+        common_ops.extend(key_ops)
+        if key_rops:
+            common_rops_chunks.append(key_rops)
+    added_keys = [
+        key
+        for key in output
+        if key not in input
+        and step(key if key.__class__ is str else str(key)) is not _LEFT_OUT
+    ]
+    return removed_keys, added_keys, common_ops, common_rops_chunks
 
 
 def diff_dicts(
-    input: dict, output: dict, ptr: Pointer
+    input: dict, output: dict, ptr: Pointer, ctx: _Context | None = None
 ) -> tuple[list[Operation], list[Operation]]:
+    if ctx is None:
+        ctx = _Context()
     ops: list[Operation] = []
     input_only_rops: list[Operation] = []
     output_only_rops: list[Operation] = []
-    common_rops_chunks: list[list[Operation]] = []
 
-    input_keys = set(input.keys()) if input else set()
-    output_keys = set(output.keys()) if output else set()
     child_ptr = ptr.append
+    reverse = ctx.reverse
+    if ctx.paths is not None and (state := ctx.paths.state(ptr)) is not None:
+        removed_keys, added_keys, common_ops, common_rops_chunks = _diff_filtered_dicts(
+            input, output, ptr, ctx, state
+        )
+    else:
+        # A single walk over the input's items, in order, finds the
+        # removed keys and the changed values of common keys: equal
+        # values are skipped without a call or a child pointer, and
+        # shared subtrees (the common case for copy-on-write states) by
+        # identity, without comparing them at all. Walking the items in
+        # order rather than a set of keys also keeps the lookups in the
+        # output in memory order.
+        removed_keys = []
+        common_ops = []
+        common_rops_chunks = []
+        equal = ctx.equal
+        descend = ctx.descend
+        get = output.get
+        nothing = _NOTHING
+        for key, input_value in input.items():
+            output_value = get(key, nothing)
+            if output_value is nothing:
+                removed_keys.append(key)
+                continue
+            if input_value is output_value:
+                continue
+            try:
+                if equal is None:
+                    if input_value == output_value:
+                        continue
+                elif equal(input_value, output_value):
+                    continue
+            except (ValueError, RecursionError):
+                # No truth value: NumPy arrays (see _diff), or
+                # containers holding them, or nested too deeply.
+                if is_array(input_value) or is_array(output_value):
+                    # Known to differ: skip _diff's comparison.
+                    if ctx.limited:
+                        key_ops, key_rops = _diff_limited(
+                            input_value, output_value, child_ptr(key), ctx, _dispatch
+                        )
+                    else:
+                        key_ops, key_rops = _dispatch(
+                            input_value, output_value, child_ptr(key), ctx
+                        )
+                else:
+                    key_ops, key_rops = descend(
+                        input_value, output_value, child_ptr(key), ctx
+                    )
+            else:
+                key_ops, key_rops = descend(
+                    input_value, output_value, child_ptr(key), ctx
+                )
+            common_ops.extend(key_ops)
+            if key_rops:
+                common_rops_chunks.append(key_rops)
+        # Every output key is a common one unless the output has more.
+        added_keys = (
+            [key for key in output if key not in input]
+            if len(input) - len(removed_keys) < len(output)
+            else []
+        )
+    if not (removed_keys or added_keys or common_ops or common_rops_chunks):
+        return [], []
 
-    for key in input_keys - output_keys:
+    move_rops: list[Operation] = []
+    if ctx.moves and removed_keys and added_keys:
+        # A value that disappears under one key and appears under another
+        # is moved there (renamed) instead of removed and added again.
+        digest = ctx.fingerprints.digest
+        sources: dict[bytes, list[Any]] = {}
+        for key in removed_keys:
+            if (value_digest := digest(input[key])) is not None:
+                sources.setdefault(value_digest, []).append(key)
+        moved: set[Any] = set()
+        for key in added_keys:
+            if sources and (queue := sources.get(digest(output[key]))):
+                source_key = queue.pop()
+                ops.append(
+                    {
+                        "op": "move",
+                        "from": child_ptr(source_key),
+                        "path": child_ptr(key),
+                    }
+                )
+                if reverse:
+                    move_rops.append(
+                        {
+                            "op": "move",
+                            "from": child_ptr(key),
+                            "path": child_ptr(source_key),
+                        }
+                    )
+                # Removed and added keys never overlap.
+                moved.add(source_key)
+                moved.add(key)
+        move_rops.reverse()
+        if moved:
+            removed_keys = [key for key in removed_keys if key not in moved]
+            added_keys = [key for key in added_keys if key not in moved]
+
+    for key in removed_keys:
         key_ptr = child_ptr(key)
         ops.append({"op": "remove", "path": key_ptr})
-        input_only_rops.append({"op": "add", "path": key_ptr, "value": input[key]})
+        if reverse:
+            input_only_rops.append({"op": "add", "path": key_ptr, "value": input[key]})
     input_only_rops.reverse()
 
-    for key in output_keys - input_keys:
+    for key in added_keys:
         key_ptr = child_ptr(key)
         ops.append({"op": "add", "path": key_ptr, "value": output[key]})
-        output_only_rops.append({"op": "remove", "path": key_ptr})
+        if reverse:
+            output_only_rops.append({"op": "remove", "path": key_ptr})
     output_only_rops.reverse()
-
-    for key in input_keys & output_keys:
-        input_value = input[key]
-        output_value = output[key]
-        # Equal values recurse into an immediate empty result; checking
-        # here skips the call and the child pointer allocation, which is
-        # most of the work when few of many common keys changed.
-        if input_value == output_value:
-            continue
-        key_ops, key_rops = diff(input_value, output_value, child_ptr(key))
-        ops.extend(key_ops)
-        if key_rops:
-            common_rops_chunks.append(key_rops)
+    ops.extend(common_ops)
 
     # Match the historical insert(0,…) + key_rops.extend(rops) layering:
     # later common chunks went in front of earlier ones, and the input/output
@@ -270,82 +1469,646 @@ def diff_dicts(
         rops.extend(chunk)
     rops.extend(output_only_rops)
     rops.extend(input_only_rops)
+    rops.extend(move_rops)
     return ops, rops
 
 
 def diff_sets(
-    input: set, output: set, ptr: Pointer
+    input: set, output: set, ptr: Pointer, ctx: _Context | None = None
 ) -> tuple[list[Operation], list[Operation]]:
     ops: list[Operation] = []
     input_only_rops: list[Operation] = []
     output_only_rops: list[Operation] = []
 
+    removed = input - output
+    added = None
+    state = None if ctx is None or ctx.paths is None else ctx.paths.state(ptr)
+    if state is not None:
+        step = state.step
+        removed = {value for value in removed if step(str(value)) is not _LEFT_OUT}
+        added = {value for value in output - input if step(str(value)) is not _LEFT_OUT}
+        if not (removed or added):
+            return ops, []
+    elif not removed and len(input) == len(output):
+        # An input that loses nothing and is as large as the output is
+        # equal to it.
+        return ops, []
     # Pointers are immutable, so one "-" (append) pointer is shared by
     # every add operation on this set.
     dash_ptr = ptr.append("-")
     child_ptr = ptr.append
+    reverse = ctx is None or ctx.reverse
 
-    for value in input - output:
+    for value in removed:
         ops.append({"op": "remove", "path": child_ptr(value)})
-        input_only_rops.append({"op": "add", "path": dash_ptr, "value": value})
+        if reverse:
+            input_only_rops.append({"op": "add", "path": dash_ptr, "value": value})
     input_only_rops.reverse()
 
-    for value in output - input:
+    for value in output - input if added is None else added:
         ops.append({"op": "add", "path": dash_ptr, "value": value})
-        output_only_rops.append({"op": "remove", "path": child_ptr(value)})
+        if reverse:
+            output_only_rops.append({"op": "remove", "path": child_ptr(value)})
     output_only_rops.reverse()
 
     rops = output_only_rops + input_only_rops
     return ops, rops
 
 
+# Strings are compared this many characters at a time while looking for
+# their common prefix and suffix, which beats comparing every character
+# (in Python) by far.
+_PREFIX_CHUNK = 1024
+
+# Changed runs of at least this many characters (once trimmed) are
+# split around text that both sides have, so that edits far apart in
+# the same long line make splices of their own.
+_REFINE_LENGTH = 256
+
+# How many characters of such text the split looks for.
+_ANCHOR_LENGTH = 32
+
+
+def _prefix_length(a: str, b: str) -> int:
+    """Return the length of the common prefix of `a` and `b`."""
+    limit = min(len(a), len(b))
+    i = 0
+    while i < limit and a[i : i + _PREFIX_CHUNK] == b[i : i + _PREFIX_CHUNK]:
+        i += _PREFIX_CHUNK
+    stop = min(limit, i + _PREFIX_CHUNK)
+    i = min(i, limit)
+    while i < stop and a[i] == b[i]:
+        i += 1
+    return i
+
+
+def _hunks(script: list[tuple[str, int, int]]) -> list[list[int]]:
+    """Group an edit script into runs of consecutive edits, as ranges
+    `[i, i_stop, j, j_stop]` of both sides."""
+    hunks: list[list[int]] = []
+    for kind, i, j in script:
+        if not hunks or hunks[-1][1] != i or hunks[-1][3] != j:
+            hunks.append([i, i, j, j])
+        hunks[-1][1 if kind == "del" else 3] += 1
+    return hunks
+
+
+def _splice(
+    ops: list[Operation],
+    rops: list[Operation] | None,
+    input: str,
+    output: str,
+    a: int,
+    a_stop: int,
+    b: int,
+    b_stop: int,
+    ptr: Pointer,
+) -> int:
+    """Append the splices that turn `input[a:a_stop]` into
+    `output[b:b_stop]` (and back, to `rops`), trimmed to the characters
+    that differ, and return what the forward splices cost. Earlier
+    splices are applied by then, so the forward splice is at the
+    output's offset and the reverse one at the input's.
+
+    A long run is split around a piece of text that both sides have
+    (the piece at the middle of the input's run, or else at one of its
+    quarters, found with `str.find`), and both parts are spliced on
+    their own.
+    """
+    prefix = _prefix_length(input[a:a_stop], output[b:b_stop])
+    a += prefix
+    b += prefix
+    suffix = _prefix_length(input[a:a_stop][::-1], output[b:b_stop][::-1])
+    a_stop -= suffix
+    b_stop -= suffix
+    length = a_stop - a
+    if length >= _REFINE_LENGTH and b_stop - b >= _ANCHOR_LENGTH:
+        for i in (a + length // 2, a + length // 4, a + length * 3 // 4):
+            j = _find_anchor(input[i : i + _ANCHOR_LENGTH], output, b, b_stop, i - a)
+            if j >= 0:
+                return _splice(ops, rops, input, output, a, i, b, j, ptr) + _splice(
+                    ops,
+                    rops,
+                    input,
+                    output,
+                    i + _ANCHOR_LENGTH,
+                    a_stop,
+                    j + _ANCHOR_LENGTH,
+                    b_stop,
+                    ptr,
+                )
+    ops.append(
+        {
+            "op": "splice",
+            "path": ptr,
+            "offset": b,
+            "delete": a_stop - a,
+            "value": output[b:b_stop],
+        }
+    )
+    if rops is not None:
+        rops.append(
+            {
+                "op": "splice",
+                "path": ptr,
+                "offset": a,
+                "delete": b_stop - b,
+                "value": input[a:a_stop],
+            }
+        )
+    return b_stop - b + _SPLICE_COST
+
+
+def _find_anchor(anchor: str, output: str, b: int, b_stop: int, distance: int) -> int:
+    """Return where `anchor` is in `output[b:b_stop]` (the occurrence
+    nearest to `distance` characters in), or -1."""
+    expected = b + distance
+    after = output.find(anchor, expected, b_stop)
+    before = output.rfind(anchor, b, min(expected + len(anchor) - 1, b_stop))
+    if before < 0 or (after >= 0 and after - expected < expected - before):
+        return after
+    return before
+
+
+def diff_strings(
+    input: str, output: str, ptr: Pointer, ctx: _Context | None = None
+) -> tuple[list[Operation], list[Operation]]:
+    """Diff two strings into `splice` operations.
+
+    The lines that differ are found with `_myers_script`, and every run
+    of them becomes one splice, trimmed to the characters that differ:
+    a patch the size of the edit rather than of the string. Long runs
+    are split where they have text in common (see `_splice`), so edits
+    far apart in the same line get splices of their own too. The
+    strings are replaced wholesale when the splices would be no
+    smaller.
+    """
+    if ctx is None:
+        ctx = _Context()
+    ops: list[Operation] = []
+    rops: list[Operation] | None = [] if ctx.reverse else None
+    # Strip the common prefix and suffix (the latter without crossing
+    # into the former) first: most edits are local.
+    start = _prefix_length(input, output)
+    end = _prefix_length(input[start:][::-1], output[start:][::-1])
+    lines_a = input[start : len(input) - end].splitlines(keepends=True)
+    lines_b = output[start : len(output) - end].splitlines(keepends=True)
+    if len(lines_a) < 2 and len(lines_b) < 2:
+        size = _splice(
+            ops,
+            rops,
+            input,
+            output,
+            start,
+            len(input) - end,
+            start,
+            len(output) - end,
+            ptr,
+        )
+    else:
+        offsets_a = list(accumulate(map(len, lines_a), initial=start))
+        offsets_b = list(accumulate(map(len, lines_b), initial=start))
+        size = 0
+        for i, i_stop, j, j_stop in _hunks(_myers_script(lines_a, lines_b)):
+            size += _splice(
+                ops,
+                rops,
+                input,
+                output,
+                offsets_a[i],
+                offsets_a[i_stop],
+                offsets_b[j],
+                offsets_b[j_stop],
+                ptr,
+            )
+    if size >= len(output):
+        return _replace(input, output, ptr, ctx)
+    return ops, [] if rops is None else rops
+
+
+def _diff(
+    input: Any, output: Any, ptr: Pointer, ctx: _Context
+) -> tuple[list[Operation], list[Operation]]:
+    if input is output:
+        return [], []
+    walk = ctx.walk
+    if (
+        walk is not None
+        and len(ptr.tokens) >= walk.depth
+        and input.__class__ not in _LEAF_TYPES
+        and output.__class__ not in _LEAF_TYPES
+    ):
+        return walk.collect(input, output, ptr, ctx)
+    if ctx.paths is not None:
+        state = ctx.paths.state(ptr)
+        if state is _LEFT_OUT:
+            return [], []
+        cls = input.__class__
+        if state is not None and cls is output.__class__ and cls not in _ATOMIC_TYPES:
+            # Something below is left out, which `==` would compare too:
+            # diffing them leaves it out, and finds nothing for values
+            # that only differ there.
+            if ctx.limited:
+                return _diff_limited(input, output, ptr, ctx, _dispatch)
+            return _dispatch(input, output, ptr, ctx)
+    equal = ctx.equal
+    try:
+        if equal is None:
+            cls = input.__class__
+            if cls is output.__class__ and cls in _WALKED_TYPES:
+                # Below the root, these only get here once their parent
+                # found them unequal (in the common-key loop of
+                # diff_dicts, or paired by a list's edit script); at the
+                # root, diffing them compares their children anyway and
+                # finds nothing for equal ones. Comparing them here
+                # would only walk them twice.
+                pass
+            elif input == output:
+                return [], []
+        elif equal(input, output):
+            return [], []
+    except (ValueError, RecursionError):
+        # `==` on NumPy arrays is element-wise and has no truth value (nor
+        # has it on containers holding them), and values nested deeper
+        # than `==` recurses can't be compared at all: arrays are diffed
+        # element-wise, anything else as usual, by the dispatch below.
+        pass
+    if ctx.limited:
+        return _diff_limited(input, output, ptr, ctx, _dispatch)
+    return _dispatch(input, output, ptr, ctx)
+
+
+# A handler of `_dispatcher`, which gets the values, where they are (a
+# pointer, or whatever the handlers need in its place) and the context.
+type _Handler[At] = Callable[[Any, Any, At, _Context], Any]
+
+
+def _dispatcher[At](
+    dicts: _Handler[At],
+    lists: _Handler[At],
+    sets: _Handler[At],
+    strings: _Handler[At],
+    arrays: _Handler[At],
+    replace: _Handler[At],
+) -> _Handler[At]:
+    """Return a function that hands two values that are known to differ
+    to one of the handlers, by their types, the way `diff` diffs them:
+    `strings` takes long enough strings (with `splice_strings`), and
+    `replace` whatever `diff` replaces wholesale.
+
+    `_dispatch` is the one with the diffs of each kind;
+    `compare._look_into` and `diff_stats` walk the same way with
+    handlers of their own.
+    """
+    # The handler of each kind of registered type (see `TypeAdapter.kind`).
+    kinds = {"dict": dicts, "list": lists, "set": sets}
+
+    def dispatch(input: Any, output: Any, ptr: At, ctx: _Context) -> Any:
+        # Exact-class dispatch first (the overwhelmingly common case),
+        # with an atomic-type short-circuit, then the registered types
+        # (a single lookup); the hasattr chain below stays as the
+        # fallback for container look-alikes such as observ proxies.
+        input_cls = input.__class__
+        output_cls = output.__class__
+        if input_cls is output_cls:
+            if input_cls is dict:
+                return dicts(input, output, ptr, ctx)
+            if input_cls is list:
+                return lists(input, output, ptr, ctx)
+            if input_cls is set:
+                return sets(input, output, ptr, ctx)
+            if input_cls is str:
+                if (
+                    ctx.splice_strings is not None
+                    and max(len(input), len(output)) >= ctx.splice_strings
+                ):
+                    return strings(input, output, ptr, ctx)
+            elif input_cls is tuple or input_cls is frozenset:
+                if ctx.immutables:
+                    if input_cls is tuple:
+                        return lists(input, output, ptr, ctx)
+                    return sets(input, output, ptr, ctx)
+            elif input_cls not in _ATOMIC_TYPES and (adapter := _adapters[input_cls]):
+                if view := adapter.view:
+                    input, output = view(input), view(output)
+                return kinds[adapter.kind](input, output, ptr, ctx)
+        if input_cls not in _ATOMIC_TYPES and output_cls not in _ATOMIC_TYPES:
+            if hasattr(input, "append") and hasattr(output, "append"):  # list
+                return lists(input, output, ptr, ctx)
+            if hasattr(input, "keys") and hasattr(output, "keys"):  # dict
+                return dicts(input, output, ptr, ctx)
+            if hasattr(input, "add") and hasattr(output, "add"):  # set
+                return sets(input, output, ptr, ctx)
+            if is_array(input) or is_array(output):
+                return arrays(input, output, ptr, ctx)
+        return replace(input, output, ptr, ctx)
+
+    return dispatch
+
+
+def _diff_arrays(
+    input: Any, output: Any, ptr: Pointer, ctx: _Context
+) -> tuple[list[Operation], list[Operation]]:
+    """`diff_arrays`, with the context's options."""
+    return diff_arrays(input, output, ptr, ctx.reverse, ctx.replace_ratio)
+
+
+# Diff two values that are known to differ, by their types.
+_dispatch = _dispatcher(
+    diff_dicts, diff_lists, diff_sets, diff_strings, _diff_arrays, _replace
+)
+
+
+def _options(
+    ptr: Pointer,
+    trust_identity: bool,
+    eq: Callable[[Any, Any], bool] | None,
+    rel_tol: float | None,
+    abs_tol: float | None,
+    key: ListKey | Mapping[str | Pointer, ListKey] | None,
+    moves: bool,
+    algorithm: ListAlgorithm,
+    pairing: ListPairing,
+    reverse: bool,
+    max_depth: int | None,
+    max_ops_per_node: int | None,
+    replace_ratio: float | None,
+    splice_strings: int | None,
+    immutables: bool,
+    include: PathPatterns | None,
+    exclude: PathPatterns | None,
+) -> dict[str, Any]:
+    """Return the `_Context` keyword arguments for the options of a
+    `diff` (or `iter_diff`) call from `ptr`."""
+    if max_depth is not None:
+        if max_depth < 1:
+            raise ValueError(f"max_depth must be at least 1, not {max_depth}")
+        max_depth += len(ptr.tokens)
+    return {
+        "trust_identity": trust_identity,
+        "eq": eq,
+        "rel_tol": rel_tol,
+        "abs_tol": abs_tol,
+        "key": key,
+        "moves": moves,
+        "algorithm": algorithm,
+        "reverse": reverse,
+        "max_depth": max_depth,
+        "max_ops": max_ops_per_node,
+        "replace_ratio": replace_ratio,
+        "root_depth": len(ptr.tokens),
+        "splice_strings": splice_strings,
+        "immutables": immutables,
+        "pairing": pairing,
+        "paths": (
+            None
+            if include is None and exclude is None
+            else PathFilter(include, exclude)
+        ),
+    }
+
+
 def diff(
-    input: Diffable, output: Diffable, ptr: Pointer | None = None
+    input: Diffable,
+    output: Diffable,
+    ptr: Pointer | None = None,
+    **options: Unpack[DiffOptions],
 ) -> tuple[list[Operation], list[Operation]]:
     """Compute the difference between two objects as JSON patch operations.
 
     Recursively compares `input` and `output` and returns operations in
-    both directions. Dicts, lists and sets are compared structurally;
-    any other value (scalars, but also tuples and frozensets) is treated
-    as atomic and replaced wholesale when it differs.
+    both directions. Dicts, lists and sets are compared structurally,
+    and so are values of registered types (see
+    [`register`][patchdiff.registry.register]), NumPy arrays
+    element-wise (with `replace` operations on ranges of elements); any
+    other value (scalars, but also tuples and frozensets, unless
+    `immutables` is set) is treated as atomic and replaced wholesale
+    when it differs.
 
     Args:
         input: The source object.
         output: The target object.
         ptr: Pointer prefix for the emitted operations; used internally
             during recursion. Leave as `None` to diff from the root.
+        **options: The keyword arguments below (see
+            [`DiffOptions`][patchdiff.diff.DiffOptions]).
+
+    Keyword Args:
+        fingerprints: Decide subtree equality by structural fingerprint
+            instead of `==`. Every level of the recursion otherwise
+            re-compares the subtrees below it, so a leaf at depth d is
+            compared up to d times; with fingerprints each node is
+            hashed once and every later check is O(1). Hashing costs
+            about a hundred times as much as a C-level `==`, though:
+            pass a [`Fingerprints`][patchdiff.fingerprint.Fingerprints]
+            cache and reuse it across calls on documents that aren't
+            mutated in between, so that only the first call pays for
+            it. `True` makes fingerprints for this call only, which
+            only pays off for documents nested hundreds of levels deep.
+        trust_identity: Treat containers as changed unless they are the
+            very same object, without comparing them. Meant for
+            persistent (copy-on-write) states, where an update copies
+            the containers along the changed path and shares everything
+            else: the cost of the diff then scales with the copied path
+            rather than the document. Equal but distinct containers are
+            diffed into, which still yields a correct patch, but lists
+            may align less tightly than with full comparisons.
+        eq: Compare values with this function instead of `==`: it is
+            given the pairs of values that aren't dicts, lists, tuples
+            or values of registered types (which are compared by
+            walking them), such as two numbers, and returns whether
+            they are equal. Every comparison of the diff uses it, so
+            values it finds equal get no operations.
+        rel_tol: Compare floats (with each other and with ints) with
+            `math.isclose` with this relative tolerance, and count NaN
+            as equal to NaN. Other values are still compared with `eq`
+            (or `==`). Pass `rel_tol=0` (or `abs_tol=0`) for exact
+            comparisons in which NaN equals NaN.
+        abs_tol: The absolute tolerance of those comparisons, for values
+            near zero.
+        key: Match list elements by key instead of by value: a function
+            from element to key (such as `lambda record: record["id"]`)
+            for every list, or a mapping from list path (a JSON pointer
+            string or [`Pointer`][patchdiff.pointer.Pointer]) to key
+            function for specific lists. Elements with the same key are
+            aligned and diffed into; the rest become plain adds and
+            removes, rather than replaces between unrelated records.
+        moves: Emit `move` operations for values that changed place
+            instead of removing them and adding them again: list
+            elements that were reordered, and dict values that are now
+            under a different key of the same dict. Values match by
+            fingerprint, or by key for keyed lists (moved records are
+            then diffed into as well). Moves keep a patch for a
+            reordered list of large records small, as it no longer
+            holds copies of the records.
+        algorithm: How lists are aligned. `"myers"` (the default) finds
+            a minimal edit script, but gives up on lists that share
+            less than a quarter of their elements and pairs them up
+            element by element. `"patience"` anchors the alignment on
+            elements that occur once in both lists and finds good
+            alignments for such lists too, at near-linear cost, at the
+            price of patches that aren't always minimal.
+        pairing: Which deleted and inserted elements in a changed
+            stretch of a list pair up as replaces, and are diffed
+            into. `"position"` (the default) pairs them in order.
+            `"similarity"` pairs dicts with dicts and lists with lists
+            that have at least half of their items in common, the most
+            similar ones first (and scalars with scalars), so that a
+            record inserted in front of an edited one doesn't pair
+            with it; the rest become plain removes and adds. Stretches
+            with too many candidate pairs are still paired in order.
+        reverse: Build the reverse operations. Pass `False` when only
+            the forward patch is needed: the reverse operations are
+            about half the work of a diff (lists are aligned and
+            diffed into from both sides), and the second list of the
+            result is then left empty.
+        max_depth: Replace the values that differ at this depth below
+            `ptr` wholesale, instead of diffing into them: `1` diffs
+            the top-level container but none of its children, `2` its
+            children but not theirs, and so on. The diff doesn't
+            descend any further, which bounds its cost too.
+        max_ops_per_node: Replace a container wholesale when diffing it
+            would take more than this many operations (counting the
+            operations of everything below it).
+        replace_ratio: Replace a container wholesale when its
+            operations would be larger than this fraction of its new
+            value, counting an operation and every container and scalar
+            in the values it holds as one each (strings once per 32
+            characters, and NumPy arrays once per element). With `0.5`,
+            a record of which more than half
+            changed becomes a single `replace`. For NumPy arrays, this
+            replaces the default ratio of their own cost model.
+
+            The top-level container is always diffed into, whatever
+            these limits, as a patch can't replace it.
+        splice_strings: Diff strings of at least this many characters
+            (on either side) into `splice` operations, which replace
+            `"delete"` characters from `"offset"` on by the `"value"`
+            text: only what changed in a long text, rather than all of
+            it. Splices are an extension to JSON patch that
+            [`iapply`][patchdiff.apply.iapply] understands, but other
+            JSON patch implementations don't.
+        immutables: Diff tuples like lists (by position) and frozensets
+            like sets, rather than replacing them wholesale, so that a
+            patch for a long tuple holds what changed rather than the
+            whole tuple. [`iapply`][patchdiff.apply.iapply] builds a new
+            tuple or frozenset for such operations, and writes it in
+            place of the old one.
+        include: Only diff the values at these paths (and below them),
+            given as JSON pointers (strings or
+            [`Pointer`][patchdiff.pointer.Pointer]s) that match the
+            paths of the operations (`ptr` included), in which a `*`
+            token matches any key or list index, such as
+            `"/users/*/name"`. Everything else is left out of the diff,
+            except the containers on the way to an included path.
+        exclude: Leave the values at these paths (patterns as for
+            `include`) out of the diff, even when included: the patch
+            doesn't change them, and values that only differ there
+            count as equal. Dict entries that are left out are never
+            compared or visited; list elements are compared with `==`
+            first. Patterns that name list elements by index pair the
+            elements by position rather than aligning them. Values that
+            are added or replaced whole are kept whole, with what is
+            left out inside them.
+        workers: Diff the subtrees below the top-level dict or list in
+            this many worker processes, or on the given
+            `concurrent.futures.Executor` (such as a
+            `ProcessPoolExecutor` kept around for repeated calls). The
+            operations are the same as without workers, in the same
+            order, but their values are copies of the output's values
+            rather than the values themselves. Pairs of unchanged
+            children are never sent to a worker, and diffs with too
+            little left to do run in this process. Key functions must
+            be picklable (module-level functions, not lambdas), and a
+            [`Fingerprints`][patchdiff.fingerprint.Fingerprints] cache
+            is only used for the top-level container.
 
     Returns:
         A tuple `(ops, reverse_ops)`: applying `ops` to `input` yields
         `output`, and applying `reverse_ops` to `output` yields `input`
-        again. Each operation is a dict with an `"op"` key (`"add"`,
-        `"remove"` or `"replace"`), a `"path"` key holding a
-        [`Pointer`][patchdiff.pointer.Pointer], and a `"value"` key for
-        add/replace operations.
+        again (`reverse_ops` is empty with `reverse=False`). Each
+        operation is a dict with an `"op"` key (`"add"`, `"remove"`,
+        `"replace"` or `"move"`), a `"path"` key holding a
+        [`Pointer`][patchdiff.pointer.Pointer], a `"value"` key for
+        add/replace operations and a `"from"` pointer for moves.
     """
-    if input == output:
-        return [], []
+    if options:
+        return _diff_with_options(input, output, ptr, **options)
+    # Every option is at its default: the common call, and one that is
+    # often made on small values. Equal values and scalars are settled
+    # without setting up a context (or even a pointer, for equal ones).
+    try:
+        if input is output or input == output:
+            return [], []
+    except (ValueError, RecursionError):
+        # See `_diff`.
+        pass
     if ptr is None:
         ptr = Pointer()
-    # Exact-class dispatch first (the overwhelmingly common case), with
-    # an atomic-type short-circuit; the hasattr chain below stays as the
-    # fallback for container look-alikes such as observ proxies.
-    input_cls = input.__class__
-    output_cls = output.__class__
-    if input_cls is output_cls:
-        if input_cls is dict:
-            return diff_dicts(cast("dict", input), cast("dict", output), ptr)
-        if input_cls is list:
-            return diff_lists(cast("list", input), cast("list", output), ptr)
-        if input_cls is set:
-            return diff_sets(cast("set", input), cast("set", output), ptr)
-    if input_cls not in _ATOMIC_TYPES and output_cls not in _ATOMIC_TYPES:
-        if hasattr(input, "append") and hasattr(output, "append"):  # list
-            return diff_lists(cast("list", input), cast("list", output), ptr)
-        if hasattr(input, "keys") and hasattr(output, "keys"):  # dict
-            return diff_dicts(cast("dict", input), cast("dict", output), ptr)
-        if hasattr(input, "add") and hasattr(output, "add"):  # set
-            return diff_sets(cast("set", input), cast("set", output), ptr)
-    return [{"op": "replace", "path": ptr, "value": output}], [
-        {"op": "replace", "path": ptr, "value": input}
-    ]
+    if input.__class__ in _LEAF_TYPES or output.__class__ in _LEAF_TYPES:
+        return [{"op": "replace", "path": ptr, "value": output}], [
+            {"op": "replace", "path": ptr, "value": input}
+        ]
+    return _walk(input, output, ptr, _Context())
+
+
+def _diff_with_options(
+    input: Diffable,
+    output: Diffable,
+    ptr: Pointer | None,
+    *,
+    fingerprints: Fingerprints | bool = False,
+    trust_identity: bool = False,
+    eq: Callable[[Any, Any], bool] | None = None,
+    rel_tol: float | None = None,
+    abs_tol: float | None = None,
+    key: ListKey | Mapping[str | Pointer, ListKey] | None = None,
+    moves: bool = False,
+    algorithm: ListAlgorithm = "myers",
+    pairing: ListPairing = "position",
+    reverse: bool = True,
+    max_depth: int | None = None,
+    max_ops_per_node: int | None = None,
+    replace_ratio: float | None = None,
+    splice_strings: int | None = None,
+    immutables: bool = False,
+    include: PathPatterns | None = None,
+    exclude: PathPatterns | None = None,
+    workers: int | Executor | None = None,
+) -> tuple[list[Operation], list[Operation]]:
+    """`diff` with options (keyword arguments that spell out their
+    defaults count too, which gives the same result)."""
+    if ptr is None:
+        ptr = Pointer()
+    if fingerprints is True:
+        fingerprints = Fingerprints(maxsize=None)
+    options = _options(
+        ptr,
+        trust_identity,
+        eq,
+        rel_tol,
+        abs_tol,
+        key,
+        moves,
+        algorithm,
+        pairing,
+        reverse,
+        max_depth,
+        max_ops_per_node,
+        replace_ratio,
+        splice_strings,
+        immutables,
+        include,
+        exclude,
+    )
+    ctx = _Context(
+        fingerprints if isinstance(fingerprints, Fingerprints) else None, **options
+    )
+    if workers is not None:
+        # Imported here: the parallel engine is built on this module.
+        from .parallel import diff_parallel
+
+        return diff_parallel(
+            input, output, ptr, ctx, (fingerprints is not False, options), workers
+        )
+    return _walk(input, output, ptr, ctx)
@@ -0,0 +1,341 @@
+"""Edit scripts: the deletions and insertions that turn one sequence
+into another, for `diff` to align lists (and the lines of strings)
+with.
+
+`_myers_script` finds a shortest one, switching to linear space for
+long ones (`_linear_myers_script`); `_patience_script` anchors on the
+elements that occur once on both sides, which finds good scripts for
+sequences with little in common, but not always the shortest.
+"""
+
+from __future__ import annotations
+
+from bisect import bisect_left
+from collections.abc import Callable
+from itertools import count
+from typing import Any
+
+# Edit distance above which _myers_script stops keeping the O(D²) trace
+# for its backtrack and finishes in linear space instead (a trace for
+# D = 1024 holds about a million entries).
+_MAX_TRACE_COST = 1024
+
+
+def _myers_script(
+    a: list, b: list, equal: Callable[[Any, Any], bool] | None = None
+) -> list[tuple[str, int, int]]:
+    """Compute a shortest edit script between a and b with Myers' greedy
+    algorithm (An O(ND) Difference Algorithm and Its Variations, 1986).
+
+    Returns forward-ordered entries ("del", i, j) / ("ins", i, j) where
+    (i, j) are the pre-operation cursors: "del" removes a[i] while the
+    output cursor is at j, "ins" inserts b[j] at input cursor i. Runs of
+    equal elements produce no entries. Elements are compared with
+    `equal`, or with `is`/`==` when it is `None`.
+
+    Time is O((m+n)·D) and memory O(D²) for D actual differences, so
+    nearly-equal lists are cheap regardless of their size. Once D
+    exceeds `_MAX_TRACE_COST` the search restarts in linear space (see
+    `_linear_myers_script`), which finds an equally short script. To
+    keep the
+    worst case (barely anything in common) from degenerating into a
+    quadratic search for a shortest script nobody benefits from, the
+    search gives up once D exceeds half the combined length — the lists
+    then share less than a quarter of their elements, and the whole
+    region is emitted as a single hunk (which the replace pairing turns
+    into element-wise replaces, exactly what the old DP produced for
+    such inputs). Small regions are always solved exactly.
+    """
+    m, n = len(a), len(b)
+    if not m:
+        return [("ins", 0, j) for j in range(n)]
+    if not n:
+        return [("del", i, 0) for i in range(m)]
+
+    max_cost = (m + n) // 2
+    if max_cost < 64:
+        max_cost = m + n  # always exact below the cutoff floor
+
+    # v[offset + k] = furthest x reached on diagonal k (k = x - y) with
+    # the current number of edits d.
+    offset = m + n
+    v = [0] * (2 * offset + 2)
+    trace = []
+    d_final = -1
+    for d in range(offset + 1):
+        if d > max_cost:
+            # Too expensive: emit the whole region as one hunk.
+            return [("del", i, 0) for i in range(m)] + [("ins", m, j) for j in range(n)]
+        if d > _MAX_TRACE_COST:
+            return _linear_myers_script(a, b, equal, max_cost)
+        # Snapshot the diagonals the backtrack for round d needs (the
+        # state after round d-1); only [-d, d] is ever read.
+        trace.append(v[offset - d : offset + d + 1])
+        lo, hi = offset - d, offset + d
+        for vi in range(lo, hi + 1, 2):  # vi = offset + k
+            if vi == lo or (vi != hi and v[vi - 1] < v[vi + 1]):
+                x = v[vi + 1]  # step down: insertion
+            else:
+                x = v[vi - 1] + 1  # step right: deletion
+            y = x - vi + offset  # y = x - k
+            # Follow the snake.
+            if equal is None:
+                while x < m and y < n and (a[x] is b[y] or a[x] == b[y]):
+                    x += 1
+                    y += 1
+            else:
+                while x < m and y < n and (a[x] is b[y] or equal(a[x], b[y])):
+                    x += 1
+                    y += 1
+            v[vi] = x
+            if x >= m and y >= n:
+                d_final = d
+                break
+        if d_final >= 0:
+            break
+
+    # Backtrack from (m, n) to (0, 0), emitting one edit per round.
+    script: list[tuple[str, int, int]] = []
+    x, y = m, n
+    for d in range(d_final, 0, -1):
+        vprev = trace[d]  # covers k in [-d, d]; index with k + d
+        k = x - y
+        if k == -d or (k != d and vprev[k - 1 + d] < vprev[k + 1 + d]):
+            prev_k = k + 1  # arrived by insertion
+        else:
+            prev_k = k - 1  # arrived by deletion
+        prev_x = vprev[prev_k + d]
+        prev_y = prev_x - prev_k
+        if prev_k == k + 1:
+            script.append(("ins", prev_x, prev_y))
+        else:
+            script.append(("del", prev_x, prev_y))
+        x, y = prev_x, prev_y
+    script.reverse()
+    return script
+
+
+def _identical_or_equal(a: Any, b: Any) -> bool:
+    return a is b or a == b
+
+
+def _patience_script(
+    a: list,
+    b: list,
+    equal: Callable[[Any, Any], bool] | None,
+    tag: Callable[[Any], Any],
+) -> list[tuple[str, int, int]]:
+    """Compute an edit script with patience diff, in the same format as
+    `_myers_script`.
+
+    Elements that occur exactly once in both lists (by `tag`, a hashable
+    stand-in for the element) are candidate anchors; the longest run of
+    them that is in the same order on both sides is kept, and the
+    regions between anchors are solved the same way. Regions without
+    unique elements fall back to `_myers_script`.
+
+    Each level costs time linear in its region, so lists with little in
+    common align around their unique elements at near-linear cost,
+    where `_myers_script` would give up on them. The script need not be
+    a shortest one.
+    """
+    same = _identical_or_equal if equal is None else equal
+    tags_a = [tag(item) for item in a]
+    tags_b = [tag(item) for item in b]
+    script: list[tuple[str, int, int]] = []
+    # Regions still to solve, the next one on top, so the script comes
+    # out in order.
+    stack = [(0, len(a), 0, len(b))]
+    while stack:
+        x0, x1, y0, y1 = stack.pop()
+        while x0 < x1 and y0 < y1 and same(a[x0], b[y0]):
+            x0 += 1
+            y0 += 1
+        while x1 > x0 and y1 > y0 and same(a[x1 - 1], b[y1 - 1]):
+            x1 -= 1
+            y1 -= 1
+        if x0 == x1:
+            script.extend(("ins", x0, j) for j in range(y0, y1))
+            continue
+        if y0 == y1:
+            script.extend(("del", i, y0) for i in range(x0, x1))
+            continue
+
+        # Index of each tag's only occurrence, -1 for repeated tags.
+        unique_a: dict[Any, int] = {}
+        for i in range(x0, x1):
+            if (item_tag := tags_a[i]) is not None:
+                unique_a[item_tag] = -1 if item_tag in unique_a else i
+        unique_b: dict[Any, int] = {}
+        for j in range(y0, y1):
+            if (item_tag := tags_b[j]) is not None and item_tag in unique_a:
+                unique_b[item_tag] = -1 if item_tag in unique_b else j
+        pairs = sorted(
+            (unique_a[item_tag], j)
+            for item_tag, j in unique_b.items()
+            if j >= 0 and unique_a[item_tag] >= 0
+        )
+        if not pairs:
+            sub_script = _myers_script(a[x0:x1], b[y0:y1], equal)
+            script.extend((kind, i + x0, j + y0) for kind, i, j in sub_script)
+            continue
+
+        # Longest increasing subsequence of the pairs' j (patience
+        # sorting): tails[k] is the smallest j ending an increasing run
+        # of length k + 1, ends[k] the pair it belongs to.
+        tails: list[int] = []
+        ends: list[int] = []
+        previous = [-1] * len(pairs)
+        for p, (_, j) in enumerate(pairs):
+            k = bisect_left(tails, j)
+            if k:
+                previous[p] = ends[k - 1]
+            if k == len(tails):
+                tails.append(j)
+                ends.append(p)
+            else:
+                tails[k] = j
+                ends[k] = p
+        anchors = []
+        p = ends[-1]
+        while p >= 0:
+            anchors.append(pairs[p])
+            p = previous[p]
+        # anchors runs backwards, so pushing the regions between them in
+        # this order leaves the first region on top.
+        for i, j in anchors:
+            stack.append((i + 1, x1, j + 1, y1))
+            x1, y1 = i, j
+        stack.append((x0, x1, y0, y1))
+    return script
+
+
+def _middle_snake(
+    a: list,
+    b: list,
+    x0: int,
+    x1: int,
+    y0: int,
+    y1: int,
+    equal: Callable[[Any, Any], bool] | None,
+    max_cost: int,
+) -> tuple[int, int, int] | None:
+    """Find the middle snake of a shortest edit script between a[x0:x1]
+    and b[y0:y1] by searching from both ends at once (section 4b of
+    Myers' paper), in space linear in the lengths.
+
+    Returns `(d, x, y)`: the script's length and the (absolute) point
+    where the middle snake starts, which lies on a shortest path and
+    splits it into halves of cost ⌈d/2⌉ and ⌊d/2⌋. Returns `None` when
+    the script is longer than `max_cost`.
+    """
+    n, m = x1 - x0, y1 - y0
+    delta = n - m
+    odd = delta & 1
+    offset = (n + m + 1) // 2 + 1
+    # vf[offset + k]: furthest x on diagonal k (k = x - y) going forward;
+    # vb the same for the search from the end, in reversed coordinates
+    # where diagonal k corresponds to forward diagonal delta - k.
+    vf = [0] * (2 * offset + 1)
+    vb = [0] * (2 * offset + 1)
+    # The searches meet by round (n + m + 1) // 2 at the latest.
+    for d in count():
+        if 2 * d - 1 > max_cost:
+            return None
+        for k in range(-d, d + 1, 2):
+            vi = offset + k
+            if k == -d or (k != d and vf[vi - 1] < vf[vi + 1]):
+                x = vf[vi + 1]
+            else:
+                x = vf[vi - 1] + 1
+            y = x - k
+            start_x = x
+            if equal is None:
+                while (
+                    x < n
+                    and y < m
+                    and (a[x0 + x] is b[y0 + y] or a[x0 + x] == b[y0 + y])
+                ):
+                    x += 1
+                    y += 1
+            else:
+                while x < n and y < m and equal(a[x0 + x], b[y0 + y]):
+                    x += 1
+                    y += 1
+            vf[vi] = x
+            if odd and -d < delta - k < d and x + vb[offset + delta - k] >= n:
+                return 2 * d - 1, x0 + start_x, y0 + start_x - k
+        for k in range(-d, d + 1, 2):
+            vi = offset + k
+            if k == -d or (k != d and vb[vi - 1] < vb[vi + 1]):
+                x = vb[vi + 1]
+            else:
+                x = vb[vi - 1] + 1
+            y = x - k
+            if equal is None:
+                while (
+                    x < n
+                    and y < m
+                    and (
+                        a[x1 - 1 - x] is b[y1 - 1 - y] or a[x1 - 1 - x] == b[y1 - 1 - y]
+                    )
+                ):
+                    x += 1
+                    y += 1
+            else:
+                while x < n and y < m and equal(a[x1 - 1 - x], b[y1 - 1 - y]):
+                    x += 1
+                    y += 1
+            vb[vi] = x
+            if not odd and -d <= delta - k <= d and x + vf[offset + delta - k] >= n:
+                return 2 * d, x1 - x, y1 - y
+
+
+def _linear_myers_script(
+    a: list,
+    b: list,
+    equal: Callable[[Any, Any], bool] | None,
+    max_cost: int,
+) -> list[tuple[str, int, int]]:
+    """Compute a shortest edit script like `_myers_script`, in O(m+n)
+    space: split the problem at the middle snake and solve both halves
+    recursively (Myers, section 4b). Takes O((m+n)·D) time, like the
+    greedy search, with a constant factor of about two.
+
+    Scripts are equally short but may align differently where several
+    shortest scripts exist. Gives up like `_myers_script` once the
+    script would be longer than `max_cost`.
+    """
+    m, n = len(a), len(b)
+    split = _middle_snake(a, b, 0, m, 0, n, equal, max_cost)
+    if split is None:
+        return [("del", i, 0) for i in range(m)] + [("ins", m, j) for j in range(n)]
+
+    script: list[tuple[str, int, int]] = []
+    same = _identical_or_equal if equal is None else equal
+
+    def solve(x0: int, x1: int, y0: int, y1: int) -> None:
+        # Strip what the region has in common at either end; after that
+        # a non-empty region on both sides costs at least 2, and each
+        # half of the split costs strictly less than the whole.
+        while x0 < x1 and y0 < y1 and same(a[x0], b[y0]):
+            x0 += 1
+            y0 += 1
+        while x1 > x0 and y1 > y0 and same(a[x1 - 1], b[y1 - 1]):
+            x1 -= 1
+            y1 -= 1
+        if x0 == x1:
+            script.extend(("ins", x0, j) for j in range(y0, y1))
+        elif y0 == y1:
+            script.extend(("del", i, y0) for i in range(x0, x1))
+        else:
+            split = _middle_snake(a, b, x0, x1, y0, y1, equal, x1 - x0 + y1 - y0)
+            assert split is not None
+            _, x, y = split
+            solve(x0, x, y0, y)
+            solve(x, x1, y, y1)
+
+    _, x, y = split
+    solve(0, x, 0, y)
+    solve(x, m, y, n)
+    return script
@@ -0,0 +1,265 @@
+"""Structural fingerprints: Merkle-style digests of nested values.
+
+A container's fingerprint is a hash over the encodings of its children,
+where child containers contribute their own (cached) fingerprint rather
+than their contents. Computing the fingerprint of a document therefore
+visits every node once, bottom-up, and afterwards deciding whether any
+two of its subtrees are equal is a single digest comparison, however
+deep they are.
+"""
+
+from __future__ import annotations
+
+from hashlib import blake2b
+from itertools import chain, islice
+from math import isnan
+from typing import Any
+
+# Containers that get a fingerprint. Sets and frozensets compare equal
+# to each other and share a tag; lists and tuples never compare equal
+# and don't.
+_CONTAINER_TAGS = {
+    dict: b"D",
+    list: b"L",
+    tuple: b"T",
+    set: b"S",
+    frozenset: b"S",
+}
+
+_DIGEST_SIZE = 16
+
+
+def _encode_scalar(value: Any) -> bytes | None:
+    """Encode a scalar so that equal values (as in `==`) get equal
+    encodings, or return `None` when no such encoding exists.
+
+    Every encoding is self-delimiting, so the concatenated encodings of
+    a container's children are unambiguous.
+    """
+    cls = value.__class__
+    if cls is str:
+        data = value.encode("utf-8", "surrogatepass")
+        return b"s%d:%s" % (len(data), data)
+    if cls is int or cls is bool:
+        return b"i%d;" % value
+    if cls is float:
+        if value.is_integer():
+            return b"i%d;" % value  # 1.0 == 1
+        if isnan(value):
+            return None  # NaN never equals anything, not even itself
+        return b"f%s;" % value.hex().encode()
+    if value is None:
+        return b"n"
+    if cls is bytes:
+        return b"b%d:%s" % (len(value), value)
+    if cls is complex:
+        if not value.imag:
+            return _encode_scalar(value.real)
+        real = _encode_scalar(value.real)
+        imag = _encode_scalar(value.imag)
+        if real is None or imag is None:
+            return None
+        return b"c" + real + imag
+    return None
+
+
+def container_ids(value: Any) -> set[int]:
+    """Return the `id()`s of `value` and of every container in it (dict
+    keys included) that can get a fingerprint."""
+    ids: set[int] = set()
+    stack = [value]
+    while stack:
+        item = stack.pop()
+        cls = item.__class__
+        if cls in _CONTAINER_TAGS and id(item) not in ids:
+            ids.add(id(item))
+            if cls is dict:
+                stack.extend(item.keys())
+                stack.extend(item.values())
+            else:
+                stack.extend(item)
+    return ids
+
+
+class Fingerprints:
+    """A cache of structural fingerprints for nested values.
+
+    [`digest`][patchdiff.fingerprint.Fingerprints.digest] computes a
+    container's fingerprint bottom-up and remembers it (and those of all
+    nested containers) by object identity, so
+    [`equal`][patchdiff.fingerprint.Fingerprints.equal] decides
+    equality of any two cached subtrees in O(1).
+
+    Digests are computed in Python, which costs about a hundred times as
+    much as comparing the same values with `==` (in C) once: a cache
+    pays off when it is kept across diffs of documents that share
+    containers, such as the versions of a copy-on-write state, as only
+    the containers it hasn't seen are hashed again.
+
+    Values that can't be fingerprinted (NaN, and any type other than
+    the JSON-like builtins) have no digest; neither do the containers
+    holding them, and `equal` falls back to `==` for those.
+
+    Fingerprints are cached by identity, so they are only valid while
+    the containers aren't mutated. A cache passed to
+    [`diff`][patchdiff.diff.diff] through `fingerprints=` is consulted
+    and filled by every call; `clear()` it (or use a fresh one) after
+    modifying a document in place. The cache holds a reference to every
+    fingerprinted container: builtin dicts, lists and sets can't be
+    weakly referenced, and keeping them alive is what keeps their ids
+    from being reused while cached. Once it holds more than `maxsize`
+    containers, it forgets the older half of them (and lets them go),
+    so that a cache kept across the versions of a long-running state
+    doesn't keep all of them alive.
+
+    Args:
+        maxsize: How many containers to keep fingerprints of, or `None`
+            for no limit. A digest can take more while it is computed:
+            the cache is only cut back once it is done.
+    """
+
+    __slots__ = ("_cache", "_maxsize")
+
+    def __init__(self, maxsize: int | None = 1_000_000) -> None:
+        if maxsize is not None and maxsize < 1:
+            raise ValueError(f"maxsize must be at least 1, not {maxsize}")
+        self._maxsize = maxsize
+        # id(container) -> (container, digest), oldest first.
+        self._cache: dict[int, tuple[Any, bytes | None]] = {}
+
+    def __len__(self) -> int:
+        return len(self._cache)
+
+    def clear(self) -> None:
+        """Forget all cached fingerprints."""
+        self._cache.clear()
+
+    def retain(self, ids: set[int]) -> None:
+        """Forget the fingerprints of all containers except those whose
+        `id()` is in `ids` (see `container_ids`)."""
+        self._cache = {key: entry for key, entry in self._cache.items() if key in ids}
+
+    def digest(self, value: Any) -> bytes | None:
+        """Return the structural fingerprint of `value`, or `None` if it
+        can't be fingerprinted.
+
+        Equal values get equal digests; different values get different
+        digests up to the (negligible) collision probability of a
+        128-bit BLAKE2b hash.
+        """
+        result = self._digest(value)
+        maxsize = self._maxsize
+        if maxsize is not None and len(self._cache) > maxsize:
+            # Forget the older half.
+            cache = self._cache
+            self._cache = dict(islice(cache.items(), len(cache) - maxsize // 2, None))
+        return result
+
+    def _digest(self, value: Any) -> bytes | None:
+        """`digest`, without cutting the cache back."""
+        tag = _CONTAINER_TAGS.get(value.__class__)
+        if tag is None:
+            return _encode_scalar(value)
+        entry = self._cache.get(id(value))
+        if entry is not None:
+            return entry[1]
+        try:
+            result = self._digest_container(value, tag)
+        except RecursionError:
+            # Nested too deeply to digest by recursion: the frame that
+            # catches this first with enough of the stack left digests
+            # the rest.
+            return self._digest_deep(value)
+        self._cache[id(value)] = (value, result)
+        return result
+
+    def _digest_deep(self, value: Any) -> bytes | None:
+        """`digest` a container of any depth, with a stack of containers
+        rather than by recursion.
+
+        Containers are digested after their children: each stays on the
+        stack until they are cached, so those that are waiting on their
+        children are its ancestors.
+        """
+        cache = self._cache
+        stack = [value]
+        waiting: set[int] = set()
+        while stack:
+            container = stack[-1]
+            key = id(container)
+            if key in cache:
+                stack.pop()
+                continue
+            if key not in waiting:
+                waiting.add(key)
+                size = len(stack)
+                for child in (
+                    chain(container, container.values())
+                    if container.__class__ is dict
+                    else container
+                ):
+                    if child.__class__ in _CONTAINER_TAGS:
+                        child_key = id(child)
+                        if child_key in waiting:
+                            # A container that holds itself has no digest.
+                            cache[child_key] = (child, None)
+                        elif child_key not in cache:
+                            stack.append(child)
+                if len(stack) > size:
+                    continue
+            stack.pop()
+            cache[key] = (
+                container,
+                self._digest_container(container, _CONTAINER_TAGS[container.__class__]),
+            )
+        return cache[id(value)][1]
+
+    def _encode(self, value: Any) -> bytes | None:
+        if value.__class__ in _CONTAINER_TAGS:
+            child = self._digest(value)
+            return None if child is None else b"#" + child
+        return _encode_scalar(value)
+
+    def _digest_container(self, value: Any, tag: bytes) -> bytes | None:
+        encode = self._encode
+        parts: list[bytes] = []
+        if tag == b"D":
+            for key, item in value.items():
+                encoded_key = encode(key)
+                encoded_item = encode(item)
+                if encoded_key is None or encoded_item is None:
+                    return None
+                parts.append(encoded_key + encoded_item)
+            # Dict and set equality ignore order; sorting the encodings
+            # makes the fingerprint ignore it too.
+            parts.sort()
+        else:
+            for item in value:
+                encoded = encode(item)
+                if encoded is None:
+                    return None
+                parts.append(encoded)
+            if tag == b"S":
+                parts.sort()
+        hasher = blake2b(tag, digest_size=_DIGEST_SIZE)
+        hasher.update(b"".join(parts))
+        return hasher.digest()
+
+    def equal(self, a: Any, b: Any) -> bool:
+        """Return whether `a == b`, by fingerprint where possible.
+
+        Scalars are compared with `==` directly (that is already O(1)),
+        and so is any pair of which one side can't be fingerprinted.
+        Identical objects are always equal.
+        """
+        if a is b:
+            return True
+        if a.__class__ not in _CONTAINER_TAGS or b.__class__ not in _CONTAINER_TAGS:
+            return a == b
+        digest_a = self.digest(a)
+        if digest_a is None:
+            return a == b
+        digest_b = self.digest(b)
+        if digest_b is None:
+            return a == b
+        return digest_a == digest_b
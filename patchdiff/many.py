@@ -0,0 +1,118 @@
+"""Diffing one document against many, reusing what was learned about
+it from one diff to the next."""
+
+from __future__ import annotations
+
+from collections.abc import Callable, Iterable, Mapping
+from typing import Any
+
+from .diff import ListAlgorithm, ListKey, ListPairing, _Context, _options
+from .fingerprint import Fingerprints, container_ids
+from .paths import PathPatterns
+from .pointer import Pointer
+from .types import Diffable, Operation
+from .walk import _walk
+
+
+def diff_many(
+    input: Diffable,
+    outputs: Iterable[Diffable],
+    ptr: Pointer | None = None,
+    *,
+    fingerprints: Fingerprints | bool = False,
+    trust_identity: bool = False,
+    eq: Callable[[Any, Any], bool] | None = None,
+    rel_tol: float | None = None,
+    abs_tol: float | None = None,
+    key: ListKey | Mapping[str | Pointer, ListKey] | None = None,
+    moves: bool = False,
+    algorithm: ListAlgorithm = "myers",
+    pairing: ListPairing = "position",
+    reverse: bool = True,
+    max_depth: int | None = None,
+    max_ops_per_node: int | None = None,
+    replace_ratio: float | None = None,
+    splice_strings: int | None = None,
+    immutables: bool = False,
+    include: PathPatterns | None = None,
+    exclude: PathPatterns | None = None,
+) -> list[tuple[list[Operation], list[Operation]]]:
+    """Diff one object against each of many, as
+    [`diff`][patchdiff.diff.diff] would, reusing what was learned about
+    `input` along the way.
+
+    The options are processed once, and the fingerprints of `input`'s
+    containers are kept from one diff to the next, so that `input` is
+    hashed at most once however many outputs it is diffed against.
+    Fingerprints are computed where `fingerprints` is set, and for the
+    elements of the lists that `moves` or the `"patience"` algorithm
+    align. Those of each output's containers are dropped once it was
+    diffed (unless `fingerprints` is a cache of the caller's, which
+    keeps everything).
+
+    Args:
+        input: The source object.
+        outputs: The target objects.
+        ptr: Pointer prefix for the emitted operations.
+        fingerprints: As for `diff`.
+        trust_identity: As for `diff`.
+        eq: As for `diff`.
+        rel_tol: As for `diff`.
+        abs_tol: As for `diff`.
+        key: As for `diff`.
+        moves: As for `diff`.
+        algorithm: As for `diff`.
+        pairing: As for `diff`.
+        reverse: As for `diff`.
+        max_depth: As for `diff`.
+        max_ops_per_node: As for `diff`.
+        replace_ratio: As for `diff`.
+        splice_strings: As for `diff`.
+        immutables: As for `diff`.
+        include: As for `diff`.
+        exclude: As for `diff`.
+
+    Returns:
+        A list with the `(ops, reverse_ops)` of every output, in order.
+    """
+    if ptr is None:
+        ptr = Pointer()
+    options = _options(
+        ptr,
+        trust_identity,
+        eq,
+        rel_tol,
+        abs_tol,
+        key,
+        moves,
+        algorithm,
+        pairing,
+        reverse,
+        max_depth,
+        max_ops_per_node,
+        replace_ratio,
+        splice_strings,
+        immutables,
+        include,
+        exclude,
+    )
+    cache = (
+        fingerprints
+        if isinstance(fingerprints, Fingerprints)
+        else Fingerprints(maxsize=None)
+    )
+    ctx = _Context(cache if fingerprints is not False else None, **options)
+    ctx.fingerprints = cache
+    # The ids of the input's containers, once output containers were
+    # cached too.
+    input_ids: set[int] | None = None
+    retained = len(cache)
+    results = []
+    for output in outputs:
+        results.append(_walk(input, output, ptr, ctx))
+        if cache is not fingerprints and len(cache) > retained:
+            if input_ids is None:
+                input_ids = container_ids(input)
+            cache.retain(input_ids)
+            retained = len(cache)
+    return results
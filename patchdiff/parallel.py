@@ -0,0 +1,153 @@
+"""Parallel diffing: the subtrees of a large document are diffed in
+worker processes.
+
+The top-level container is diffed here one level deep (`_diff_level`):
+the pairs of child values it would recurse into are collected, and
+stand-ins are left in their place in the operation lists. The collected
+pairs are diffed in worker processes, a chunk of them per task, and
+their operations replace the stand-ins, so the result is exactly what
+the serial engine produces.
+
+Unchanged children are recognized here, by the top-level container's
+usual equality checks, and never sent to a worker: comparing them
+costs far less than pickling them would.
+"""
+
+from __future__ import annotations
+
+import os
+from concurrent.futures import Executor, ProcessPoolExecutor
+from itertools import repeat
+from typing import TYPE_CHECKING, Any, cast
+
+from .diff import _Context
+from .fingerprint import Fingerprints
+from .pointer import Pointer
+from .walk import _diff_level, _Pending, _Task, _walk
+
+if TYPE_CHECKING:
+    from .types import Operation
+
+# The collected pairs must hold at least this many children (of their
+# top-level containers, summed) before they are sent to workers; below
+# it, starting workers and pickling costs more than it saves.
+_MIN_WORK = 10_000
+
+# Pairs are sent in a few chunks per worker, so workers that draw
+# cheap chunks pick up more of them.
+_CHUNKS_PER_WORKER = 4
+
+# Whether to use fingerprints (workers can't share the caller's cache),
+# and the other `_Context` keyword arguments.
+type _Options = tuple[bool, dict[str, Any]]
+
+
+def _work(value: Any) -> int:
+    """Estimate the cost of diffing into `value` by its size."""
+    if isinstance(value, (dict, list, set, tuple)):
+        return len(value)
+    return 1
+
+
+def _diff_chunk(
+    tasks: list[_Task], options: _Options
+) -> list[tuple[list[Operation], list[Operation]]]:
+    """Diff a chunk of collected pairs (in a worker process)."""
+    fingerprints, kwargs = options
+    ctx = _Context(Fingerprints(maxsize=None) if fingerprints else None, **kwargs)
+    results = [_walk(input, output, ptr, ctx) for input, output, ptr in tasks]
+    # Pointers travel as their bare tokens: unpickling those builds
+    # tuples in C, where every Pointer would cost a Python-level call
+    # (in both processes). _run turns them back into Pointers.
+    for task_ops in results:
+        for ops in task_ops:
+            for op in cast("list[dict[str, Any]]", ops):
+                op["path"] = op["path"].tokens
+                if "from" in op:
+                    op["from"] = op["from"].tokens
+    return results
+
+
+def _chunks(tasks: list[_Task], count: int) -> list[list[_Task]]:
+    """Split `tasks` into about `count` runs of about equal work."""
+    total = sum(_work(input) + _work(output) for input, output, _ in tasks)
+    target = total / count
+    chunks: list[list[_Task]] = [[]]
+    work = 0
+    for task in tasks:
+        if work >= target:
+            chunks.append([])
+            work = 0
+        chunks[-1].append(task)
+        work += _work(task[0]) + _work(task[1])
+    return chunks
+
+
+def _splice(
+    ops: list[Operation], results: list[tuple[list[Operation], list[Operation]]]
+) -> list[Operation]:
+    """Replace the stand-ins in `ops` by the operations they stand for."""
+    spliced: list[Operation] = []
+    for op in ops:
+        if op.__class__ is _Pending:
+            pending = cast("_Pending", op)
+            spliced.extend(results[pending.task][pending.side])
+        else:
+            spliced.append(op)
+    return spliced
+
+
+def diff_parallel(
+    input: Any,
+    output: Any,
+    ptr: Pointer,
+    ctx: _Context,
+    options: _Options,
+    workers: int | Executor,
+) -> tuple[list[Operation], list[Operation]]:
+    """Diff `input` and `output` like `_diff`, with the subtrees below
+    the top-level container diffed by `workers` processes (or by the
+    given executor).
+
+    `options` are the `_Context` arguments for the workers, with
+    `fingerprints` as a bool.
+    """
+    if isinstance(workers, int) and workers < 1:
+        raise ValueError(f"workers must be at least 1, not {workers}")
+    ops, rops, tasks = _diff_level(input, output, ptr, ctx)
+    if not tasks:
+        return ops, rops
+
+    work = sum(_work(input) + _work(output) for input, output, _ in tasks)
+    results: list[tuple[list[Operation], list[Operation]]]
+    if len(tasks) < 2 or work < _MIN_WORK or workers == 1:
+        results = [_walk(input, output, ptr, ctx) for input, output, ptr in tasks]
+    elif isinstance(workers, int):
+        with ProcessPoolExecutor(workers) as executor:
+            results = _run(executor, tasks, options, workers)
+    else:
+        results = _run(workers, tasks, options, os.process_cpu_count() or 1)
+    return _splice(ops, results), _splice(rops, results)
+
+
+def _run(
+    executor: Executor,
+    tasks: list[_Task],
+    options: _Options,
+    workers: int,
+) -> list[tuple[list[Operation], list[Operation]]]:
+    """Diff the collected pairs on `executor` (with `workers` processes),
+    returning their results in order."""
+    chunks = _chunks(tasks, workers * _CHUNKS_PER_WORKER)
+    results = [
+        result
+        for chunk_results in executor.map(_diff_chunk, chunks, repeat(options))
+        for result in chunk_results
+    ]
+    for task_ops in results:
+        for ops in task_ops:
+            for op in cast("list[dict[str, Any]]", ops):
+                op["path"] = Pointer(op["path"])
+                if "from" in op:
+                    op["from"] = Pointer(op["from"])
+    return results
@@ -0,0 +1,219 @@
+"""Path filters: the parts of a document that `diff` compares, by JSON
+pointer pattern.
+
+The include and exclude patterns of a diff are compiled into one trie
+of pointer tokens, in which `*` matches any token. Walking the trie
+along a path gives the path's state: which patterns it is on, and
+whether it is inside an included path. States are canonical and know
+the state of each of their children (the ones a pattern names, and any
+other), so the diff steps from a container's state to a child's with a
+single dict lookup, and leaves out the children that are left out
+before it looks at them.
+
+A path's state is `None` where nothing below it is left out, and the
+diff is the usual one from there on.
+"""
+
+from __future__ import annotations
+
+from collections.abc import Callable, Iterable
+from typing import Any
+
+from .pointer import Pointer
+
+type PathPatterns = Iterable[str | Pointer]
+
+# A pattern token that matches any token.
+_WILDCARD = "*"
+
+# The state of a path that is left out.
+_LEFT_OUT = object()
+
+# What a dict lookup returns for a missing key, where `None` could be a
+# value.
+_NOTHING = object()
+
+
+class _Node:
+    """A node of the pattern trie: the patterns that go on from here
+    (by next token), and those that end here."""
+
+    __slots__ = ("children", "exclude", "excludes_below", "include", "wildcard")
+
+    def __init__(self) -> None:
+        self.children: dict[str, _Node] = {}
+        self.wildcard: _Node | None = None
+        self.include = False
+        self.exclude = False
+        # Whether an exclude pattern ends below this node.
+        self.excludes_below = False
+
+    def child(self, token: str) -> _Node:
+        if token == _WILDCARD:
+            if self.wildcard is None:
+                self.wildcard = _Node()
+            return self.wildcard
+        node = self.children.get(token)
+        if node is None:
+            node = self.children[token] = _Node()
+        return node
+
+
+class _State:
+    """Where the patterns stand at a path: the trie nodes its tokens
+    lead to, and whether it is inside an included path (or no path is
+    included).
+
+    `steps` holds the states of the children whose tokens a pattern
+    names, `other` that of any other child. Children with an index
+    token of their own make a list `positional` (see
+    `PathFilter.equal`).
+    """
+
+    __slots__ = ("inside", "nodes", "other", "positional", "steps")
+
+    def __init__(self, nodes: frozenset[_Node], inside: bool) -> None:
+        self.nodes = nodes
+        self.inside = inside
+        self.steps: dict[str, Any] = {}
+        self.other: Any = None
+        self.positional = False
+
+    def step(self, token: str) -> Any:
+        """Return the state of the child at `token`: a `_State`, `None`
+        if nothing below it is left out, or `_LEFT_OUT`."""
+        return self.steps.get(token, self.other)
+
+
+class PathFilter:
+    """Include and exclude patterns, compiled into a trie of tokens.
+
+    Args:
+        include: Patterns of the paths to diff, if not all of them: only
+            these paths (and everything below them) are diffed.
+        exclude: Patterns of the paths not to diff, even when included.
+    """
+
+    __slots__ = ("_exclude", "_include", "_states", "root")
+
+    def __init__(
+        self, include: PathPatterns | None = None, exclude: PathPatterns | None = None
+    ) -> None:
+        self._include = None if include is None else tuple(include)
+        self._exclude = () if exclude is None else tuple(exclude)
+        trie = _Node()
+        for patterns, is_include in ((self._include, True), (self._exclude, False)):
+            for pattern in patterns or ():
+                _add(trie, pattern, is_include)
+        # Canonical states, by their nodes and whether they are inside.
+        self._states: dict[tuple[frozenset[_Node], bool], _State] = {}
+        # The state of the empty path (the document itself).
+        self.root: Any = self._resolve([trie], self._include is None)
+
+    def __reduce__(self) -> tuple[Any, ...]:
+        # States are compared by identity (and so is `_LEFT_OUT`), so
+        # they are built anew rather than pickled.
+        return PathFilter, (self._include, self._exclude)
+
+    def _resolve(self, nodes: list[_Node], inside: bool) -> Any:
+        """Return the state of a path whose tokens lead to `nodes`."""
+        if any(node.exclude for node in nodes):
+            return _LEFT_OUT
+        if not inside:
+            if any(node.include for node in nodes):
+                inside = True
+            elif not nodes:
+                return _LEFT_OUT
+        if inside:
+            # Only exclude patterns matter inside an included path.
+            nodes = [node for node in nodes if node.excludes_below]
+            if not nodes:
+                return None
+        key = (frozenset(nodes), inside)
+        state = self._states.get(key)
+        if state is None:
+            state = self._states[key] = _State(key[0], inside)
+            wildcards = [node.wildcard for node in nodes if node.wildcard is not None]
+            for token in {token for node in nodes for token in node.children}:
+                named = [
+                    node.children[token] for node in nodes if token in node.children
+                ]
+                state.steps[token] = self._resolve(named + wildcards, inside)
+                state.positional = state.positional or token.isdigit()
+            state.other = self._resolve(wildcards, inside)
+        return state
+
+    def state(self, ptr: Pointer) -> Any:
+        """Return the state at `ptr`, `None` if nothing is left out below
+        it, or `_LEFT_OUT` if it is left out itself."""
+        state = self.root
+        for token in ptr.tokens:
+            if state is None or state is _LEFT_OUT:
+                break
+            state = state.step(token if token.__class__ is str else str(token))
+        return state
+
+    def equal(
+        self,
+        state: Any,
+        equal: Callable[[Any, Any], bool] | None,
+        a: Any,
+        b: Any,
+    ) -> bool:
+        """Whether `a` and `b` (at a path at `state`) are equal but for
+        what is left out below them, comparing with `equal` (or `==`).
+
+        The values are walked along the trie, leaving out the dict
+        entries, and the list elements, that are left out, so those are
+        never compared. Below paths where nothing is left out, values
+        are compared as a whole. Lists of different lengths differ
+        unless all the elements that only one of them has are left out.
+        """
+        if a is b:
+            return True
+        cls = a.__class__
+        if (
+            state is None
+            or cls is not b.__class__
+            or (cls is not dict and cls is not list)
+        ):
+            return a == b if equal is None else equal(a, b)
+        step = state.step
+        if cls is dict:
+            for key, value in a.items():
+                child = step(key if key.__class__ is str else str(key))
+                if child is _LEFT_OUT:
+                    continue
+                other = b.get(key, _NOTHING)
+                if other is _NOTHING or not self.equal(child, equal, value, other):
+                    return False
+            return all(
+                key in a or step(key if key.__class__ is str else str(key)) is _LEFT_OUT
+                for key in b
+            )
+        for index in range(max(len(a), len(b))):
+            child = step(str(index))
+            if child is _LEFT_OUT:
+                continue
+            if index >= len(a) or index >= len(b):
+                return False
+            if not self.equal(child, equal, a[index], b[index]):
+                return False
+        return True
+
+
+def _add(trie: _Node, pattern: str | Pointer, is_include: bool) -> None:
+    """Add an include or exclude pattern to `trie`."""
+    if isinstance(pattern, str):
+        if pattern and not pattern.startswith("/"):
+            raise ValueError(f"Path patterns are JSON pointers, not {pattern!r}")
+        pattern = Pointer.from_str(pattern)
+    node = trie
+    for token in pattern.tokens:
+        if not is_include:
+            node.excludes_below = True
+        node = node.child(str(token))
+    if is_include:
+        node.include = True
+    else:
+        node.exclude = True
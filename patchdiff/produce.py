@@ -19,6 +19,7 @@ from typing import Any
 from weakref import ref
 
 from .pointer import Pointer
+from .registry import snapshot
 from .types import Operation
 
 # Types that are immutable and can never contain a proxy, so they can be
@@ -34,16 +35,22 @@ def _snapshot(value: Any) -> Any:
     plain copies of their underlying data.
 
     Hand-rolled for the common JSON-like types (faster than copy.deepcopy);
-    unrecognized types fall back to deepcopy, which also unwraps third-party
-    proxies (like observ's) through their __deepcopy__ hooks.
+    other types are copied with their registered snapshot function, or
+    else deepcopy, which also unwraps third-party proxies (like observ's)
+    through their __deepcopy__ hooks.
     """
     cls = value.__class__
     if cls in _SCALAR_TYPES:
         return value
-    if cls is dict:
-        return {key: _snapshot(item) for key, item in value.items()}
-    if cls is list:
-        return [_snapshot(item) for item in value]
+    try:
+        if cls is dict:
+            return {key: _snapshot(item) for key, item in value.items()}
+        if cls is list:
+            return [_snapshot(item) for item in value]
+    except RecursionError:
+        # Nested too deeply to copy by recursion: the frame that catches
+        # this first with enough of the stack left copies the rest.
+        return _snapshot_deep(value)
     if cls is DictProxy or cls is ListProxy or cls is SetProxy:
         return _snapshot(value._data)
     if cls is set:
@@ -52,7 +59,38 @@ def _snapshot(value: Any) -> Any:
         return frozenset(_snapshot(item) for item in value)
     if cls is tuple:
         return tuple(_snapshot(item) for item in value)
-    return deepcopy(value)
+    return snapshot(value)
+
+
+def _snapshot_deep(value: dict | list) -> dict | list:
+    """`_snapshot` a dict or list of any depth, with a stack of the
+    containers still to fill rather than by recursion."""
+    copied: Any = {} if value.__class__ is dict else []
+    # Pairs of an original container and its (empty) copy.
+    stack: list[tuple[Any, Any]] = [(value, copied)]
+    while stack:
+        original, copy = stack.pop()
+        if copy.__class__ is dict:
+            items = original.items()
+        else:
+            items = enumerate(original)
+            copy.extend(original)
+        for key, item in items:
+            cls = item.__class__
+            if cls is DictProxy or cls is ListProxy or cls is SetProxy:
+                item = item._data
+                cls = item.__class__
+            if cls is dict:
+                copy[key] = child = {}
+                stack.append((item, child))
+            elif cls is list:
+                copy[key] = child = []
+                stack.append((item, child))
+            elif cls not in _SCALAR_TYPES:
+                copy[key] = _snapshot(item)
+            elif copy.__class__ is dict:
+                copy[key] = item
+    return copied
 
 
 def _unwrap(value: Any) -> Any:
@@ -72,24 +110,93 @@ def _unwrap(value: Any) -> Any:
         return value
     if cls is DictProxy or cls is ListProxy or cls is SetProxy:
         return _snapshot(value._data)
-    if cls is dict:
-        for item in value.values():
-            if _unwrap(item) is not item:
-                return {key: _unwrap(item) for key, item in value.items()}
-        return value
-    if cls is list:
-        for item in value:
-            if _unwrap(item) is not item:
-                return [_unwrap(item) for item in value]
-        return value
-    if cls is tuple:
-        for item in value:
-            if _unwrap(item) is not item:
-                return tuple(_unwrap(item) for item in value)
-        return value
+    try:
+        # Each item is unwrapped once: the copy starts with the items
+        # before the first one that changed.
+        if cls is dict:
+            items = iter(value.items())
+            for key, item in items:
+                unwrapped = _unwrap(item)
+                if unwrapped is not item:
+                    copied = dict(value)
+                    copied[key] = unwrapped
+                    for key, item in items:
+                        copied[key] = _unwrap(item)
+                    return copied
+            return value
+        if cls is list or cls is tuple:
+            for index, item in enumerate(value):
+                unwrapped = _unwrap(item)
+                if unwrapped is not item:
+                    copied = [*value[:index], unwrapped]
+                    copied.extend([_unwrap(item) for item in value[index + 1 :]])
+                    return copied if cls is list else tuple(copied)
+            return value
+    except RecursionError:
+        # Nested too deeply to unwrap by recursion (see `_snapshot`).
+        return _unwrap_deep(value)
     return value
 
 
+# The containers `_unwrap` looks into.
+_NESTED_TYPES = frozenset({dict, list, tuple})
+
+
+def _unwrap_deep(value: dict | list | tuple) -> Any:
+    """`_unwrap` a dict, list or tuple of any depth, with a stack of the
+    containers still to unwrap rather than by recursion.
+
+    Containers are unwrapped after their children: each stays on the
+    stack until they are, so those that are waiting on their children
+    are its ancestors (and a container that holds itself is kept).
+    """
+    # id(container) -> the container, unwrapped
+    unwrapped: dict[int, Any] = {}
+    waiting: set[int] = set()
+    stack: list[Any] = [value]
+    while stack:
+        container = stack[-1]
+        key = id(container)
+        if key in unwrapped:
+            stack.pop()
+            continue
+        items = container.values() if container.__class__ is dict else container
+        if key not in waiting:
+            waiting.add(key)
+            size = len(stack)
+            for item in items:
+                if (
+                    item.__class__ in _NESTED_TYPES
+                    and id(item) not in unwrapped
+                    and id(item) not in waiting
+                ):
+                    stack.append(item)
+            if len(stack) > size:
+                continue
+        stack.pop()
+        results = []
+        changed = False
+        for item in items:
+            cls = item.__class__
+            if cls in _NESTED_TYPES:
+                result = unwrapped.get(id(item), item)
+            elif cls is DictProxy or cls is ListProxy or cls is SetProxy:
+                result = _snapshot(item._data)
+            else:
+                result = item
+            changed = changed or result is not item
+            results.append(result)
+        if not changed:
+            unwrapped[key] = container
+        elif container.__class__ is dict:
+            unwrapped[key] = dict(zip(container, results, strict=True))
+        elif container.__class__ is list:
+            unwrapped[key] = results
+        else:
+            unwrapped[key] = tuple(results)
+    return unwrapped[id(value)]
+
+
 def _add_reader_methods(proxy_class, method_names):
     """Add simple pass-through reader methods to a proxy class.
 
@@ -262,37 +369,50 @@ class _Proxy:
         or any of its ancestors has been detached from the draft (a dead
         parent reference counts as detached).
 
-        The result is memoized per proxy and recursively reuses the
-        parent's memoized location, so repeated writes into a stable tree
-        pay O(1) per write instead of walking to the root every time.
-        Every structural change (detach, re-attach, list index shifts)
-        bumps the recorder's epoch, which invalidates all memoized
-        locations at once.
+        The result is memoized per proxy and reuses the memoized locations
+        of its ancestors, so repeated writes into a stable tree pay O(1)
+        per write instead of walking to the root every time. Every
+        structural change (detach, re-attach, list index shifts) bumps the
+        recorder's epoch, which invalidates all memoized locations at once.
+        Ancestors that have to be located too are gathered in a list
+        rather than by recursion, so drafts of any depth can be located.
 
         Returns a tuple so callers can build a child Pointer in a single
         allocation: Pointer((*tokens, key))."""
-        recorder = self._recorder
-        if self._loc_epoch == recorder.epoch:
+        epoch = self._recorder.epoch
+        if self._loc_epoch == epoch:
             return self._loc_tokens
+        # The proxies below `node` whose locations follow from its own.
+        chain = []
+        node = self
         tokens: tuple | None
-        if self._detached:
-            tokens = None
-        else:
-            parent_ref = self._parent
-            if parent_ref is None:
-                tokens = ()
+        while True:
+            if node._detached:
+                tokens = None
             else:
-                node = parent_ref()
-                if node is None:
-                    tokens = None
+                parent_ref = node._parent
+                if parent_ref is None:
+                    tokens = ()
                 else:
-                    parent_tokens = node._location()
-                    if parent_tokens is None:
+                    parent = parent_ref()
+                    if parent is None:
                         tokens = None
+                    elif parent._loc_epoch == epoch:
+                        tokens = parent._loc_tokens
+                        if tokens is not None:
+                            tokens = (*tokens, node._key)
                     else:
-                        tokens = (*parent_tokens, self._key)
-        self._loc_tokens = tokens
-        self._loc_epoch = recorder.epoch
+                        chain.append(node)
+                        node = parent
+                        continue
+            break
+        node._loc_tokens = tokens
+        node._loc_epoch = epoch
+        for node in reversed(chain):
+            if tokens is not None:
+                tokens = (*tokens, node._key)
+            node._loc_tokens = tokens
+            node._loc_epoch = epoch
         return tokens
 
     def _wrap(self, key: Hashable, value: Any) -> Any:
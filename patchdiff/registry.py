@@ -0,0 +1,262 @@
+"""The type registry: how values of types other than the builtin dict,
+list and set are diffed, patched and copied.
+
+Each registered type has a `TypeAdapter`, which presents a value's
+children as a builtin container (its view) for `diff` to compare, and
+builds a value back from a patched view for `iapply`. Adapters for
+dataclasses, named tuples, `OrderedDict`, `defaultdict` and
+`MappingProxyType` are built in; dataclasses and named tuples are
+recognized the first time their class is looked up. Tuples and
+frozensets have adapters too, but `diff` only uses those when asked to
+(`immutables=True`).
+
+Lookups go through `_adapters`, a dict keyed by exact class that
+resolves (and remembers) a class it hasn't seen on its first lookup,
+so finding the adapter of a value, or finding out it has none, is a
+single dict lookup. It remembers a bounded number of resolved classes,
+so that classes made on the fly don't pile up in it.
+"""
+
+from __future__ import annotations
+
+import dataclasses
+import operator
+from collections import OrderedDict, defaultdict
+from collections.abc import Callable
+from copy import deepcopy
+from types import MappingProxyType
+from typing import TYPE_CHECKING, Any, Literal
+
+if TYPE_CHECKING:
+    from _typeshed import DataclassInstance
+
+
+# What a dict lookup returns for a missing key, where `None` could be a
+# value.
+_NOTHING = object()
+
+
+class TypeAdapter:
+    """How values of a registered type are diffed, patched and copied.
+
+    Args:
+        kind: How two values of the type are diffed: their views are
+            compared as dicts (by key), lists (aligned) or sets.
+        view: Returns the children of a value as a container of `kind`,
+            which is only read. Defaults to the value itself, for types
+            that already behave like one.
+        build: Returns the value with the children of `view` (a patched
+            builtin copy of its view) instead of its own: the value
+            itself, updated in place, or a new value for immutable
+            types, which [`iapply`][patchdiff.apply.iapply] then writes
+            into the value's parent. Defaults to patching the value
+            itself like a builtin container of `kind`.
+        snapshot: Returns a deep copy of a value, for patches to hold.
+            Defaults to `copy.deepcopy`.
+    """
+
+    __slots__ = ("build", "kind", "snapshot", "view")
+
+    def __init__(
+        self,
+        kind: Literal["dict", "list", "set"],
+        *,
+        view: Callable[[Any], Any] | None = None,
+        build: Callable[[Any, Any], Any] | None = None,
+        snapshot: Callable[[Any], Any] | None = None,
+    ) -> None:
+        if kind not in ("dict", "list", "set"):
+            raise ValueError(f"kind must be 'dict', 'list' or 'set', not {kind!r}")
+        self.kind = kind
+        self.view = view
+        self.build = build
+        self.snapshot = snapshot
+
+
+def _dataclass_adapter(cls: type[DataclassInstance]) -> TypeAdapter:
+    """The adapter of a dataclass: its fields, by name."""
+    names = tuple(field.name for field in dataclasses.fields(cls))
+
+    def view(value: Any) -> dict[str, Any]:
+        return {name: getattr(value, name) for name in names}
+
+    def build(value: Any, fields: dict[str, Any]) -> Any:
+        changed = {
+            name: item
+            for name, item in fields.items()
+            if getattr(value, name) is not item
+        }
+        try:
+            for name, item in changed.items():
+                setattr(value, name, item)
+        except dataclasses.FrozenInstanceError:
+            # Raised by the first field already, before anything changed.
+            return dataclasses.replace(value, **changed)
+        return value
+
+    return TypeAdapter("dict", view=view, build=build)
+
+
+def _named_tuple_view(value: Any) -> dict[str, Any]:
+    return value._asdict()
+
+
+def _named_tuple_build(value: Any, fields: dict[str, Any]) -> Any:
+    return value._replace(**fields)
+
+
+_NAMED_TUPLE = TypeAdapter("dict", view=_named_tuple_view, build=_named_tuple_build)
+
+_MAPPING = TypeAdapter("dict")
+
+
+def _mapping_proxy_build(value: MappingProxyType, items: dict) -> MappingProxyType:
+    return MappingProxyType(items)
+
+
+def _mapping_proxy_snapshot(value: MappingProxyType) -> MappingProxyType:
+    # Mapping proxies can't be pickled, so deepcopy can't copy them.
+    return MappingProxyType(snapshot(dict(value)))
+
+
+_MAPPING_PROXY = TypeAdapter(
+    "dict", build=_mapping_proxy_build, snapshot=_mapping_proxy_snapshot
+)
+
+
+def _tuple_build(value: tuple, items: list) -> tuple:
+    return tuple(items)
+
+
+def _frozenset_build(value: frozenset, items: set) -> frozenset:
+    return frozenset(items)
+
+
+def _resolve(cls: type) -> TypeAdapter | None:
+    """Find the adapter of a class that wasn't looked up before."""
+    if dataclasses.is_dataclass(cls):
+        return _dataclass_adapter(cls)
+    if issubclass(cls, tuple) and hasattr(cls, "_fields"):
+        return _NAMED_TUPLE
+    return None
+
+
+# How many resolved classes `_adapters` remembers at most.
+_MAX_RESOLVED = 1024
+
+
+class _Adapters(dict[type, TypeAdapter | None]):
+    """Adapters by exact class: the `registered` ones, and those of the
+    classes resolved on their first lookup (up to `_MAX_RESOLVED` of
+    them, after which the resolved ones are all forgotten)."""
+
+    __slots__ = ("registered",)
+
+    def __init__(self, registered: dict[type, TypeAdapter | None]) -> None:
+        super().__init__(registered)
+        self.registered = registered
+
+    def __missing__(self, cls: type) -> TypeAdapter | None:
+        if len(self) >= len(self.registered) + _MAX_RESOLVED:
+            self.clear()
+            self.update(self.registered)
+        adapter = self[cls] = _resolve(cls)
+        return adapter
+
+
+_adapters = _Adapters(
+    {
+        OrderedDict: _MAPPING,
+        defaultdict: _MAPPING,
+        MappingProxyType: _MAPPING_PROXY,
+        # Only diffed into with `diff(..., immutables=True)`.
+        tuple: TypeAdapter("list", build=_tuple_build),
+        frozenset: TypeAdapter("set", build=_frozenset_build),
+    }
+)
+
+
+def register(cls: type, adapter: TypeAdapter | None) -> None:
+    """Register how values of exactly `cls` (not its subclasses) are
+    diffed, patched and copied, replacing any adapter it had.
+
+    Pass `None` to drop the type's adapter: its values are then handled
+    like those of any unregistered type, as containers if they look
+    like one (by their methods) and as atomic values otherwise.
+    """
+    _adapters.registered[cls] = adapter
+    _adapters[cls] = adapter
+
+
+def snapshot(value: Any) -> Any:
+    """Deep copy `value`, copying the values of registered types in it
+    with their type's snapshot function.
+
+    Dicts, lists and tuples are walked (keeping values that they share,
+    shared, like `copy.deepcopy` does), so those values are found at
+    any depth; anything else is copied with `copy.deepcopy`. Dicts and
+    lists are walked with a stack rather than by recursion, so they can
+    be nested any number of levels deep.
+    """
+    return _snapshot(value, {})
+
+
+# Types whose values are immutable and hold no other values, so they
+# are their own copy.
+_ATOMIC = frozenset({int, float, complex, bool, str, bytes, type(None)})
+
+
+def _snapshot(value: Any, memo: dict[int, Any]) -> Any:
+    cls = value.__class__
+    if cls in _ATOMIC:
+        return value
+    copied = memo.get(id(value), _NOTHING)
+    if copied is not _NOTHING:
+        return copied
+    if cls is dict or cls is list:
+        copied = _snapshot_deep(value, memo)
+    elif cls is tuple:
+        items = tuple([_snapshot(item, memo) for item in value])
+        # Like deepcopy, keep a tuple whose items are all their own copy.
+        copied = memo[id(value)] = (
+            value if all(map(operator.is_, items, value)) else items
+        )
+    else:
+        adapter = _adapters[cls]
+        if adapter is not None and adapter.snapshot is not None:
+            copied = memo[id(value)] = adapter.snapshot(value)
+        else:
+            # deepcopy adds its copies to the same memo.
+            copied = deepcopy(value, memo)
+    return copied
+
+
+def _snapshot_deep(value: dict | list, memo: dict[int, Any]) -> dict | list:
+    """`_snapshot` a dict or list of any depth, with a stack of the
+    dicts and lists still to fill rather than by recursion."""
+    copied: Any = {} if value.__class__ is dict else []
+    memo[id(value)] = copied
+    # Pairs of an original container and its (empty) copy.
+    stack: list[tuple[Any, Any]] = [(value, copied)]
+    while stack:
+        original, copy = stack.pop()
+        if copy.__class__ is dict:
+            items = original.items()
+        else:
+            items = enumerate(original)
+            copy.extend(original)
+        for key, item in items:
+            cls = item.__class__
+            if cls in _ATOMIC:
+                if copy.__class__ is dict:
+                    copy[key] = item
+                continue
+            if cls is dict or cls is list:
+                child = memo.get(id(item), _NOTHING)
+                if child is _NOTHING:
+                    child = memo[id(item)] = {} if cls is dict else []
+                    stack.append((item, child))
+                copy[key] = child
+            else:
+                copy[key] = _snapshot(item, memo)
+    return copied
@@ -1,22 +1,30 @@
 from __future__ import annotations
 
 import json
+from collections.abc import Sequence
 from typing import Any
 
 from .types import Operation
 
 
-def to_str_paths(ops: list[Operation]) -> list[dict[str, Any]]:
+def to_str_paths(ops: Sequence[Operation]) -> list[dict[str, Any]]:
     """Return a copy of the operations with each path rendered as a string.
 
     The [`Pointer`][patchdiff.pointer.Pointer] objects in the `"path"`
-    fields are replaced by their escaped JSON pointer (RFC 6901) string
-    form; the operations themselves are not mutated.
+    (and, for `move` operations, `"from"`) fields are replaced by their
+    escaped JSON pointer (RFC 6901) string form; the operations
+    themselves are not mutated.
     """
-    return [{**op, "path": str(op["path"])} for op in ops]
+    str_ops: list[dict[str, Any]] = []
+    for op in ops:
+        str_op: dict[str, Any] = {**op, "path": str(op["path"])}
+        if "from" in op:
+            str_op["from"] = str(op["from"])
+        str_ops.append(str_op)
+    return str_ops
 
 
-def to_json(ops: list[Operation], **kwargs: Any) -> str:
+def to_json(ops: Sequence[Operation], **kwargs: Any) -> str:
     """Serialize a list of operations to a JSON patch (RFC 6902) string.
 
     Pointer paths are rendered as JSON pointer strings; any keyword
@@ -0,0 +1,68 @@
+"""Diff sessions: successive versions of a state, each diffed against
+the one before."""
+
+from __future__ import annotations
+
+from typing import Any
+
+from .apply import iapply
+from .diff import diff
+from .registry import snapshot
+from .types import Diffable, Operation
+
+
+class DiffSession:
+    """Diff each new version of a state against the previous one.
+
+    The session keeps the last state it saw, and the
+    [`diff`][patchdiff.diff.diff] options to diff with. Unchanged
+    subtrees are recognized by identity before anything is compared, so
+    when versions share the containers they didn't change (as with
+    [`produce`][patchdiff.produce.produce] or any other copy-on-write
+    update), the cost of a call scales with what changed rather than
+    with the size of the state.
+
+    With `copy=True`, the session keeps a private copy of the previous
+    version instead, so the state may be a single object that is
+    changed in place between calls. The copy is rolled forward by
+    applying each call's operations to it, which costs as much as the
+    change; the diff itself compares the whole state.
+
+    Args:
+        state: The initial state.
+        copy: Keep a copy of each version rather than the version itself.
+        **options: Passed on to [`diff`][patchdiff.diff.diff].
+    """
+
+    __slots__ = ("_copy", "_options", "_state")
+
+    def __init__(self, state: Diffable, *, copy: bool = False, **options: Any) -> None:
+        self._copy = copy
+        self._options = options
+        self._state = snapshot(state) if copy else state
+
+    @property
+    def state(self) -> Diffable:
+        """The previous state (a copy of it, with `copy=True`), which the
+        next call to [`diff`][patchdiff.session.DiffSession.diff] diffs
+        against."""
+        return self._state
+
+    def diff(self, state: Diffable) -> tuple[list[Operation], list[Operation]]:
+        """Diff `state` against the previous state, and keep it as the
+        previous state for the next call.
+
+        Returns:
+            `(ops, reverse_ops)`, as [`diff`][patchdiff.diff.diff] does.
+        """
+        ops, rops = diff(self._state, state, **self._options)
+        if not self._copy:
+            self._state = state
+        elif any(not op["path"].tokens for op in ops):
+            # The state was replaced as a whole, which can't be applied.
+            self._state = snapshot(state)
+        else:
+            # Immutable states (and their immutable parts) are rebuilt
+            # rather than patched in place.
+            self._state = iapply(self._state, ops)
+        return ops, rops
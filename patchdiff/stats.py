@@ -0,0 +1,681 @@
+"""Diff statistics: how many operations of each kind a diff holds, and
+how large it is, without building its operations."""
+
+from __future__ import annotations
+
+import json
+from collections.abc import Callable, Mapping
+from json import JSONEncoder
+from typing import Any, NamedTuple, cast
+
+from .arrays import diff_arrays
+from .diff import (
+    _NOTHING,
+    _WALKED_TYPES,
+    ListAlgorithm,
+    ListKey,
+    ListPairing,
+    _align_lists,
+    _Context,
+    _dispatcher,
+    _options,
+    _path_tokens,
+    _similar_pairs,
+)
+from .fingerprint import Fingerprints
+from .paths import PathPatterns
+from .pointer import Pointer, escape
+from .serialize import to_str_paths
+from .types import Diffable, Operation
+from .walk import _walk
+
+
+class PatchStats(NamedTuple):
+    """What one list of operations of a diff holds.
+
+    Attributes:
+        ops: The number of operations of each kind (`"add"`, `"remove"`
+            and `"replace"`, and `"move"` and `"splice"` with the
+            options that make them), leaving out kinds that don't occur.
+        paths: The number of distinct paths the operations address.
+        size: The length of the operations as JSON, as `to_json` writes
+            them.
+    """
+
+    ops: dict[str, int]
+    paths: int
+    size: int
+
+
+# Values that are replaced when they differ, without a dispatch.
+_SCALAR_TYPES = frozenset({int, float, bool, str, type(None)})
+
+# What an operation takes as JSON with its ", ", but for the escaped
+# tokens of its path (and its value).
+_REMOVE_SIZE = len(json.dumps({"op": "remove", "path": ""})) + 2
+_VALUE_SIZES = {
+    kind: len(json.dumps({"op": kind, "path": "", "value": 0})) + 1
+    for kind in ("add", "replace")
+}
+_REPLACE_SIZE = _VALUE_SIZES["replace"]
+
+
+# Where `_Walk.dispatch` counts two values: their path's length, its
+# tokens and the tallies (see `_Walk.count`).
+type _At = tuple[int, tuple[str, ...] | None, _Tally, _Tally | None]
+
+
+class _Tally:
+    """The running counts of one list of operations. Every operation
+    counts a path of its own; lists take back the ones they address
+    twice (see `_Walk.list_ops`)."""
+
+    __slots__ = ("ops", "paths", "size", "values")
+
+    def __init__(self) -> None:
+        self.ops = {"add": 0, "remove": 0, "replace": 0}
+        self.paths = 0
+        # The operations' JSON, each with its ", " (or the brackets),
+        # but for the values they write, which are measured at the end
+        # all at once (see `_Walk.values_size`).
+        self.size = 0
+        self.values: list[Any] = []
+
+    def stats(self, walk: _Walk) -> PatchStats:
+        return PatchStats(
+            {kind: n for kind, n in self.ops.items() if n},
+            self.paths,
+            (self.size + walk.values_size(self.values)) or 2,
+        )
+
+
+class _Walk:
+    """A diff that counts its operations rather than building them.
+
+    Paths are the length of their escaped tokens with their slashes, as
+    JSON (the root, `/`, is `or 1`), and the values written are kept to
+    be encoded together (see `values_size`), so nothing is built but
+    their JSON. `tokens` are the path's tokens, kept only to look up
+    the key functions of `key` mappings.
+    """
+
+    __slots__ = ("by_type", "ctx", "encode", "other_keys", "token_sizes")
+
+    def __init__(self, ctx: _Context, default: Callable[[Any], Any]) -> None:
+        self.ctx = ctx
+        self.encode = JSONEncoder(default=default).encode
+        # The type dispatch of `diff`, with the walk's counts of each
+        # kind (see `dispatch`).
+        self.by_type = _dispatcher(
+            self.dispatched_dicts,
+            self.dispatched_lists,
+            self.dispatched_sets,
+            self.dispatched_replace,
+            self.dispatched_arrays,
+            self.dispatched_replace,
+        )
+        # The JSON lengths of the string keys seen so far, as tokens.
+        self.token_sizes: dict[str, int] = {}
+        # How many keys of other types were measured (see `dicts`).
+        self.other_keys = 0
+
+    def token_size(self, key: Any) -> int:
+        """The JSON length of `key` as a pointer token."""
+        if key.__class__ is not str:
+            # Equal keys of other types (`1` and `True`) render apart.
+            self.other_keys += 1
+            return len(json.dumps(escape(str(key)))) - 2
+        size = self.token_sizes.get(key)
+        if size is None:
+            token = escape(key)
+            size = self.token_sizes[key] = (
+                len(token)
+                if token.isascii() and token.isalnum()
+                else len(json.dumps(token)) - 2
+            )
+        return size
+
+    def values_size(self, values: list[Any]) -> int:
+        """The lengths of `values` as JSON, added up.
+
+        They are encoded as one list, in C, which only adds its brackets
+        and a `, ` between values; one by one, encoding them would cost
+        more than the diff.
+        """
+        if not values:
+            return 0
+        try:
+            return len(self.encode(values)) - 2 * len(values)
+        except (TypeError, ValueError):
+            return sum(map(self.value_size, values))
+
+    def value_size(self, value: Any) -> int:
+        """The length of `value` as JSON."""
+        try:
+            return len(self.encode(value))
+        except (TypeError, ValueError):
+            # Keys JSON can't encode, or a value that holds itself.
+            return len(json.dumps(str(value)))
+
+    def measure(self, tally: _Tally, ops: list[Operation]) -> None:
+        """Count operations that were built, like the walk counts them."""
+        for op in ops:
+            path = len(json.dumps(str(op["path"]))) - 2
+            kind = op["op"]
+            if kind == "remove":
+                self.remove(tally, path)
+            elif kind in _VALUE_SIZES:
+                self.write(tally, kind, path, cast("Any", op)["value"])
+            else:
+                # Moves and splices, which the walk doesn't make.
+                tally.ops[kind] = tally.ops.get(kind, 0) + 1
+                tally.size += self.value_size(to_str_paths([op])[0]) + 2
+        tally.paths = len({str(op["path"]) for op in ops})
+
+    def remove(self, tally: _Tally, path: int) -> None:
+        tally.ops["remove"] += 1
+        tally.paths += 1
+        tally.size += _REMOVE_SIZE + (path or 1)
+
+    def write(self, tally: _Tally, kind: str, path: int, value: Any) -> None:
+        tally.ops[kind] += 1
+        tally.paths += 1
+        tally.size += _VALUE_SIZES[kind] + (path or 1)
+        tally.values.append(value)
+
+    def replace(
+        self,
+        tally: _Tally,
+        rtally: _Tally | None,
+        path: int,
+        input: Any,
+        output: Any,
+    ) -> None:
+        # `write`, inlined for the most common operations.
+        size = _REPLACE_SIZE + (path or 1)
+        tally.ops["replace"] += 1
+        tally.paths += 1
+        tally.size += size
+        tally.values.append(output)
+        if rtally is not None:
+            rtally.ops["replace"] += 1
+            rtally.paths += 1
+            rtally.size += size
+            rtally.values.append(input)
+
+    def count(
+        self,
+        input: Any,
+        output: Any,
+        path: int,
+        tokens: tuple[str, ...] | None,
+        tally: _Tally,
+        rtally: _Tally | None,
+    ) -> bool:
+        """Count the operations of diffing `input` into `output` into
+        `tally`, and its reverse operations into `rtally` (if any), like
+        `_diff` builds them. Returns whether an operation addresses the
+        path itself, replacing the value there."""
+        if input is output:
+            return False
+        equal = self.ctx.equal
+        if input.__class__ in _SCALAR_TYPES and output.__class__ in _SCALAR_TYPES:
+            if input == output if equal is None else equal(input, output):
+                return False
+            self.replace(tally, rtally, path, input, output)
+            return True
+        try:
+            if equal is None:
+                cls = input.__class__
+                if not (cls is output.__class__ and cls in _WALKED_TYPES) and (
+                    input == output
+                ):
+                    return False
+            elif equal(input, output):
+                return False
+        except ValueError:
+            pass
+        return self.dispatch(input, output, path, tokens, tally, rtally)
+
+    def dispatch(
+        self,
+        input: Any,
+        output: Any,
+        path: int,
+        tokens: tuple[str, ...] | None,
+        tally: _Tally,
+        rtally: _Tally | None,
+    ) -> bool:
+        """Count two values that are known to differ, by their types,
+        as `_dispatch` diffs them (with the dispatch it is built by)."""
+        return self.by_type(input, output, (path, tokens, tally, rtally), self.ctx)
+
+    # The handlers of `by_type`, which get the rest of the arguments of
+    # `dispatch` as a tuple in place of a pointer.
+
+    def dispatched_dicts(self, input: Any, output: Any, at: _At, ctx: _Context) -> bool:
+        self.dicts(input, output, *at)
+        return False
+
+    def dispatched_lists(self, input: Any, output: Any, at: _At, ctx: _Context) -> bool:
+        self.lists(input, output, *at)
+        return False
+
+    def dispatched_sets(self, input: Any, output: Any, at: _At, ctx: _Context) -> bool:
+        path, _, tally, rtally = at
+        self.sets(input, output, path, tally, rtally)
+        return False
+
+    def dispatched_arrays(
+        self, input: Any, output: Any, at: _At, ctx: _Context
+    ) -> bool:
+        path, _, tally, rtally = at
+        return self.arrays(input, output, path, tally, rtally)
+
+    def dispatched_replace(
+        self, input: Any, output: Any, at: _At, ctx: _Context
+    ) -> bool:
+        path, _, tally, rtally = at
+        self.replace(tally, rtally, path, input, output)
+        return True
+
+    def dicts(
+        self,
+        input: Any,
+        output: Any,
+        path: int,
+        tokens: tuple[str, ...] | None,
+        tally: _Tally,
+        rtally: _Tally | None,
+    ) -> None:
+        """Count like `diff_dicts`: removes, adds and the common keys'
+        operations, in both directions at once."""
+        equal = self.ctx.equal
+        get = output.get
+        token_sizes = self.token_sizes
+        other_keys = self.other_keys
+        removed = 0
+        # The keys of the operations that address a key's own path.
+        addressed = []
+        for key, value in input.items():
+            other = get(key, _NOTHING)
+            if other is _NOTHING:
+                removed += 1
+                key_path = path + 1 + self.token_size(key)
+                self.remove(tally, key_path)
+                if rtally is not None:
+                    self.write(rtally, "add", key_path, value)
+                addressed.append(key)
+                continue
+            if value is other:
+                continue
+            try:
+                if value == other if equal is None else equal(value, other):
+                    continue
+            except ValueError:
+                pass
+            key_path = path + 1 + (token_sizes.get(key) or self.token_size(key))
+            value_cls = value.__class__
+            if value_cls in _SCALAR_TYPES and other.__class__ in _SCALAR_TYPES:
+                self.replace(tally, rtally, key_path, value, other)
+                addressed.append(key)
+            elif value_cls is dict and other.__class__ is dict:
+                # They differ: skip `count` and the dispatch.
+                self.dicts(
+                    value,
+                    other,
+                    key_path,
+                    None if tokens is None else (*tokens, str(key)),
+                    tally,
+                    rtally,
+                )
+            elif self.count(
+                value,
+                other,
+                key_path,
+                None if tokens is None else (*tokens, str(key)),
+                tally,
+                rtally,
+            ):
+                addressed.append(key)
+        if len(input) - removed < len(output):
+            for key in output:
+                if key not in input:
+                    key_path = path + 1 + self.token_size(key)
+                    self.write(tally, "add", key_path, output[key])
+                    if rtally is not None:
+                        self.remove(rtally, key_path)
+                    addressed.append(key)
+        if self.other_keys != other_keys:
+            # Keys of other types can render like another key (`1` and
+            # `"1"`), and then address the same path.
+            twice = len(addressed) - len({str(key) for key in addressed})
+            tally.paths -= twice
+            if rtally is not None:
+                rtally.paths -= twice
+
+    def sets(
+        self,
+        input: Any,
+        output: Any,
+        path: int,
+        tally: _Tally,
+        rtally: _Tally | None,
+    ) -> None:
+        """Count like `diff_sets`: removes by element, adds at `-`."""
+        removed = input - output
+        if not removed and len(input) == len(output):
+            return
+        added = output - input
+        dash_path = path + 2
+        for values, counts, other_counts in (
+            (removed, tally, rtally),
+            (added, rtally, tally),
+        ):
+            tokens = set()
+            for value in values:
+                value_path = path + 1 + self.token_size(value)
+                if counts is not None:
+                    self.remove(counts, value_path)
+                    counts.paths -= str(value) in tokens
+                    tokens.add(str(value))
+                if other_counts is not None:
+                    self.write(other_counts, "add", dash_path, value)
+            if values and other_counts is not None:
+                # Every add addresses the same `-`.
+                other_counts.paths -= len(values) - 1
+
+    def lists(
+        self,
+        input: Any,
+        output: Any,
+        path: int,
+        tokens: tuple[str, ...] | None,
+        tally: _Tally,
+        rtally: _Tally | None,
+    ) -> None:
+        """Count like `diff_lists`: align the lists with `_align_lists`,
+        then count the operations `_list_ops` would make of the hunks
+        (see `list_ops`)."""
+        ctx = self.ctx
+        key = ctx.key if ctx.path_keys is None else ctx.path_keys.get(tokens or ())
+        try:
+            prefix, sub_input, sub_output, hunks = _align_lists(input, output, key, ctx)
+        except ValueError:
+            # Elements that `==` can't compare (see `diff_lists`).
+            self.ctx = ctx.tolerant()
+            try:
+                self.lists(input, output, path, tokens, tally, rtally)
+            finally:
+                self.ctx = ctx
+            return
+        if not hunks and key is None:
+            return
+        pairs = []
+        for dels, inss, _, _ in hunks:
+            if key is not None:
+                pairs.append([])
+            elif ctx.pairing == "similarity" and dels and inss:
+                pairs.append(_similar_pairs(sub_input, sub_output, dels, inss))
+            else:
+                pairs.append(list(zip(dels, inss, strict=False)))
+        self.list_ops(
+            sub_input,
+            sub_output,
+            [(dels, inss, i) for dels, inss, i, _ in hunks],
+            pairs,
+            key is not None,
+            prefix,
+            len(input),
+            path,
+            tokens,
+            tally,
+        )
+        if rtally is not None:
+            self.list_ops(
+                sub_output,
+                sub_input,
+                [(inss, dels, j) for dels, inss, _, j in hunks],
+                [[(s, d) for d, s in hunk_pairs] for hunk_pairs in pairs],
+                key is not None,
+                prefix,
+                len(output),
+                path,
+                tokens,
+                rtally,
+            )
+
+    def list_ops(
+        self,
+        source: list,
+        target: list,
+        hunks: list[tuple[list[int], list[int], int]],
+        pairs: list[list[tuple[int, int]]],
+        keyed: bool,
+        prefix: int,
+        list_len: int,
+        path: int,
+        tokens: tuple[str, ...] | None,
+        tally: _Tally,
+    ) -> None:
+        """Count the operations that turn `source` into `target`, as
+        `_emit_hunk` (and `_emit_kept` for `keyed` lists) emit them and
+        `_pad_ops` pads their indices, recursing into the pairs like a
+        diff of their own.
+
+        Several operations may address the same index (a run of
+        removes, say), which counts as one path.
+        """
+        addressed: set[Any] = set()
+
+        def address(token: Any, counted: bool) -> None:
+            # `counted` tells whether the operation counted its path.
+            if token in addressed:
+                tally.paths -= counted
+            elif counted:
+                addressed.add(token)
+
+        def pair(original: Any, value: Any, index: int) -> None:
+            address(
+                index,
+                self.count(
+                    original,
+                    value,
+                    path + 1 + len(str(index)),
+                    None if tokens is None else (*tokens, str(index)),
+                    tally,
+                    None,
+                ),
+            )
+
+        def kept(i: int, end: int, j: int) -> None:
+            equal = self.ctx.equal
+            for offset in range(end - i):
+                original = source[i + offset]
+                value = target[j + offset]
+                if original is value or (
+                    original == value if equal is None else equal(original, value)
+                ):
+                    continue
+                pair(original, value, i + offset + prefix + padding)
+
+        padding = 0
+        kept_i = kept_j = 0
+        for (dels, inss, start), hunk_pairs in zip(hunks, pairs, strict=True):
+            if keyed:
+                kept(kept_i, start, kept_j)
+            cursor = start
+            d = s = 0
+            for pair_d, pair_s in (*hunk_pairs, (-1, -1)):
+                while d < len(dels) and dels[d] != pair_d:
+                    index = dels[d] + prefix + padding
+                    self.remove(tally, path + 1 + len(str(index)))
+                    address(index, True)
+                    padding -= 1
+                    cursor = dels[d] + 1
+                    d += 1
+                while s < len(inss) and inss[s] != pair_s:
+                    index = cursor + prefix + padding
+                    token = index if index < list_len + padding else "-"
+                    self.write(
+                        tally, "add", path + 1 + len(str(token)), target[inss[s]]
+                    )
+                    address(token, True)
+                    padding += 1
+                    s += 1
+                if pair_d < 0:
+                    break
+                pair(source[pair_d], target[pair_s], pair_d + prefix + padding)
+                cursor = pair_d + 1
+                d += 1
+                s += 1
+            kept_i, kept_j = start + len(dels), kept_j + (start - kept_i) + len(inss)
+        if keyed:
+            kept(kept_i, len(source), kept_j)
+
+    def arrays(
+        self,
+        input: Any,
+        output: Any,
+        path: int,
+        tally: _Tally,
+        rtally: _Tally | None,
+    ) -> bool:
+        """Count like `diff_arrays`, which is vectorized: its
+        operations, which hold ranges of the arrays, are built and
+        measured."""
+        ops, rops = diff_arrays(input, output, Pointer(), rtally is not None)
+        for counts, array_ops in ((tally, ops), (rtally, rops)):
+            if counts is None:
+                continue
+            for op in array_ops:
+                range_path = path
+                for token in op["path"].tokens:
+                    range_path += 1 + len(str(token))
+                # They are all replaces.
+                self.write(counts, "replace", range_path, cast("Any", op)["value"])
+        return bool(ops) and not ops[0]["path"].tokens
+
+
+def diff_stats(
+    input: Diffable,
+    output: Diffable,
+    ptr: Pointer | None = None,
+    *,
+    fingerprints: Fingerprints | bool = False,
+    trust_identity: bool = False,
+    eq: Callable[[Any, Any], bool] | None = None,
+    rel_tol: float | None = None,
+    abs_tol: float | None = None,
+    key: ListKey | Mapping[str | Pointer, ListKey] | None = None,
+    moves: bool = False,
+    algorithm: ListAlgorithm = "myers",
+    pairing: ListPairing = "position",
+    reverse: bool = True,
+    max_depth: int | None = None,
+    max_ops_per_node: int | None = None,
+    replace_ratio: float | None = None,
+    splice_strings: int | None = None,
+    immutables: bool = False,
+    include: PathPatterns | None = None,
+    exclude: PathPatterns | None = None,
+    default: Callable[[Any], Any] | None = None,
+) -> tuple[PatchStats, PatchStats]:
+    """Count the operations of [`diff`][patchdiff.diff.diff] in both
+    directions, and measure them, without building them.
+
+    The documents are compared and aligned the way `diff` does, so the
+    counts are exactly those of its operations, but no operations and
+    no pointers are made: paths are measured as they are walked, and
+    the values of adds and replaces by their JSON. That makes it a
+    cheap way to decide whether a patch is worth sending rather than
+    the whole document.
+
+    The count follows the options that change how values are compared
+    and lists aligned. With `moves`, the cost model (`max_depth`,
+    `max_ops_per_node`, `replace_ratio`), `splice_strings`, `include`
+    or `exclude`, the operations are built by `diff` and measured
+    instead, which costs as much as diffing.
+
+    Args:
+        input: The source object.
+        output: The target object.
+        ptr: Pointer prefix of the operations' paths.
+        fingerprints: As for `diff`.
+        trust_identity: As for `diff`.
+        eq: As for `diff`.
+        rel_tol: As for `diff`.
+        abs_tol: As for `diff`.
+        key: As for `diff`.
+        moves: As for `diff`.
+        algorithm: As for `diff`.
+        pairing: As for `diff`.
+        reverse: As for `diff`: without it, the reverse operations are
+            neither counted nor made, and their stats are empty.
+        max_depth: As for `diff`.
+        max_ops_per_node: As for `diff`.
+        replace_ratio: As for `diff`.
+        splice_strings: As for `diff`.
+        immutables: As for `diff`.
+        include: As for `diff`.
+        exclude: As for `diff`.
+        default: How to encode values that JSON can't, as for
+            `json.dumps` (and `to_json`). Without it they are measured
+            by their `str()`.
+
+    Returns:
+        The [`PatchStats`][patchdiff.stats.PatchStats] of the forward
+        and the reverse operations.
+    """
+    if ptr is None:
+        ptr = Pointer()
+    if fingerprints is True:
+        fingerprints = Fingerprints(maxsize=None)
+    ctx = _Context(
+        fingerprints if isinstance(fingerprints, Fingerprints) else None,
+        **_options(
+            ptr,
+            trust_identity,
+            eq,
+            rel_tol,
+            abs_tol,
+            key,
+            moves,
+            algorithm,
+            pairing,
+            reverse,
+            max_depth,
+            max_ops_per_node,
+            replace_ratio,
+            splice_strings,
+            immutables,
+            include,
+            exclude,
+        ),
+    )
+    walk = _Walk(ctx, str if default is None else default)
+    tally, rtally = _Tally(), _Tally()
+    if not (
+        moves or ctx.limited or splice_strings is not None or ctx.paths is not None
+    ):
+        path = len(json.dumps(str(ptr))) - 2 if ptr.tokens else 0
+        try:
+            walk.count(
+                input,
+                output,
+                path,
+                None if ctx.path_keys is None else _path_tokens(ptr),
+                tally,
+                rtally if reverse else None,
+            )
+            return tally.stats(walk), rtally.stats(walk)
+        except RecursionError:
+            # Nested too deeply to count by recursion: measure the
+            # operations of the diff, which has no depth limit (see
+            # `_walk`), instead.
+            tally, rtally = _Tally(), _Tally()
+    for counts, ops in zip(
+        (tally, rtally), _walk(input, output, ptr, ctx), strict=True
+    ):
+        walk.measure(counts, ops)
+    return tally.stats(walk), rtally.stats(walk)
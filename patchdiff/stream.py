@@ -0,0 +1,142 @@
+"""Streaming diffs: the operations of a diff one at a time, as they
+are consumed, rather than the whole patch at once."""
+
+from __future__ import annotations
+
+from collections.abc import Callable, Iterator, Mapping
+from typing import Any, Literal, cast
+
+from .diff import ListAlgorithm, ListKey, ListPairing, _Context, _options
+from .fingerprint import Fingerprints
+from .paths import PathPatterns
+from .pointer import Pointer
+from .types import Diffable, Operation
+from .walk import _diff_level, _Pending, _Task, _walk
+
+type DiffStream = Literal["forward", "reverse"]
+
+_DIFF_STREAMS = frozenset({"forward", "reverse"})
+
+
+def iter_diff(
+    input: Diffable,
+    output: Diffable,
+    ptr: Pointer | None = None,
+    *,
+    stream: DiffStream = "forward",
+    fingerprints: Fingerprints | bool = False,
+    trust_identity: bool = False,
+    eq: Callable[[Any, Any], bool] | None = None,
+    rel_tol: float | None = None,
+    abs_tol: float | None = None,
+    key: ListKey | Mapping[str | Pointer, ListKey] | None = None,
+    moves: bool = False,
+    algorithm: ListAlgorithm = "myers",
+    pairing: ListPairing = "position",
+    max_depth: int | None = None,
+    max_ops_per_node: int | None = None,
+    replace_ratio: float | None = None,
+    splice_strings: int | None = None,
+    immutables: bool = False,
+    include: PathPatterns | None = None,
+    exclude: PathPatterns | None = None,
+) -> Iterator[Operation]:
+    """Yield the operations of [`diff`][patchdiff.diff.diff] one at a
+    time, in the same order, without building the whole patch.
+
+    The documents are diffed a level at a time, as the operations are
+    consumed: nested containers are only diffed into once the stream
+    gets to them. Memory use is bounded by the operations of the
+    containers on the current path (their own adds, removes and
+    replaces, and the alignments of their lists) rather than by the
+    size of the patch, so the operations can be written out as they
+    come.
+
+    Args:
+        input: The source object.
+        output: The target object.
+        ptr: Pointer prefix for the emitted operations.
+        stream: Which operations to yield: the `"forward"` ones, or
+            the `"reverse"` ones (the second list `diff` returns). Call
+            `iter_diff` twice to get both.
+        fingerprints: As for `diff`.
+        trust_identity: As for `diff`.
+        eq: As for `diff`.
+        rel_tol: As for `diff`.
+        abs_tol: As for `diff`.
+        key: As for `diff`.
+        moves: As for `diff`.
+        algorithm: As for `diff`.
+        pairing: As for `diff`.
+        max_depth: As for `diff`.
+        max_ops_per_node: As for `diff`. The limit can only be checked
+            once all operations of a container are known, so the
+            children of the top-level container are each diffed whole
+            (rather than a level at a time) when it is set.
+        replace_ratio: As for `diff`, and diffs the children of the
+            top-level container whole, like `max_ops_per_node`.
+        splice_strings: As for `diff`.
+        immutables: As for `diff`.
+        include: As for `diff`.
+        exclude: As for `diff`.
+
+    Yields:
+        The operations of `stream`.
+    """
+    if stream not in _DIFF_STREAMS:
+        raise ValueError(f"Unknown diff stream: {stream!r}")
+    reverse = stream == "reverse"
+    if ptr is None:
+        ptr = Pointer()
+    if fingerprints is True:
+        fingerprints = Fingerprints(maxsize=None)
+    ctx = _Context(
+        fingerprints if isinstance(fingerprints, Fingerprints) else None,
+        # The forward stream never needs the reverse operations.
+        **_options(
+            ptr,
+            trust_identity,
+            eq,
+            rel_tol,
+            abs_tol,
+            key,
+            moves,
+            algorithm,
+            pairing,
+            reverse,
+            max_depth,
+            max_ops_per_node,
+            replace_ratio,
+            splice_strings,
+            immutables,
+            include,
+            exclude,
+        ),
+    )
+
+    # The cost model is checked on all of a child's operations at once.
+    whole = max_ops_per_node is not None or replace_ratio is not None
+
+    def level(
+        input: Any, output: Any, ptr: Pointer, side: int
+    ) -> tuple[Iterator[Operation], list[_Task]]:
+        ops, rops, tasks = _diff_level(input, output, ptr, ctx)
+        return iter(rops if side else ops), tasks
+
+    # A stack of the levels on the current path: each stand-in is
+    # replaced by the operations of diffing its pair, a level deeper.
+    stack = [level(input, output, ptr, 1 if reverse else 0)]
+    while stack:
+        ops, tasks = stack[-1]
+        for op in ops:
+            if op.__class__ is _Pending:
+                pending = cast("_Pending", op)
+                if whole:
+                    child = _walk(*tasks[pending.task], ctx)
+                    stack.append((iter(child[pending.side]), []))
+                else:
+                    stack.append(level(*tasks[pending.task], pending.side))
+                break
+            yield op
+        else:
+            stack.pop()
@@ -33,4 +33,27 @@ class ReplaceOperation(TypedDict):
     value: Any
 
 
-type Operation = AddOperation | RemoveOperation | ReplaceOperation
+class SpliceOperation(TypedDict):
+    """A `splice` operation, an extension to JSON patch: replaces
+    `delete` characters of the string at `path`, from `offset` on, by
+    `value`."""
+
+    op: Literal["splice"]
+    path: Pointer
+    offset: int
+    delete: int
+    value: str
+
+
+# "from" is a keyword, hence the functional syntax.
+MoveOperation = TypedDict(
+    "MoveOperation",
+    {"op": Literal["move"], "from": "Pointer", "path": "Pointer"},
+)
+MoveOperation.__doc__ = """A `move` JSON patch operation: removes the value at `from`
+and adds it at `path` (resolved after the removal)."""
+
+
+type Operation = (
+    AddOperation | RemoveOperation | ReplaceOperation | MoveOperation | SpliceOperation
+)
@@ -0,0 +1,259 @@
+"""The walk: diffing documents nested any number of levels deep.
+
+`_diff` recurses into the values it diffs, which the call stack only
+allows so many levels of. `_walk` recurses `_RECURSION_DEPTH` levels at
+a time: deeper pairs of values are collected as tasks, with stand-ins
+(`_Pending`) in place of their operations, and are diffed as the
+stand-ins are replaced. `_diff_level` collects the pairs below a single
+level the same way, for the parallel engine and `iter_diff`.
+"""
+
+from __future__ import annotations
+
+from collections.abc import Iterator
+from typing import TYPE_CHECKING, Any, cast
+
+from .cost import _over_limits, _replace
+from .pointer import Pointer
+
+if TYPE_CHECKING:
+    from .diff import _Context
+    from .types import Operation
+
+type _Task = tuple[Any, Any, Pointer]
+
+
+class _Pending:
+    """Stands in for the operations of a pair of children that
+    `_diff_level` didn't recurse into: the forward (`side` 0) or reverse
+    (`side` 1) operations of diffing its `task`."""
+
+    __slots__ = ("side", "task")
+
+    def __init__(self, task: int, side: int) -> None:
+        self.task = task
+        self.side = side
+
+
+def _diff_level(
+    input: Any, output: Any, ptr: Pointer, ctx: _Context
+) -> tuple[list[Operation], list[Operation], list[_Task]]:
+    """Diff `input` and `output` one level deep.
+
+    The pairs of children that dicts and lists recurse into are
+    collected as tasks instead, with `_Pending` stand-ins in the
+    operation lists where their operations go. Diffing the tasks and
+    putting their operations in place of the stand-ins yields exactly
+    what `_diff` returns (diffing the tasks with `_walk`, which makes
+    the checks of the cost model that `_diff_limited` leaves to it; the
+    top-level container itself is never replaced).
+    """
+    tasks: list[_Task] = []
+
+    def collect(
+        input: Any, output: Any, ptr: Pointer, ctx: _Context
+    ) -> tuple[list[Operation], list[Operation]]:
+        task = len(tasks)
+        tasks.append((input, output, ptr))
+        return cast("list[Operation]", [_Pending(task, 0)]), cast(
+            "list[Operation]", [_Pending(task, 1)]
+        )
+
+    descend = ctx.descend
+    ctx.descend = collect
+    try:
+        ops, rops = descend(input, output, ptr, ctx)
+    finally:
+        ctx.descend = descend
+    return ops, rops, tasks
+
+
+# Types whose values have no children to recurse into: `_diff` diffs a
+# pair with one of them on either side right away, however deep it is
+# (see `_Walk`).
+_LEAF_TYPES = frozenset({int, float, complex, bool, str, bytes, type(None)})
+
+# How many levels below each of its tasks `_walk` diffs by recursing,
+# a few frames per level, before it collects the pairs of children as
+# tasks of their own (at least one level: the pair of values of a task
+# itself is diffed). Recursing is the fastest way to diff a level, and
+# most documents are never deeper than this.
+_RECURSION_DEPTH = 32
+
+# A pair of children collected by `_walk`: the values, their pointer,
+# the context to diff them with, and whether to build their reverse
+# operations.
+type _WalkTask = tuple[Any, Any, Pointer, _Context, bool]
+
+
+class _Walk:
+    """The state of `_walk`: the tasks collected so far, the operations
+    of those that were diffed already, and the pointer length from which
+    `_diff` collects pairs of values rather than diffing them.
+
+    `checked` tells whether the cost model's `max_ops` or
+    `replace_ratio` applies, which needs all of the operations of each
+    pair of values it diffs.
+    """
+
+    __slots__ = ("checked", "depth", "done", "tasks")
+
+    def __init__(self, checked: bool) -> None:
+        self.checked = checked
+        self.depth = 0
+        self.done: dict[int, tuple[list[Operation], list[Operation]]] = {}
+        self.tasks: list[_WalkTask | None] = []
+
+    def collect(
+        self,
+        input: Any,
+        output: Any,
+        ptr: Pointer,
+        ctx: _Context,
+        done: tuple[list[Operation], list[Operation]] | None = None,
+    ) -> tuple[list[Operation], list[Operation]]:
+        """Collect a pair of values as a task, returning `_Pending`
+        stand-ins for its operations. The operations are those `done`
+        already (which hold stand-ins themselves, and are yet to be
+        checked against the cost model), if given."""
+        tasks = self.tasks
+        task = len(tasks)
+        tasks.append((input, output, ptr, ctx, ctx.reverse))
+        if done is not None:
+            self.done[task] = done
+        return cast("list[Operation]", [_Pending(task, 0)]), cast(
+            "list[Operation]", [_Pending(task, 1)] if ctx.reverse else []
+        )
+
+    def run(self, task: _WalkTask) -> tuple[list[Operation], list[Operation]]:
+        """Diff the values of a task, in the directions it was collected
+        for, recursing `_RECURSION_DEPTH` levels into them."""
+        input, output, ptr, ctx, reverse = task
+        self.depth = len(ptr.tokens) + _RECURSION_DEPTH
+        if ctx.reverse is reverse:
+            return ctx.descend(input, output, ptr, ctx)
+        # Collected for its forward operations only (see `_pad_ops`).
+        ctx.reverse = reverse
+        try:
+            return ctx.descend(input, output, ptr, ctx)
+        finally:
+            ctx.reverse = not reverse
+
+    def splice(
+        self, ops: list[Operation], rops: list[Operation]
+    ) -> tuple[list[Operation], list[Operation]]:
+        """Put the operations of the collected tasks in place of their
+        stand-ins in `ops` and `rops`, in order.
+
+        The forward operations are spliced first. Each task is diffed
+        once its stand-in is reached, and its reverse operations are
+        kept until theirs is. A stack holds the operation lists of the
+        tasks on the current path, and what was spliced of them so far.
+        When `checked`, each task's operations are spliced into a list
+        of their own, and checked against the cost model once all of
+        them are in: a task that is over its limits is replaced
+        wholesale, in both directions.
+        """
+        tasks = self.tasks
+        done = self.done
+        checked = self.checked
+        # The reverse operations of the tasks that were diffed, until
+        # they are spliced, and whether they hold stand-ins.
+        reverse_ops: dict[int, tuple[list[Operation], bool]] = {}
+        spliced = []
+        for side_ops in ops, rops:
+            out: list[Operation] = []
+            stack: list[tuple[Iterator[Operation], list[Operation], Any]] = []
+            level = iter(side_ops)
+            # The task whose operations are spliced, if they are checked.
+            current: tuple[int, _WalkTask] | None = None
+            while True:
+                for op in level:
+                    if op.__class__ is not _Pending:
+                        out.append(op)
+                        continue
+                    pending = cast("_Pending", op)
+                    index = pending.task
+                    child: tuple[int, _WalkTask] | None = None
+                    if pending.side:
+                        child_ops, nested = reverse_ops.pop(index)
+                    else:
+                        task = cast("_WalkTask", tasks[index])
+                        tasks[index] = None
+                        if index in done:
+                            child_ops, child_rops = done.pop(index)
+                            nested = True
+                        else:
+                            collected = len(tasks)
+                            child_ops, child_rops = self.run(task)
+                            nested = len(tasks) > collected
+                        if task[4]:
+                            reverse_ops[index] = child_rops, nested
+                        if checked:
+                            child = index, task
+                    if not nested:
+                        if child is not None:
+                            child_ops = _checked(child_ops, child, reverse_ops)
+                        out.extend(child_ops)
+                        continue
+                    stack.append((level, out, current))
+                    level = iter(child_ops)
+                    current = child
+                    if checked:
+                        out = []
+                    break
+                else:
+                    if not stack:
+                        break
+                    if current is not None:
+                        out = _checked(out, current, reverse_ops)
+                    child_out = out
+                    level, out, current = stack.pop()
+                    if checked:
+                        out.extend(child_out)
+            spliced.append(out)
+        return spliced[0], spliced[1]
+
+
+def _checked(
+    ops: list[Operation],
+    task: tuple[int, _WalkTask],
+    reverse_ops: dict[int, tuple[list[Operation], bool]],
+) -> list[Operation]:
+    """Check all of the operations of a task of `_walk` against the cost
+    model, replacing its values wholesale (in both directions) when they
+    are over its limits."""
+    index, (input, output, ptr, ctx, reverse) = task
+    if len(ptr.tokens) <= ctx.root_depth or not _over_limits(
+        input, output, ptr, ops, ctx
+    ):
+        return ops
+    ops, rops = _replace(input, output, ptr, ctx)
+    if reverse:
+        reverse_ops[index] = rops, False
+    return ops
+
+
+def _walk(
+    input: Any, output: Any, ptr: Pointer, ctx: _Context
+) -> tuple[list[Operation], list[Operation]]:
+    """Diff `input` and `output` like `_diff`, but with a stack of work
+    rather than the call stack beyond `_RECURSION_DEPTH` levels, so that
+    documents nested any number of levels deep can be diffed.
+
+    Deeper pairs of values are collected as tasks (see `_Walk`), and
+    diffed as their stand-ins are spliced, in the order `_diff` emits
+    their operations. The values, and the tasks, are diffed with
+    `ctx.descend` (which is `_diff`).
+    """
+    if input.__class__ in _LEAF_TYPES or output.__class__ in _LEAF_TYPES:
+        return ctx.descend(input, output, ptr, ctx)
+    walk = ctx.walk = _Walk(ctx.max_ops is not None or ctx.replace_ratio is not None)
+    walk.depth = len(ptr.tokens) + _RECURSION_DEPTH
+    try:
+        ops, rops = ctx.descend(input, output, ptr, ctx)
+        if walk.tasks:
+            ops, rops = walk.splice(ops, rops)
+        return ops, rops
+    finally:
+        ctx.walk = None
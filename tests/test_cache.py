@@ -0,0 +1,119 @@
+import gc
+import importlib
+from dataclasses import dataclass
+
+import pytest
+
+from patchdiff import DiffCache, apply, diff, produce, to_json
+
+cache_module = importlib.import_module("patchdiff.cache")
+
+
+def _versions(count):
+    state = {"items": [{"id": i, "tags": [i]} for i in range(20)], "n": 0}
+    versions = [state]
+    for i in range(count):
+
+        def recipe(draft, i=i):
+            draft["items"][i % 20]["tags"].append(i)
+            draft["n"] += 1
+
+        state = produce(state, recipe)[0]
+        versions.append(state)
+    return versions
+
+
+def test_cached_diffs_match_diff():
+    a, b, c = _versions(2)
+    cache = DiffCache(reverse=False)
+    ops, rops = cache.diff(a, b)
+    assert (ops, rops) == diff(a, b, reverse=False)
+    assert apply(a, ops) == b
+    # The same pair again: the same operations, without diffing.
+    assert cache.diff(a, b) == (ops, rops)
+    # Pairs are ordered.
+    assert cache.diff(b, a)[0] == diff(b, a)[0]
+    assert cache.diff(b, c)[0] != ops
+    assert len(cache) == 3
+
+
+def test_cached_operations_are_copied_for_each_call():
+    a, b = _versions(1)
+    cache = DiffCache()
+    ops, rops = cache.diff(a, b)
+    ops[0]["path"] = None
+    ops.append(ops[0])
+    rops.clear()
+    assert cache.diff(a, b) == diff(a, b)
+    assert to_json(cache.diff(a, b)[0]) == to_json(diff(a, b)[0])
+    # Applying copies the values, which leaves the cached ones alone.
+    before, after = {"x": 1}, {"x": [1]}
+    patched = apply(before, cache.diff(before, after)[0])
+    patched["x"].append(2)
+    assert cache.diff(before, after)[0][0]["value"] == [1]
+
+
+def test_least_recently_used_diffs_are_evicted(monkeypatch):
+    diffed = []
+
+    def counting_diff(input, output, **options):
+        diffed.append((input, output))
+        return diff(input, output, **options)
+
+    monkeypatch.setattr(cache_module, "diff", counting_diff)
+    versions = _versions(4)
+    cache = DiffCache(maxsize=2)
+    cache.diff(versions[0], versions[1])
+    cache.diff(versions[1], versions[2])
+    cache.diff(versions[0], versions[1])
+    cache.diff(versions[2], versions[3])
+    assert len(cache) == 2
+    assert len(diffed) == 3
+    # The second pair was the least recently used one.
+    cache.diff(versions[0], versions[1])
+    assert len(diffed) == 3
+    cache.diff(versions[1], versions[2])
+    assert len(diffed) == 4
+
+
+@dataclass
+class State:
+    items: list
+    n: int
+
+
+def test_diffs_of_collected_states_are_dropped():
+    a = State([1, 2], 0)
+    b = State([1, 2, 3], 1)
+    cache = DiffCache()
+    ops, _ = cache.diff(a, b)
+    assert [op["op"] for op in ops] == ["add", "replace"]
+    assert len(cache) == 1
+    del b
+    gc.collect()
+    assert len(cache) == 0
+    # Builtin containers are held by the cache while cached.
+    cache.diff({"a": 1}, {"a": 2})
+    gc.collect()
+    assert len(cache) == 1
+
+
+def test_invalidate():
+    a, b, c = _versions(2)
+    cache = DiffCache()
+    cache.diff(a, b)
+    cache.diff(b, c)
+    cache.diff(a, c)
+    cache.invalidate(c)
+    assert len(cache) == 1
+    b["n"] = 100
+    cache.invalidate(b)
+    assert len(cache) == 0
+    assert cache.diff(a, b)[0][-1]["value"] == 100
+    cache.clear()
+    assert len(cache) == 0
+
+
+def test_invalid_maxsize():
+    with pytest.raises(ValueError, match="maxsize"):
+        DiffCache(maxsize=0)
@@ -0,0 +1,226 @@
+"""Test has_changes and first_difference, which stop at the first
+difference rather than diffing the documents."""
+
+from collections import OrderedDict, UserDict, UserList
+from copy import deepcopy
+from dataclasses import dataclass
+from typing import NamedTuple
+
+import pytest
+from hypothesis import given
+from hypothesis import strategies as st
+
+from patchdiff import diff, first_difference, has_changes
+from patchdiff.fingerprint import Fingerprints
+from patchdiff.pointer import Pointer
+from patchdiff.registry import TypeAdapter, register
+
+
+def test_equal_documents():
+    a = {"a": [1, {"b": 2}], "c": {3}}
+    assert first_difference(a, a) is None
+    assert first_difference(a, {"a": [1, {"b": 2}], "c": {3}}) is None
+    assert not has_changes(a, {"a": [1, {"b": 2}], "c": {3}})
+    assert not has_changes(1, 1.0)
+
+
+def test_dicts():
+    a = {"a": 1, "b": {"c": [1, 2], "d": 4}, "e": 5}
+    assert first_difference(a, {**a, "b": {"c": [1, 3], "d": 5}}) == Pointer(
+        ["b", "c", 1]
+    )
+    # Keys that only one side has are found in the order diff walks
+    # them: the input's keys, then the output's own.
+    assert first_difference(a, {"b": a["b"], "e": 6}) == Pointer(["a"])
+    assert first_difference(a, {**a, "f": 6}) == Pointer(["f"])
+    assert first_difference({"a": None}, {"a": None, "b": None}) == Pointer(["b"])
+    assert first_difference({"a": None}, {}) == Pointer(["a"])
+    assert has_changes(a, {**a, "e": 6})
+
+
+def test_lists():
+    records = [{"id": i, "tags": ["x"]} for i in range(5)]
+    changed = [*records[:3], {"id": 3, "tags": ["y"]}, records[4]]
+    assert first_difference(records, changed) == Pointer([3, "tags", 0])
+    # Once an element is added or removed, positions don't line up.
+    assert first_difference(records, [*records[:2], *records[3:]]) == Pointer([2])
+    assert first_difference(records, [*records, {"id": 5}]) == Pointer([5])
+    assert first_difference(records[:2], records[:1]) == Pointer([1])
+    assert first_difference([[1], 2], [[1], 3]) == Pointer([1])
+
+
+def test_values_that_differ_as_a_whole():
+    assert first_difference(1, 2) == Pointer()
+    assert first_difference({"a": [1]}, {"a": (1,)}) == Pointer(["a"])
+    assert first_difference({"a": {1, 2}}, {"a": {1, 3}}) == Pointer(["a"])
+    assert first_difference({"a": "abc"}, {"a": "abd"}) == Pointer(["a"])
+    assert first_difference([(1, 2)], [(1, 3)]) == Pointer([0])
+    assert first_difference([(1, 2)], [(1, 3)], immutables=True) == Pointer([0, 1])
+    nan = float("nan")
+    assert first_difference({"x": nan}, {"x": nan}) is None
+    assert first_difference({"x": nan}, {"x": float("nan")}) == Pointer(["x"])
+
+
+@dataclass
+class Reading:
+    value: float
+    tags: list
+
+
+class Span(NamedTuple):
+    start: int
+    end: int
+
+
+class Tags(set):
+    pass
+
+
+class Row:
+    def __init__(self, cells):
+        self.cells = cells
+
+    def __eq__(self, other):
+        return other.__class__ is Row and self.cells == other.cells
+
+
+def test_registered_and_duck_typed_containers():
+    a = [Reading(1.0, ["a"]), Span(1, 2)]
+    assert first_difference(a, [Reading(1.0, ["b"]), Span(1, 2)]) == Pointer(
+        [0, "tags", 0]
+    )
+    assert first_difference(a, [a[0], Span(1, 3)]) == Pointer([1, "end"])
+    register(Tags, TypeAdapter("set", build=lambda value, items: Tags(items)))
+    try:
+        assert first_difference([Tags({1})], [Tags({2})]) == Pointer([0])
+    finally:
+        register(Tags, None)
+    register(Row, TypeAdapter("list", view=lambda row: row.cells))
+    try:
+        assert first_difference([Row([1, 2])], [Row([1, 3])]) == Pointer([0, 1])
+    finally:
+        register(Row, None)
+    assert first_difference(UserList([1, 2]), UserList([1, 3])) == Pointer([1])
+    assert first_difference(UserDict(a=[1]), UserDict(a=[2])) == Pointer(["a", 0])
+    # Ordered dicts that only differ in order compare unequal, but diff
+    # finds nothing between them.
+    a = OrderedDict(a=1, b=2)
+    b = OrderedDict(b=2, a=1)
+    assert diff(a, b) == ([], [])
+    assert first_difference(a, b) is None
+    assert first_difference(a, OrderedDict(b=2, a=3)) == Pointer(["a"])
+
+
+def test_equal_sets_under_trust_identity():
+    # Equal containers that aren't the same object are looked into,
+    # and sets (which diff compares whole) are equal there.
+    for a in ({"b": {1}}, {"b": {"x": {1}}}, [frozenset({1})]):
+        b = deepcopy(a)
+        assert diff(a, b, trust_identity=True, immutables=True) == ([], [])
+        assert not has_changes(a, b, trust_identity=True, immutables=True)
+        assert first_difference(a, b, trust_identity=True, immutables=True) is None
+    assert first_difference({"b": {1}}, {"b": {2}}, trust_identity=True) == Pointer(
+        ["b"]
+    )
+    register(Tags, TypeAdapter("set", build=lambda value, items: Tags(items)))
+    try:
+        assert not has_changes([Tags({1})], [Tags({1})], trust_identity=True)
+        assert first_difference([Tags({1})], [Tags({2})], trust_identity=True) == (
+            Pointer([0])
+        )
+    finally:
+        register(Tags, None)
+
+
+def test_options():
+    a = {"t": 20.0, "meta": {"seen": 1}, "items": [1, 2]}
+    b = {"t": 20.0000001, "meta": {"seen": 2}, "items": [1, 2, 3]}
+    assert first_difference(a, b) == Pointer(["t"])
+    assert first_difference(a, b, rel_tol=1e-6) == Pointer(["meta", "seen"])
+    assert first_difference(a, b, rel_tol=1e-6, exclude=["/meta"]) == Pointer(
+        ["items", 2]
+    )
+    assert not has_changes(a, b, rel_tol=1e-6, exclude=["/meta", "/items/2"])
+    assert not has_changes(a, b, rel_tol=1e-6, include=["/items/0", "/items/1"])
+    assert first_difference(a, b, include=["/meta"]) == Pointer(["meta", "seen"])
+    assert first_difference(
+        [{"a": 1, "b": 1}], [{"a": 1, "b": 2}, {"a": 2}], exclude=["/0/b"]
+    ) == Pointer([1])
+    assert not has_changes({"a": 1}, {"a": 1, "b": 2}, exclude=["/b"])
+    assert first_difference(a, b, Pointer(["doc"]), include=["/doc/items"]) == Pointer(
+        ["doc", "items", 2]
+    )
+    shared = [1]
+    assert not has_changes({"a": shared}, {"a": shared}, trust_identity=True)
+    assert first_difference([[1]], [[1]], trust_identity=True) is None
+    assert first_difference([[1]], [[2]], trust_identity=True) == Pointer([0, 0])
+    fingerprints = Fingerprints()
+    assert first_difference(a, b, fingerprints=fingerprints) == Pointer(["t"])
+    assert first_difference(a, b, fingerprints=True) == Pointer(["t"])
+    with pytest.raises(ValueError, match="negative"):
+        has_changes(a, b, rel_tol=-1)
+
+
+def _resolve(document, ptr):
+    for token in ptr.tokens:
+        if isinstance(document, dict):
+            if token not in document:
+                return None, False
+        elif token >= len(document):
+            return None, False
+        document = document[token]
+    return document, True
+
+
+scalars = st.none() | st.booleans() | st.integers(-3, 3) | st.text(max_size=2)
+documents = st.recursive(
+    scalars,
+    lambda children: (
+        st.lists(children, max_size=4)
+        | st.dictionaries(st.sampled_from("abc"), children, max_size=3)
+    ),
+    max_leaves=12,
+)
+
+
+@given(st.dictionaries(st.sampled_from("abc"), documents), documents)
+def test_first_difference_agrees_with_diff(a, b):
+    b = {**a, "b": b} if b is not None else a
+    ptr = first_difference(a, b)
+    ops, _ = diff(a, b)
+    assert (ptr is None) == (not ops)
+    assert has_changes(a, b) == bool(ops)
+    if ptr is not None:
+        # The documents hold different values there (or only one holds
+        # one at all).
+        assert _resolve(a, ptr) != _resolve(b, ptr)
+
+
+def test_deep_documents():
+    # Deeper than `==` recurses.
+    a = b = 1
+    for _ in range(5100):
+        a = {"a": [a]}
+        b = {"a": [b]}
+    assert first_difference(a, b) is None
+    assert not has_changes([a, b], [b, a])
+    assert first_difference([a], [b, 1]) == Pointer([1])
+    assert first_difference({"a": a}, {"a": a, "b": b}) == Pointer(["b"])
+
+
+class TooDeep:
+    """Nested deeper than `==` can recurse, as far as `==` can tell."""
+
+    def __eq__(self, other):
+        raise RecursionError("maximum recursion depth exceeded in comparison")
+
+    __hash__ = object.__hash__
+
+
+def test_values_nested_too_deeply_to_compare():
+    a, b = TooDeep(), TooDeep()
+    assert first_difference({"x": [a]}, {"x": [b]}) == Pointer(["x", 0])
+    assert first_difference({"x": a}, {"x": a}) is None
+    # Past an element that was added or removed, the difference is at
+    # the element, however deep below it the values differ.
+    assert first_difference([{"x": a}], [{"x": b}, 1]) == Pointer([0])
@@ -1,6 +1,7 @@
 import random
 
 from patchdiff import apply, diff
+from patchdiff.diff import diff_dicts, diff_lists, diff_sets
 from patchdiff.pointer import Pointer
 
 
@@ -172,6 +173,15 @@ def test_mixed():
     ]
 
 
+def test_options_at_their_defaults():
+    a = {"a": [5, 7, 9, {"a", "b", "c"}], "b": 6, "n": 1}
+    b = {"a": [5, 2, 9, {"b", "c"}], "b": 6, "c": 7, "n": "1"}
+    defaults = {"moves": False, "algorithm": "myers", "reverse": True}
+    assert diff(a, b, **defaults) == diff(a, b)
+    assert diff(a["n"], b["n"], **defaults) == diff(a["n"], b["n"])
+    assert diff(a, a.copy(), **defaults) == diff(a, a.copy()) == ([], [])
+
+
 def _random_dict(rng, n_keys, value_pool):
     return {f"k{i}": rng.choice(value_pool) for i in range(n_keys)}
 
@@ -225,3 +235,90 @@ def test_set_diff_roundtrip_property():
         ops, rops = diff(a, b)
         assert apply(a, ops) == b
         assert apply(b, rops) == a
+
+
+def test_container_diffs_without_context():
+    ptr = Pointer(["x"])
+    assert diff_lists([1, 2], [1, 3], ptr) == diff({"x": [1, 2]}, {"x": [1, 3]})
+    assert diff_dicts({"a": 1}, {"a": 2}, ptr) == diff({"x": {"a": 1}}, {"x": {"a": 2}})
+    assert diff_sets({1}, {2}, ptr) == diff({"x": {1}}, {"x": {2}})
+
+
+def test_forward_only_diff():
+    a = {
+        "records": [{"id": i, "v": i} for i in range(6)],
+        "moved": [1, 2, 3, 4],
+        "old": {"big": [1, 2]},
+        "set": {1, 2},
+    }
+    b = {
+        "records": [{"id": 5, "v": 5}, {"id": 1, "v": 10}, {"id": 2}, {"id": 9}],
+        "moved": [4, 1, 2, 3],
+        "new": {"big": [1, 2]},
+        "set": {2, 3},
+    }
+    for kwargs in (
+        {},
+        {"moves": True},
+        {"key": {"/records": lambda record: record["id"]}, "moves": True},
+    ):
+        ops, rops = diff(a, b, reverse=False, **kwargs)
+        assert rops == []
+        assert ops == diff(a, b, **kwargs)[0]
+        assert apply(a, ops) == b
+
+
+def test_equal_copies_have_no_ops():
+    value = {
+        "d": {"a": 1, "b": [1, {"c": {1, 2}}]},
+        "l": [1, [2, 3], {"x": (1, 2)}],
+        "s": {1, "a", (1, 2)},
+        "t": (1, [2]),
+        "n": 1,
+    }
+    copy = {
+        "n": 1.0,
+        "t": (1, [2]),
+        "s": {(1, 2), "a", 1},
+        "l": [1, [2, 3], {"x": (1, 2)}],
+        "d": {"b": [1, {"c": {2, 1}}], "a": True},
+    }
+    assert diff(value, copy) == ([], [])
+    for key, item in value.items():
+        assert diff(item, copy[key]) == ([], [])
+        assert diff(item, copy[key], reverse=False) == ([], [])
+
+
+def test_changed_documents_are_compared_at_most_twice():
+    compared = []
+
+    class Leaf:
+        def __init__(self, value):
+            self.value = value
+
+        def __eq__(self, other):
+            compared.append(self)
+            return self.value == other.value
+
+    a = {"leaves": {str(i): Leaf(i) for i in range(5)}, "changed": {"v": 1}}
+    b = {"leaves": {str(i): Leaf(i) for i in range(5)}, "changed": {"v": 2}}
+    # Once by `==` on the documents, and once more by the walk.
+    ops, _ = diff(a, b)
+    assert ops == [{"op": "replace", "path": Pointer(["changed", "v"]), "value": 2}]
+    assert sorted(leaf.value for leaf in compared) == sorted(list(range(5)) * 2)
+
+
+def test_dict_ops_follow_key_order():
+    a = {"r1": 1, "c1": [1], "r2": 2, "c2": {"x": 1}, "same": 0}
+    b = {"a2": 4, "same": 0, "c2": {"x": 2}, "c1": [2], "a1": 3}
+    ops, rops = diff(a, b)
+    assert ops == [
+        {"op": "remove", "path": Pointer(["r1"])},
+        {"op": "remove", "path": Pointer(["r2"])},
+        {"op": "add", "path": Pointer(["a2"]), "value": 4},
+        {"op": "add", "path": Pointer(["a1"]), "value": 3},
+        {"op": "replace", "path": Pointer(["c1", 0]), "value": 2},
+        {"op": "replace", "path": Pointer(["c2", "x"]), "value": 2},
+    ]
+    assert apply(a, ops) == b
+    assert apply(b, rops) == a
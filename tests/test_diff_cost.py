@@ -0,0 +1,112 @@
+import random
+from copy import deepcopy
+
+import pytest
+
+from patchdiff import apply, diff, iter_diff
+from patchdiff.pointer import Pointer
+
+
+def _replaces(ops):
+    return sorted(str(op["path"]) for op in ops if op["op"] == "replace")
+
+
+def test_max_depth():
+    a = {"a": {"b": {"c": 1, "d": 2}, "e": 3}, "f": [1, 2]}
+    b = {"a": {"b": {"c": 2, "d": 2}, "e": 3}, "f": [1, 3]}
+    assert _replaces(diff(a, b)[0]) == ["/a/b/c", "/f/1"]
+    assert _replaces(diff(a, b, max_depth=2)[0]) == ["/a/b", "/f/1"]
+    assert _replaces(diff(a, b, max_depth=1)[0]) == ["/a", "/f"]
+    # Depth counts from the pointer prefix.
+    ops, _ = diff(a, b, Pointer(["doc"]), max_depth=1)
+    assert _replaces(ops) == ["/doc/a", "/doc/f"]
+    for depth in range(1, 3):
+        ops, rops = diff(a, b, max_depth=depth)
+        assert apply(a, ops) == b
+        assert apply(b, rops) == a
+
+
+def test_max_ops_per_node():
+    a = {"x": {str(i): i for i in range(10)}, "y": list(range(10)), "z": 0}
+    b = {"x": {str(i): -i for i in range(10)}, "y": list(range(0, 20, 2)), "z": 1}
+    ops, rops = diff(a, b, max_ops_per_node=5)
+    assert _replaces(ops) == ["/x", "/y", "/z"]
+    assert apply(a, ops) == b
+    assert apply(b, rops) == a
+    # The root itself is never replaced.
+    ops, _ = diff(a, b, max_ops_per_node=1)
+    assert _replaces(ops) == ["/x", "/y", "/z"]
+
+
+def test_max_ops_per_node_skips_dicts_early():
+    calls = []
+
+    class Key(str):
+        def __eq__(self, other):
+            calls.append(self)
+            return str.__eq__(self, other)
+
+        __hash__ = str.__hash__
+
+    a = {"d": {f"old{i}": i for i in range(5)} | {"deep": [Key("x")]}}
+    b = {"d": {f"new{i}": i for i in range(5)} | {"deep": [Key("y")]}}
+    ops, _ = diff(a, b, max_ops_per_node=4)
+    assert ops == [{"op": "replace", "path": Pointer(["d"]), "value": b["d"]}]
+    # The dict was replaced without comparing its common keys' values.
+    assert calls == []
+    # Renamed keys count once with moves.
+    a = {"d": {f"old{i}": [i] for i in range(3)}}
+    b = {"d": {f"new{i}": [i] for i in range(3)}}
+    ops, _ = diff(a, b, max_ops_per_node=4, moves=True)
+    assert [op["op"] for op in ops] == ["move"] * 3
+
+
+def test_replace_ratio():
+    a = {
+        "mostly": {"a": 1, "b": 2, "c": 3, "d": [1, 2], "e": 5},
+        "barely": {"a": 1, "b": 2, "c": 3, "d": [1, 2], "e": 5},
+    }
+    b = {
+        "mostly": {"a": 2, "b": 3, "c": 4, "d": [1, 3], "e": 5},
+        "barely": {"a": 1, "b": 2, "c": 3, "d": [1, 2], "e": 6},
+    }
+    ops, rops = diff(a, b, replace_ratio=0.5)
+    assert _replaces(ops) == ["/barely/e", "/mostly"]
+    assert apply(a, ops) == b
+    assert apply(b, rops) == a
+    # Added values count with everything in them.
+    a = {"d": {"k": 1, "l": 2}}
+    b = {"d": {"k": 1, "l": 2, "new": {"x": [1, 2, 3]}}}
+    assert _replaces(diff(a, b, replace_ratio=0.5)[0]) == ["/d"]
+    assert _replaces(diff(a, b, replace_ratio=2)[0]) == []
+
+
+def test_cost_model_round_trip_property():
+    rng = random.Random(20261018)
+    pool = [0, 1, "x", [1, 2], {"k": 1}, {"k": [1, {"j": 2}]}, {1, 2}, (1, 2)]
+    for _ in range(200):
+        a = {str(i): deepcopy(rng.choice(pool)) for i in range(rng.randint(0, 6))}
+        b = {str(i): deepcopy(rng.choice(pool)) for i in range(rng.randint(0, 6))}
+        b["l"] = [deepcopy(rng.choice(pool)) for _ in range(rng.randint(0, 6))]
+        for kwargs in (
+            {"max_depth": rng.randint(1, 3)},
+            {"max_ops_per_node": rng.randint(1, 4)},
+            {"replace_ratio": rng.choice([0.2, 0.5, 1.0])},
+        ):
+            ops, rops = diff(a, b, **kwargs)
+            assert apply(a, ops) == b
+            assert apply(b, rops) == a
+            assert list(iter_diff(a, b, **kwargs)) == ops
+
+
+@pytest.mark.parametrize(
+    "kwargs, match",
+    [
+        ({"max_depth": 0}, "max_depth"),
+        ({"max_ops_per_node": 0}, "max_ops_per_node"),
+        ({"replace_ratio": 0}, "replace_ratio"),
+    ],
+)
+def test_invalid_limits(kwargs, match):
+    with pytest.raises(ValueError, match=match):
+        diff({"a": 1}, {"a": 2}, **kwargs)
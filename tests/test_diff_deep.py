@@ -0,0 +1,347 @@
+import importlib
+import math
+import operator
+import random
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, NamedTuple
+
+import pytest
+
+from patchdiff import diff, diff_many, iapply, iter_diff
+from patchdiff.pointer import Pointer
+from patchdiff.registry import TypeAdapter, register
+
+cost_module = importlib.import_module("patchdiff.cost")
+diff_module = importlib.import_module("patchdiff.diff")
+walk_module = importlib.import_module("patchdiff.walk")
+
+
+def _chain(depth, leaf, kind="dict"):
+    """A document `depth` containers deep, with `leaf` at the bottom."""
+    document = leaf
+    for level in range(depth):
+        if kind == "dict" or (kind == "mixed" and level % 2):
+            document = {"a": document, "n": level}
+        else:
+            document = [level, document]
+    return document
+
+
+def _leaf_path(depth, kind="dict"):
+    tokens = []
+    for level in reversed(range(depth)):
+        tokens.append("a" if kind == "dict" or (kind == "mixed" and level % 2) else 1)
+    return Pointer(tokens)
+
+
+@pytest.mark.parametrize("kind", ["dict", "list", "mixed"])
+def test_deep_documents(kind):
+    depth = 1200
+    a = _chain(depth, {"x": 1, "y": [1, 2]}, kind)
+    b = _chain(depth, {"x": 2, "y": [1, 3, 4]}, kind)
+    ops, rops = diff(a, b)
+    leaf = _leaf_path(depth, kind)
+    assert [(op["op"], str(op["path"])) for op in ops] == [
+        ("replace", str(leaf.append("x"))),
+        ("replace", str(leaf.append("y").append(1))),
+        ("add", str(leaf.append("y").append("-"))),
+    ]
+    assert iapply(_chain(depth, {"x": 1, "y": [1, 2]}, kind), ops) == b
+    assert iapply(_chain(depth, {"x": 2, "y": [1, 3, 4]}, kind), rops) == a
+    assert diff(a, _chain(depth, {"x": 1, "y": [1, 2]}, kind)) == ([], [])
+
+
+def test_deeper_than_equality_recurses():
+    a = _chain(10500, 1)
+    ops, rops = diff(a, _chain(10500, 2))
+    assert ops == [{"op": "replace", "path": _leaf_path(10500), "value": 2}]
+    assert rops == [{"op": "replace", "path": _leaf_path(10500), "value": 1}]
+    assert diff(a, _chain(10500, 1)) == ([], [])
+
+
+def test_deep_documents_with_tolerances():
+    depth = 3000
+    a = _chain(depth, {"x": 1.0, "y": [1, 2]})
+    assert diff(a, _chain(depth, {"x": 1.0000001, "y": [1, 2]}), rel_tol=1e-6) == (
+        [],
+        [],
+    )
+    b = _chain(depth, {"x": 2.0, "y": [1, 2]})
+    leaf = _leaf_path(depth).append("x")
+    expected = (
+        [{"op": "replace", "path": leaf, "value": 2.0}],
+        [{"op": "replace", "path": leaf, "value": 1.0}],
+    )
+    assert diff(a, b, rel_tol=1e-6) == expected
+    assert diff(a, b, abs_tol=0.5) == expected
+    # Comparing a level walks down to the difference, and remembers the
+    # way: the levels below don't walk it again (and compare the numbers
+    # on it once).
+    a, b = 1.0, 2.0
+    for level in range(depth):
+        a, b = {"n": float(level), "a": a}, {"n": float(level), "a": b}
+    compared = []
+
+    def eq(x, y):
+        compared.append((x, y))
+        return x == y
+
+    ops, _ = diff(a, b, eq=eq)
+    assert ops == [{"op": "replace", "path": Pointer(["a"] * depth), "value": 2.0}]
+    assert len(compared) < 3 * depth
+
+
+class Span(NamedTuple):
+    start: int
+    end: Any
+
+
+class Tags(set):
+    pass
+
+
+@dataclass
+class Node:
+    value: Any
+    children: list
+
+
+def test_walking_equal_with_a_stack():
+    """Walking with a stack compares like walking by recursion."""
+    rng = random.Random(7)
+    pairs = [
+        ({"a": 1}, {"b": 1}),
+        ({"a": 1}, {"a": 1.0}),
+        ([1, "x"], [1, b"x"]),
+        ((1, [2]), (1, [2.0])),
+        ({1, 2}, {1, 2}),
+        ({1, 2}, {1, 3}),
+        (Span(1, [2]), Span(1, [2])),
+        (Span(1, [2]), Span(1, [3])),
+        (Node(1, [Node(2, [])]), Node(1, [Node(2, [])])),
+        (Node(1, [Node(2, [])]), Node(1, [Node(3, [])])),
+        (OrderedDict(a=[1], b=2), OrderedDict(b=2, a=[1])),
+        (OrderedDict(a=[1]), OrderedDict(a=[1], b=2)),
+    ]
+    for _ in range(200):
+        a = _document(rng, 4)
+        pairs.append((a, _mutate(rng, a)))
+    leaf = operator.eq
+    register(Tags, TypeAdapter("set"))
+    try:
+        pairs += [(Tags({1}), Tags({1})), ([Tags({1})], [Tags({2})])]
+        for a, b in pairs:
+            expected = diff_module._walk_equal(leaf, a, b)
+            unequal = {}
+            assert diff_module._walking_equal_deep(leaf, unequal, a, b) is expected
+            assert diff_module._walking_equal(leaf, unequal, a, b) is expected
+            assert not unequal or not expected
+    finally:
+        register(Tags, None)
+    # The pairs on the way to a difference are remembered, and found
+    # unequal at once.
+    a, b = [[1, [2]]], [[1, [3]]]
+    unequal = {}
+    assert not diff_module._walking_equal_deep(leaf, unequal, a[0], b[0])
+    assert unequal == {
+        (id(a[0]), id(b[0])): (a[0], b[0]),
+        (id(a[0][1]), id(b[0][1])): (a[0][1], b[0][1]),
+    }
+    assert not diff_module._walking_equal_deep(leaf, unequal, a, b)
+    assert len(unequal) == 3
+
+
+def test_deep_documents_with_replace_ratio():
+    depth = 3000
+    a = _chain(depth, {"x": 1, "y": [1, 2]})
+    b = _chain(depth, {"x": 2, "y": [1, 3]})
+    # Every level is replaced in turn, up to the root's child.
+    assert diff(a, b, replace_ratio=0.5) == (
+        [{"op": "replace", "path": Pointer(["a"]), "value": b["a"]}],
+        [{"op": "replace", "path": Pointer(["a"]), "value": a["a"]}],
+    )
+    # The sizes of the values replaced below are counted once.
+    sizes = {}
+    assert cost_module._full_size(b["a"]["a"], sizes) == 2 * depth + 1
+    assert cost_module._size(b["a"], math.inf, sizes) == 2 * depth + 3
+    assert cost_module._size(b["a"], 3, sizes) > 3
+
+
+def test_deep_documents_with_options():
+    depth = 1200
+    a = _chain(depth, {"l": list(range(10)), "s": {1, 2}}, "mixed")
+    b = _chain(depth, {"l": list(range(10, 0, -1)), "s": {1, 3}}, "mixed")
+    leaf = _leaf_path(depth, "mixed")
+    ops, rops = diff(a, b, reverse=False)
+    assert rops == []
+    assert iapply(_chain(depth, {"l": list(range(10)), "s": {1, 2}}, "mixed"), ops) == b
+    # Over its limits, the leaf's list is replaced as a whole, in both
+    # directions.
+    ops, rops = diff(a, b, max_ops_per_node=3)
+    assert [(op["op"], op["path"]) for op in ops] == [
+        ("replace", leaf.append("l")),
+        ("remove", leaf.append("s").append(2)),
+        ("add", leaf.append("s").append("-")),
+    ]
+    assert [(op["op"], op["path"]) for op in rops] == [
+        ("replace", leaf.append("l")),
+        ("remove", leaf.append("s").append(3)),
+        ("add", leaf.append("s").append("-")),
+    ]
+    top = leaf.tokens[0]
+    assert diff(a, b, replace_ratio=0.1) == (
+        [{"op": "replace", "path": Pointer([top]), "value": b[top]}],
+        [{"op": "replace", "path": Pointer([top]), "value": a[top]}],
+    )
+    ops, _ = diff(a, b, moves=True)
+    assert any(op["op"] == "move" for op in ops)
+    assert iapply(_chain(depth, {"l": list(range(10)), "s": {1, 2}}, "mixed"), ops) == b
+    ops, rops = diff(a, b)
+    assert list(iter_diff(a, b)) == ops
+    assert list(iter_diff(a, b, stream="reverse")) == rops
+    assert (
+        list(iter_diff(a, b, max_ops_per_node=3)) == diff(a, b, max_ops_per_node=3)[0]
+    )
+    assert diff_many(a, [b, a]) == [(ops, rops), ([], [])]
+
+
+def _document(rng, depth):
+    r = rng.random()
+    if depth <= 0 or r < 0.3:
+        return rng.choice([0, 1, "a", None, 1.5, (1, 2), (1, 3)])
+    if r < 0.6:
+        return {
+            rng.choice("abcd"): _document(rng, depth - 1)
+            for _ in range(rng.randint(0, 4))
+        }
+    if r < 0.9:
+        return [_document(rng, depth - 1) for _ in range(rng.randint(0, 5))]
+    return {rng.randint(0, 4) for _ in range(rng.randint(0, 3))}
+
+
+def _mutate(rng, value):
+    if isinstance(value, dict):
+        value = {
+            key: _mutate(rng, item) if rng.random() < 0.5 else item
+            for key, item in value.items()
+            if rng.random() < 0.85
+        }
+        if rng.random() < 0.3:
+            value[rng.choice("abcdef")] = _document(rng, 2)
+        return value
+    if isinstance(value, list):
+        value = [_mutate(rng, item) if rng.random() < 0.5 else item for item in value]
+        if value and rng.random() < 0.3:
+            del value[rng.randrange(len(value))]
+        if rng.random() < 0.3:
+            value.insert(rng.randint(0, len(value)), _document(rng, 2))
+        if len(value) > 1 and rng.random() < 0.2:
+            value.reverse()
+        return value
+    return _document(rng, 2) if rng.random() < 0.5 else value
+
+
+@pytest.mark.parametrize(
+    "kwargs",
+    [
+        {},
+        {"reverse": False},
+        {"moves": True},
+        {"pairing": "similarity"},
+        {"max_depth": 3},
+        {"max_ops_per_node": 2},
+        {"replace_ratio": 0.5, "moves": True},
+        {"immutables": True},
+        {"exclude": ["/a/*/b"]},
+        {"include": ["/b", "/c/1"]},
+        {"key": lambda value: repr(value)[:3]},
+    ],
+)
+def test_same_operations_as_recursion(monkeypatch, kwargs):
+    """Diffing a level at a time, with every pair of values a task of
+    its own, makes the operations diffing by recursion makes, in
+    order."""
+    rng = random.Random(25)
+    cases = []
+    for _ in range(40):
+        a = _document(rng, 5)
+        cases.append((a, _mutate(rng, a)))
+    monkeypatch.setattr(walk_module, "_RECURSION_DEPTH", 10**9)
+    expected = [diff(a, b, **kwargs) for a, b in cases]
+    iter_kwargs = {key: value for key, value in kwargs.items() if key != "reverse"}
+    expected_iter = [list(iter_diff(a, b, **iter_kwargs)) for a, b in cases]
+    for depth in 1, 2, 3:
+        monkeypatch.setattr(walk_module, "_RECURSION_DEPTH", depth)
+        assert [diff(a, b, **kwargs) for a, b in cases] == expected
+        assert [list(iter_diff(a, b, **iter_kwargs)) for a, b in cases] == (
+            expected_iter
+        )
+
+
+def test_nested_lists():
+    # The replaces that pad the operations of nested lists are diffed
+    # once per level, not once per level and direction.
+    a = b = 0
+    for level in range(30):
+        a = [level, a, "x"]
+        b = [level, b, "y"]
+    ops, rops = diff(a, b)
+    assert len(ops) == len(rops) == 30
+    assert iapply(_copy(a), ops) == b
+    assert iapply(_copy(b), rops) == a
+
+
+def _copy(value):
+    return [_copy(item) for item in value] if isinstance(value, list) else value
+
+
+class TooDeep:
+    """Nested deeper than `==` can recurse, as far as `==` can tell."""
+
+    def __init__(self, value):
+        self.value = value
+
+    def __eq__(self, other):
+        raise RecursionError("maximum recursion depth exceeded in comparison")
+
+    __hash__ = object.__hash__
+
+
+def test_values_nested_too_deeply_to_compare():
+    a, b = TooDeep(1), TooDeep(1)
+    # They are diffed into, and replaced: they can't be told equal.
+    ops, _ = diff({"x": a, "y": [a, 1]}, {"x": b, "y": [b, 1]})
+    assert [(op["op"], str(op["path"])) for op in ops] == [
+        ("replace", "/x"),
+        ("replace", "/y/0"),
+    ]
+    assert diff({"x": a}, {"x": a}) == ([], [])
+    assert diff(a, b)[0] == [{"op": "replace", "path": Pointer(), "value": b}]
+    ops, _ = diff([a, 1], [b, 2], pairing="similarity")
+    assert [str(op["path"]) for op in ops] == ["/0", "/1"]
+    ops, _ = diff({"x": a, "z": 1}, {"x": b, "z": 2}, exclude=["/z"])
+    assert [str(op["path"]) for op in ops] == ["/x"]
+    ops, _ = diff([{"z": 1}, a], [{"z": 2}, b], exclude=["/0/z"])
+    assert [str(op["path"]) for op in ops] == ["/1"]
+
+
+class Ambiguous:
+    """Has no truth value for `==`, like a NumPy array."""
+
+    def __eq__(self, other):
+        raise ValueError("ambiguous")
+
+    __hash__ = None
+
+
+def test_values_without_truth_value_nested_too_deeply():
+    ambiguous = Ambiguous()
+    a = TooDeep(1)
+    ops, _ = diff([ambiguous, a], [ambiguous, TooDeep(1)])
+    assert [str(op["path"]) for op in ops] == ["/1"]
+    # Compared element by element, a value that deep can't be told
+    # equal either, and is diffed into instead.
+    deep = _chain(1500, ambiguous, "list")
+    ops, _ = diff([ambiguous, deep], [ambiguous, _chain(1500, ambiguous, "list")])
+    assert ops == []
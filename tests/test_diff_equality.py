@@ -0,0 +1,165 @@
+import random
+from dataclasses import dataclass
+from typing import NamedTuple
+
+import pytest
+
+from patchdiff import DiffSession, apply, diff, diff_many, iter_diff
+from patchdiff.pointer import Pointer
+from patchdiff.registry import TypeAdapter, register
+
+NAN = float("nan")
+
+
+def _paths(ops):
+    return [str(op["path"]) for op in ops]
+
+
+def test_jitter_within_tolerance_is_no_change():
+    a = {"t": 20.0, "readings": [1.0, 2.0, NAN], "meta": {"ok": True}}
+    b = {
+        "t": 20.0000001,
+        "readings": [1.0, 2.0000001, float("nan")],
+        "meta": {"ok": True},
+    }
+    assert _paths(diff(a, b)[0]) == ["/t", "/readings/1", "/readings/2"]
+    assert diff(a, b, rel_tol=1e-6) == ([], [])
+    assert diff(a, b, abs_tol=1e-3) == ([], [])
+    # Beyond the tolerance, the value is replaced as usual.
+    b["t"] = 21.0
+    assert diff(a, b, rel_tol=1e-6)[0] == [
+        {"op": "replace", "path": Pointer(["t"]), "value": 21.0}
+    ]
+
+
+def test_nan_equals_nan_with_exact_comparisons():
+    a, b = {"x": NAN, "y": [NAN, 1.0]}, {"x": float("nan"), "y": [NAN, 1.0]}
+    assert _paths(diff(a, b)[0]) == ["/x"]
+    assert diff(a, b, rel_tol=0) == ([], [])
+    assert _paths(diff({"x": 1.0}, {"x": 1.0000001}, abs_tol=0)[0]) == ["/x"]
+    assert _paths(diff({"x": NAN}, {"x": 1.0}, abs_tol=0)[0]) == ["/x"]
+
+
+def test_tolerances_compare_ints_with_floats_only():
+    assert diff([1, 2.0], [1.0000001, 2], rel_tol=1e-6) == ([], [])
+    # Ints are compared exactly, and so are bools.
+    assert _paths(diff([10**20], [10**20 + 1], rel_tol=0.1)[0]) == ["/0"]
+    assert _paths(diff([True], [1.0000001], rel_tol=0.1)[0]) == ["/0"]
+    # An int too large for a float is close to no float.
+    assert _paths(diff([10**400], [1.0], rel_tol=0.1)[0]) == ["/0"]
+
+
+def test_top_level_values():
+    assert diff(1.0, 1.0000001, rel_tol=1e-6) == ([], [])
+    assert list(iter_diff(NAN, NAN, abs_tol=0)) == []
+
+
+def test_lists_align_on_close_elements():
+    a = [0, 1.0, 2.0, 3.0, 5]
+    b = [9, 1.0000001, 2.0000001, 3.0000001, 8]
+    ops, _ = diff(a, b, rel_tol=1e-6)
+    assert _paths(ops) == ["/0", "/4"]
+    # An insertion lines up the close elements behind it (the snake).
+    ops, _ = diff(a, [0, 7, *b[1:4], 5], rel_tol=1e-6)
+    assert ops == [{"op": "add", "path": Pointer([1]), "value": 7}]
+    # Keyed lists compare the aligned records with the tolerance too.
+    a = [{"id": 1, "v": 1.0}, {"id": 2, "v": 2.0}]
+    b = [{"id": 1, "v": 1.0000001}, {"id": 2, "v": 2.5}]
+    ops, _ = diff(a, b, key=lambda record: record["id"], rel_tol=1e-6)
+    assert _paths(ops) == ["/1/v"]
+
+
+def test_eq_hook():
+    def eq(a, b):
+        if isinstance(a, str) and isinstance(b, str):
+            return a.casefold() == b.casefold()
+        return a == b
+
+    a = {"name": "Ada", "tags": ["X", "y"], "n": 1}
+    b = {"name": "ADA", "tags": ["x", "Y", "z"], "n": 2}
+    ops, _ = diff(a, b, eq=eq)
+    assert ops == [
+        {"op": "add", "path": Pointer(["tags", "-"]), "value": "z"},
+        {"op": "replace", "path": Pointer(["n"]), "value": 2},
+    ]
+    assert list(iter_diff(a, b, eq=eq)) == ops
+    # The tolerances compare the numbers, `eq` everything else.
+    b["n"] = 1.0000001
+    assert _paths(diff(a, b, eq=eq, rel_tol=1e-6)[0]) == ["/tags/-"]
+
+
+def test_eq_walks_registered_types_and_compares_sets_whole():
+    @dataclass
+    class Reading:
+        value: float
+        tags: list
+
+    class Point(NamedTuple):
+        x: float
+        y: float
+
+    a = [Reading(1.0, ["a"]), Point(1.0, 2.0), (1.0, 2.0), {1.0}]
+    b = [Reading(1.0000001, ["a"]), Point(1.0, 2.0000001), (1.0000001, 2.0), {1.0}]
+    assert diff(a, b, rel_tol=1e-6) == ([], [])
+    assert _paths(diff([{1.0}], [{1.0000001}], rel_tol=1e-6)[0]) == ["/0/1.0", "/0/-"]
+    assert _paths(diff([(1.0,)], [(1.0, 2.0)], rel_tol=1e-6)[0]) == ["/0"]
+    assert _paths(diff([{"a": 1.0}], [{"b": 1.0}], rel_tol=1e-6)[0]) == ["/0/a", "/0/b"]
+
+
+class Tags(set):
+    pass
+
+
+def test_eq_compares_registered_sets_whole():
+    register(Tags, TypeAdapter("set", build=lambda value, items: Tags(items)))
+    try:
+        assert diff([Tags({1.0})], [Tags({1.0})], rel_tol=1e-6) == ([], [])
+        ops, _ = diff([Tags({1.0})], [Tags({1.0000001})], rel_tol=1e-6)
+        assert _paths(ops) == ["/0/1.0", "/0/-"]
+    finally:
+        register(Tags, None)
+
+
+def test_tolerances_with_trusted_identity():
+    shared = [1.0]
+    a = {"shared": shared, "x": 1.0, "copy": [1.0]}
+    b = {"shared": shared, "x": 1.0000001, "copy": [1.0000001]}
+    assert diff(a, b, trust_identity=True, rel_tol=1e-6) == ([], [])
+    assert _paths(diff(a, b, trust_identity=True)[0]) == ["/x", "/copy/0"]
+
+
+def test_tolerances_everywhere_options_go():
+    rng = random.Random(5)
+    states = [[round(rng.random(), 3) for _ in range(20)] for _ in range(4)]
+    jittered = [[value + 1e-9 for value in state] for state in states]
+    for ops, _ in diff_many(states[0], jittered, rel_tol=1e-6)[1:]:
+        assert ops
+    assert diff_many(states[0], jittered, rel_tol=1e-6)[0] == ([], [])
+    assert diff(states[0], jittered[0], rel_tol=1e-6, workers=2) == ([], [])
+    session = DiffSession(states[0], rel_tol=1e-6)
+    assert session.diff(jittered[0]) == ([], [])
+
+
+def test_round_trip_with_tolerance():
+    rng = random.Random(22)
+    for _ in range(200):
+        a = [rng.choice([1.0, 2.0, NAN, 3]) for _ in range(rng.randint(0, 12))]
+        b = [value + 1e-9 if rng.random() < 0.5 else value for value in a]
+        for _ in range(rng.randint(0, 3)):
+            b.insert(rng.randint(0, len(b)), rng.choice([4.0, 5]))
+        ops, rops = diff(a, b, rel_tol=1e-6)
+        assert all(op["op"] == "add" for op in ops)
+        patched = apply(a, ops)
+        assert len(patched) == len(b)
+        assert apply(patched, rops) == a
+
+
+def test_invalid_equality_options():
+    with pytest.raises(ValueError, match="negative"):
+        diff(1.0, 2.0, rel_tol=-1)
+    with pytest.raises(ValueError, match="negative"):
+        diff(1.0, 2.0, abs_tol=-1)
+    with pytest.raises(ValueError, match="fingerprints"):
+        diff(1.0, 2.0, rel_tol=0.1, fingerprints=True)
+    with pytest.raises(ValueError, match="fingerprints"):
+        diff(1.0, 2.0, eq=lambda a, b: a == b, fingerprints=True)
@@ -0,0 +1,108 @@
+import json
+import random
+
+from patchdiff import apply, diff, iapply, iter_diff, to_json
+from patchdiff.pointer import Pointer
+
+
+def test_tuples_are_diffed_by_position():
+    points = tuple((i, i * 2) for i in range(10_000))
+    moved = (*points[:5000], (5000, -1), *points[5001:])
+    a, b = {"points": points}, {"points": moved}
+    ops, rops = diff(a, b, immutables=True)
+    assert ops == [{"op": "replace", "path": Pointer(["points", 5000, 1]), "value": -1}]
+    assert rops == [
+        {"op": "replace", "path": Pointer(["points", 5000, 1]), "value": 10_000}
+    ]
+    patched = apply(a, ops)
+    assert patched == b
+    assert patched["points"].__class__ is tuple
+    assert apply(b, rops) == a
+    # Without the option, tuples are atomic as always.
+    assert diff(a, b)[0] == [
+        {"op": "replace", "path": Pointer(["points"]), "value": moved}
+    ]
+
+
+def test_frozensets_are_diffed_like_sets():
+    a = {"tags": frozenset({"a", "b", ("c", 1)})}
+    b = {"tags": frozenset({"a", "d", ("c", 1)})}
+    ops, rops = diff(a, b, immutables=True)
+    assert ops == [
+        {"op": "remove", "path": Pointer(["tags", "b"])},
+        {"op": "add", "path": Pointer(["tags", "-"]), "value": "d"},
+    ]
+    patched = apply(a, ops)
+    assert patched == b
+    assert patched["tags"].__class__ is frozenset
+    assert apply(b, rops) == a
+
+
+def test_nested_immutables_are_rebuilt_to_the_root():
+    a = ((1, [2, (3, 4)]), frozenset({5}))
+    b = ((1, [2, (3, 5)]), frozenset({5}))
+    ops, rops = diff(a, b, immutables=True)
+    assert ops == [{"op": "replace", "path": Pointer([0, 1, 1, 1]), "value": 5}]
+    inner = a[0][1]
+    patched = iapply(a, ops)
+    assert patched == b
+    # The list in between is patched in place, the tuples are rebuilt.
+    assert patched[0][1] is inner
+    assert iapply(patched, rops) == a
+
+
+def test_immutables_round_trip_property():
+    rng = random.Random(20261018)
+
+    def value(depth):
+        kind = rng.choice(
+            ["tuple", "frozenset", "list", "scalar"] if depth else ["scalar"]
+        )
+        if kind == "tuple":
+            return tuple(value(depth - 1) for _ in range(rng.randint(0, 4)))
+        if kind == "frozenset":
+            return frozenset(rng.randint(0, 5) for _ in range(rng.randint(0, 4)))
+        if kind == "list":
+            return [value(depth - 1) for _ in range(rng.randint(0, 4))]
+        return rng.randint(0, 3)
+
+    for _ in range(300):
+        a, b = {"v": value(3)}, {"v": value(3)}
+        for kwargs in ({}, {"moves": True}, {"replace_ratio": 0.5}):
+            ops, rops = diff(a, b, immutables=True, **kwargs)
+            assert apply(a, ops) == b
+            assert apply(b, rops) == a
+            assert list(iter_diff(a, b, immutables=True, **kwargs)) == ops
+
+
+def test_parsed_pointers_into_tuples():
+    a = {"t": (1, (2, 3))}
+    b = {"t": (1, (2, 4))}
+    ops, _ = diff(a, b, immutables=True)
+    reloaded = [
+        {**op, "path": Pointer.from_str(op["path"])} for op in json.loads(to_json(ops))
+    ]
+    assert reloaded[0]["path"] == Pointer(["t", "1", "1"])
+    assert apply(a, reloaded) == b
+
+
+def test_moves_inside_tuples():
+    a = {"t": (1, 2, 3, 4, 5)}
+    b = {"t": (5, 1, 2, 3, 4)}
+    ops, rops = diff(a, b, immutables=True, moves=True)
+    assert ops == [{"op": "move", "from": Pointer(["t", 4]), "path": Pointer(["t", 0])}]
+    assert apply(a, ops) == b
+    assert apply(b, rops) == a
+    assert iapply(
+        (1, 2, 3), [{"op": "move", "from": Pointer([0]), "path": Pointer(["-"])}]
+    ) == (2, 3, 1)
+    # Parsed pointers carry string tokens.
+    reloaded = [
+        {
+            **op,
+            "from": Pointer.from_str(str(op["from"])),
+            "path": Pointer.from_str(str(op["path"])),
+        }
+        for op in ops
+    ]
+    assert iapply({"t": (1, 2, 3, 4, 5)}, reloaded) == b
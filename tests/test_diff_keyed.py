@@ -0,0 +1,134 @@
+import random
+from copy import deepcopy
+
+from patchdiff import apply, diff
+from patchdiff.pointer import Pointer
+
+
+def by_id(record):
+    return record["id"]
+
+
+def test_insert_in_front_of_an_edited_record():
+    a = [{"id": 1, "v": 1}, {"id": 2, "v": 2}]
+    b = [{"id": 0, "v": 0}, {"id": 1, "v": 10}, {"id": 2, "v": 2}]
+
+    ops, rops = diff(a, b, key=by_id)
+
+    assert ops == [
+        {"op": "add", "path": Pointer([0]), "value": {"id": 0, "v": 0}},
+        {"op": "replace", "path": Pointer([1, "v"]), "value": 10},
+    ]
+    assert rops == [
+        {"op": "remove", "path": Pointer([0])},
+        {"op": "replace", "path": Pointer([0, "v"]), "value": 1},
+    ]
+    assert apply(a, ops) == b
+    assert apply(b, rops) == a
+
+
+def test_unrelated_records_are_not_paired():
+    a = [{"id": 1, "v": 1}, {"id": 2, "name": "two"}, {"id": 3, "v": 3}]
+    b = [{"id": 1, "v": 1}, {"id": 4, "title": "four"}, {"id": 3, "v": 30}]
+
+    ops, rops = diff(a, b, key=by_id)
+
+    assert ops == [
+        {"op": "remove", "path": Pointer([1])},
+        {"op": "add", "path": Pointer([1]), "value": {"id": 4, "title": "four"}},
+        {"op": "replace", "path": Pointer([2, "v"]), "value": 30},
+    ]
+    assert rops == [
+        {"op": "remove", "path": Pointer([1])},
+        {"op": "add", "path": Pointer([1]), "value": {"id": 2, "name": "two"}},
+        {"op": "replace", "path": Pointer([2, "v"]), "value": 3},
+    ]
+
+
+def test_reordered_record_is_removed_and_added():
+    a = [{"id": i, "v": i} for i in range(5)]
+    b = [a[0], a[2], a[3], a[1], a[4]]
+
+    ops, rops = diff(a, b, key=by_id)
+
+    assert [op["op"] for op in ops] == ["remove", "add"]
+    assert apply(a, ops) == b
+    assert apply(b, rops) == a
+
+
+def test_changes_before_and_after_hunks():
+    a = [{"id": i, "v": i} for i in range(6)]
+    b = deepcopy(a)
+    b[0]["v"] = -1
+    b[1]["v"] = -2
+    del b[3]
+    b[4]["v"] = -5
+
+    ops, rops = diff(a, b, key=by_id)
+
+    assert ops == [
+        {"op": "replace", "path": Pointer([0, "v"]), "value": -1},
+        {"op": "replace", "path": Pointer([1, "v"]), "value": -2},
+        {"op": "remove", "path": Pointer([3])},
+        {"op": "replace", "path": Pointer([4, "v"]), "value": -5},
+    ]
+    assert apply(a, ops) == b
+    assert apply(b, rops) == a
+
+
+def test_key_per_path():
+    a = {
+        "users": [{"id": 1, "n": "a"}, {"id": 2, "n": "b"}],
+        "groups": [{"members": [{"id": 1, "r": 0}, {"id": 2, "r": 0}]}],
+        "plain": [{"id": 1, "v": 1}],
+    }
+    b = {
+        "users": [{"id": 0, "n": "z"}, {"id": 1, "n": "a"}, {"id": 2, "n": "c"}],
+        "groups": [{"members": [{"id": 2, "r": 1}]}],
+        "plain": [{"id": 0, "v": 0}, {"id": 1, "v": 10}],
+    }
+    keys = {"/users": by_id, Pointer(["groups", 0, "members"]): by_id}
+
+    ops, rops = diff(a, b, key=keys)
+
+    by_path = {str(op["path"]): op for op in ops}
+    assert by_path["/users/0"]["op"] == "add"
+    assert by_path["/users/2/n"]["value"] == "c"
+    assert by_path["/groups/0/members/0"]["op"] == "remove"
+    assert by_path["/groups/0/members/0/r"]["value"] == 1
+    # Lists without a key are aligned by value as usual, which pairs the
+    # edited record with the inserted one.
+    assert by_path["/plain/0/id"]["value"] == 0
+    assert by_path["/plain/-"]["value"] == {"id": 1, "v": 10}
+    assert apply(a, ops) == b
+    assert apply(b, rops) == a
+
+
+def test_key_with_fingerprints_and_equal_documents():
+    a = [{"id": 1, "v": [1]}, {"id": 2, "v": [2]}]
+    b = [{"id": 2, "v": [2]}, {"id": 1, "v": [1]}]
+    ops, rops = diff(a, b, key=by_id, fingerprints=True)
+    assert apply(a, ops) == b
+    assert apply(b, rops) == a
+    assert diff(a, deepcopy(a), key=by_id) == ([], [])
+
+
+def test_keyed_round_trip_property():
+    rng = random.Random(20261019)
+    for _ in range(50):
+        ids = rng.sample(range(30), k=rng.randint(0, 12))
+        a = [{"id": i, "v": rng.randint(0, 3)} for i in ids]
+        b = deepcopy(a)
+        for _ in range(rng.randint(0, 4)):
+            kind = rng.choice(["edit", "insert", "delete", "move"])
+            if kind == "insert" or not b:
+                b.insert(rng.randint(0, len(b)), {"id": 100 + rng.randint(0, 50)})
+            elif kind == "edit":
+                rng.choice(b)["v"] = -1
+            elif kind == "delete":
+                del b[rng.randrange(len(b))]
+            else:
+                b.insert(rng.randint(0, len(b) - 1), b.pop(rng.randrange(len(b))))
+        ops, rops = diff(a, b, key=lambda record: record["id"])
+        assert apply(a, ops) == b
+        assert apply(b, rops) == a
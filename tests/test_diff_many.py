@@ -0,0 +1,94 @@
+import random
+from copy import deepcopy
+from operator import itemgetter
+
+import pytest
+
+from patchdiff import apply, diff, diff_many
+from patchdiff.fingerprint import Fingerprints, container_ids
+from patchdiff.pointer import Pointer
+
+
+def _states(seed, count):
+    rng = random.Random(seed)
+    base = {
+        "records": [{"id": i, "tags": [i % 3, i % 5]} for i in range(30)],
+        "settings": {"a": 1, "b": [1, 2]},
+    }
+    targets = []
+    for _ in range(count):
+        target = deepcopy(base)
+        records = target["records"]
+        records.append(records.pop(rng.randrange(len(records))))
+        records[rng.randrange(len(records))]["tags"].append(-1)
+        del records[rng.randrange(len(records))]
+        target["settings"]["b"] = rng.sample(range(5), 3)
+        targets.append(target)
+    return base, targets
+
+
+@pytest.mark.parametrize(
+    "kwargs",
+    [
+        {},
+        {"moves": True},
+        {"algorithm": "patience"},
+        {"fingerprints": True},
+        {"key": {"/records": itemgetter("id")}},
+        {"reverse": False},
+        {"max_ops_per_node": 3},
+    ],
+)
+def test_diff_many_matches_diff(kwargs):
+    base, targets = _states(1, 5)
+    results = diff_many(base, iter(targets), **kwargs)
+    assert results == [diff(base, target, **kwargs) for target in targets]
+    for target, (ops, rops) in zip(targets, results, strict=True):
+        assert apply(base, ops) == target
+        if rops:
+            assert apply(target, rops) == base
+
+
+def test_diff_many_with_prefix_and_no_outputs():
+    base, targets = _states(2, 2)
+    assert diff_many(base, targets, Pointer(["doc"])) == [
+        diff(base, target, Pointer(["doc"])) for target in targets
+    ]
+    assert diff_many(base, []) == []
+
+
+def test_input_is_hashed_once(monkeypatch):
+    base, targets = _states(3, 10)
+    digested = []
+    digest_container = Fingerprints._digest_container
+
+    def counting(self, value, tag):
+        digested.append(id(value))
+        return digest_container(self, value, tag)
+
+    monkeypatch.setattr(Fingerprints, "_digest_container", counting)
+    diff_many(base, targets, algorithm="patience")
+    base_ids = container_ids(base)
+    base_digests = [key for key in digested if key in base_ids]
+    assert base_digests
+    assert len(base_digests) == len(set(base_digests))
+
+
+def test_callers_cache_keeps_everything():
+    base, targets = _states(4, 3)
+    fingerprints = Fingerprints()
+    diff_many(base, targets, fingerprints=fingerprints)
+    assert len(fingerprints) > len(container_ids(base))
+
+
+def test_container_ids():
+    key = (1, (2,))
+    value = {key: [{3}, frozenset(), "s"], "n": 1}
+    assert container_ids(value) == {
+        id(value),
+        id(key),
+        id(key[1]),
+        id(value[key]),
+        id(value[key][0]),
+        id(value[key][1]),
+    }
@@ -0,0 +1,156 @@
+import json
+import random
+from copy import deepcopy
+
+from patchdiff import apply, diff, iapply, to_json
+from patchdiff.pointer import Pointer
+from patchdiff.serialize import to_str_paths
+
+
+def by_id(record):
+    return record["id"]
+
+
+def test_list_element_moved_to_the_end():
+    ops, rops = diff([1, 2, 3], [2, 3, 1], moves=True)
+    assert ops == [{"op": "move", "from": Pointer([0]), "path": Pointer(["-"])}]
+    assert rops == [{"op": "move", "from": Pointer([2]), "path": Pointer([0])}]
+
+
+def test_moved_record_is_not_copied_into_the_patch():
+    a = [{"id": i, "payload": list(range(100))} for i in range(5)]
+    b = [a[0], a[3], a[1], a[2], a[4]]
+    ops, rops = diff(a, b, moves=True)
+    assert ops == [{"op": "move", "from": Pointer([3]), "path": Pointer([1])}]
+    assert rops == [{"op": "move", "from": Pointer([1]), "path": Pointer([3])}]
+    assert apply(a, ops) == b
+    assert apply(b, rops) == a
+
+
+def test_moves_combined_with_other_edits():
+    a = ["a", "b", "c", "d", "e", "f"]
+    b = ["x", "e", "a", "c", "d", "b"]
+    ops, rops = diff(a, b, moves=True)
+    assert sorted(op["op"] for op in ops) == ["add", "move", "move", "remove"]
+    assert apply(a, ops) == b
+    assert apply(b, rops) == a
+
+
+def test_moves_inside_the_changed_region():
+    # The common prefix and suffix are left alone, and moves address
+    # the region between them.
+    a = [0, 1, "a", "b", "c", 9]
+    b = [0, 1, "b", "c", "a", 9]
+    ops, rops = diff(a, b, moves=True)
+    assert ops == [{"op": "move", "from": Pointer([2]), "path": Pointer([4])}]
+    assert rops == [{"op": "move", "from": Pointer([4]), "path": Pointer([2])}]
+
+
+def test_keyed_records_are_moved_and_diffed_into():
+    a = [{"id": i, "v": i} for i in range(4)]
+    b = deepcopy([a[2], a[0], a[1], a[3]])
+    b[0]["v"] = 20
+    ops, rops = diff(a, b, key=by_id, moves=True)
+    assert ops == [
+        {"op": "move", "from": Pointer([2]), "path": Pointer([0])},
+        {"op": "replace", "path": Pointer([0, "v"]), "value": 20},
+    ]
+    assert rops == [
+        {"op": "move", "from": Pointer([0]), "path": Pointer([2])},
+        {"op": "replace", "path": Pointer([2, "v"]), "value": 2},
+    ]
+    assert apply(a, ops) == b
+    assert apply(b, rops) == a
+
+
+def test_values_without_fingerprint_or_key_are_not_moved():
+    nan = float("nan")
+    a = [[nan], 1, 2]
+    b = [1, 2, [nan]]
+    ops, _ = diff(a, b, moves=True)
+    assert "move" not in [op["op"] for op in ops]
+    records = [{"id": None, "v": 1}, {"id": 1}]
+    ops, _ = diff(records, records[::-1], key=by_id, moves=True)
+    assert "move" not in [op["op"] for op in ops]
+
+
+def test_no_moves_without_matching_values():
+    assert diff([1, 2], [3, 4], moves=True) == diff([1, 2], [3, 4])
+
+
+def test_moves_with_trust_identity():
+    a = [{"id": i} for i in range(3)]
+    assert diff(a, deepcopy(a), trust_identity=True, moves=True) == ([], [])
+
+
+def test_dict_value_moved_to_another_key():
+    a = {"old": {"big": list(range(50))}, "same": 1, "gone": 2}
+    b = {"new": {"big": list(range(50))}, "same": 1, "other": 3}
+    ops, rops = diff(a, b, moves=True)
+    assert ops[0] == {"op": "move", "from": Pointer(["old"]), "path": Pointer(["new"])}
+    assert rops[-1] == {
+        "op": "move",
+        "from": Pointer(["new"]),
+        "path": Pointer(["old"]),
+    }
+    assert sorted(op["op"] for op in ops) == ["add", "move", "remove"]
+    assert apply(a, ops) == b
+    assert apply(b, rops) == a
+
+
+def test_dict_values_without_fingerprint_are_not_moved():
+    nan = float("nan")
+    ops, _ = diff({"a": nan}, {"b": nan}, moves=True)
+    assert [op["op"] for op in ops] == ["remove", "add"]
+
+
+def test_iapply_move():
+    doc = {"a": [1, 2, 3], "b": {"c": 4}}
+    iapply(
+        doc,
+        [
+            {"op": "move", "from": Pointer(["a", 0]), "path": Pointer(["a", "-"])},
+            {"op": "move", "from": Pointer(["b", "c"]), "path": Pointer(["a", 0])},
+            {"op": "move", "from": Pointer.from_str("/a/3"), "path": Pointer(["d"])},
+        ],
+    )
+    assert doc == {"a": [4, 2, 3], "b": {}, "d": 1}
+
+
+def test_moves_serialize_to_json():
+    a = {"x": [1, 2, 3]}
+    b = {"x": [3, 1, 2]}
+    ops, _ = diff(a, b, moves=True)
+    assert to_str_paths(ops) == [{"op": "move", "from": "/x/2", "path": "/x/0"}]
+    assert json.loads(to_json(ops)) == to_str_paths(ops)
+
+
+def test_moves_round_trip_property():
+    rng = random.Random(20261020)
+    pool = [0, 1, 2, "x", "y", [1], [2], {"k": 1}, {"k": [1, 2]}]
+    for _ in range(300):
+        a = [rng.choice(pool) for _ in range(rng.randint(0, 10))]
+        b = list(a)
+        for _ in range(rng.randint(0, 4)):
+            kind = rng.choice(["insert", "delete", "move", "move"])
+            if kind == "insert" or not b:
+                b.insert(rng.randint(0, len(b)), rng.choice(pool))
+            elif kind == "delete":
+                del b[rng.randrange(len(b))]
+            else:
+                b.insert(rng.randint(0, len(b) - 1), b.pop(rng.randrange(len(b))))
+        for kwargs in ({}, {"key": lambda item: json.dumps(item)}):
+            ops, rops = diff({"l": a}, {"l": b}, moves=True, **kwargs)
+            assert apply({"l": a}, ops) == {"l": b}
+            assert apply({"l": b}, rops) == {"l": a}
+
+
+def test_moves_round_trip_for_large_shuffles():
+    rng = random.Random(7)
+    a = [{"id": i} for i in range(200)]
+    b = list(a)
+    rng.shuffle(b)
+    ops, rops = diff(a, b, moves=True)
+    assert {op["op"] for op in ops} == {"move"}
+    assert apply(a, ops) == b
+    assert apply(b, rops) == a
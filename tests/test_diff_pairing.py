@@ -0,0 +1,107 @@
+import importlib
+import random
+from copy import deepcopy
+
+import pytest
+
+from patchdiff import apply, diff, iter_diff
+from patchdiff.pointer import Pointer
+
+diff_module = importlib.import_module("patchdiff.diff")
+
+
+def _record(i, v=0):
+    return {"id": i, "name": f"record {i}", "tags": [i, i + 1], "v": v}
+
+
+def test_inserted_record_does_not_pair_with_edited_one():
+    a = [_record(1), _record(2)]
+    b = [_record(9), _record(1, v=5), _record(2, v=3)]
+    ops, rops = diff(a, b, pairing="similarity")
+    assert ops == [
+        {"op": "add", "path": Pointer([0]), "value": _record(9)},
+        {"op": "replace", "path": Pointer([1, "v"]), "value": 5},
+        {"op": "replace", "path": Pointer([2, "v"]), "value": 3},
+    ]
+    assert apply(a, ops) == b
+    assert apply(b, rops) == a
+    # Paired by position, the new record is diffed against record 1.
+    assert len(diff(a, b)[0]) > len(ops)
+
+
+def test_dissimilar_elements_are_removed_and_added():
+    a = [0, {"a": 1, "b": 2, "c": 3}, [1, 2, 3, 4], 5]
+    b = [0, {"a": 1, "x": 2, "y": 3}, [1, 2, 3, 5], 5]
+    ops, rops = diff(a, b, pairing="similarity")
+    assert ops == [
+        {"op": "remove", "path": Pointer([1])},
+        {"op": "add", "path": Pointer([1]), "value": {"a": 1, "x": 2, "y": 3}},
+        {"op": "replace", "path": Pointer([2, 3]), "value": 5},
+    ]
+    assert apply(a, ops) == b
+    assert apply(b, rops) == a
+
+
+def test_scalars_and_unhashable_lists_pair():
+    a = ["x", [{"k": 1}, {"k": 2, "j": 0}], 1.5]
+    b = ["y", [{"k": 1}, {"k": 3, "j": 0}], "z"]
+    ops, _ = diff(a, b, pairing="similarity")
+    assert ops == [
+        {"op": "replace", "path": Pointer([0]), "value": "y"},
+        {"op": "replace", "path": Pointer([1, 1, "k"]), "value": 3},
+        {"op": "replace", "path": Pointer([2]), "value": "z"},
+    ]
+    # Containers never pair with scalars, or with the other kind.
+    for a, b in ([[1], 0], [{"a": 1}, 0]), ([{"a": 1}, 0], [1, 0]):
+        ops, _ = diff(a, b, pairing="similarity")
+        assert [op["op"] for op in ops] == ["remove", "add"]
+
+
+def test_incomparable_values_are_not_similar():
+    class Incomparable:
+        def __eq__(self, other):
+            raise ValueError("no truth value")
+
+        __hash__ = None
+
+    a = [{"a": Incomparable(), "b": 1}]
+    b = [{"a": Incomparable(), "b": 2}, 1]
+    assert diff_module._similarity(a[0], b[0]) == 0.0
+    assert diff_module._similarity({}, {}) == 1.0
+
+
+def test_large_hunks_pair_by_position(monkeypatch):
+    a = [_record(1), _record(2)]
+    b = [_record(9), _record(1, v=5), _record(2, v=3)]
+    monkeypatch.setattr(diff_module, "_PAIRING_BUDGET", 1)
+    assert diff(a, b, pairing="similarity") == diff(a, b)
+
+
+def test_pairing_round_trip_property():
+    rng = random.Random(20261018)
+    for _ in range(200):
+        a = [
+            _record(rng.randrange(8), rng.randrange(2))
+            for _ in range(rng.randint(0, 8))
+        ]
+        b = deepcopy(a)
+        for _ in range(rng.randint(1, 4)):
+            action = rng.randrange(3)
+            if action == 0 or not b:
+                b.insert(rng.randint(0, len(b)), _record(rng.randrange(8, 16)))
+            elif action == 1:
+                del b[rng.randrange(len(b))]
+            else:
+                b[rng.randrange(len(b))]["v"] = rng.randrange(5)
+        for kwargs in ({}, {"moves": True}, {"reverse": False}):
+            ops, rops = diff(a, b, pairing="similarity", **kwargs)
+            assert apply(a, ops) == b
+            if rops:
+                assert apply(b, rops) == a
+            moves = kwargs.get("moves", False)
+            assert list(iter_diff(a, b, pairing="similarity", moves=moves)) == ops
+
+
+def test_invalid_pairing():
+    with pytest.raises(ValueError, match="pairing"):
+        diff([1], [2], pairing="best")
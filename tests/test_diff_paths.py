@@ -0,0 +1,270 @@
+import importlib
+import pickle
+import random
+from concurrent.futures import ThreadPoolExecutor
+from copy import deepcopy
+
+import pytest
+
+from patchdiff import apply, diff, diff_many, iter_diff
+from patchdiff.fingerprint import Fingerprints
+from patchdiff.paths import PathFilter
+from patchdiff.pointer import Pointer
+
+parallel_module = importlib.import_module("patchdiff.parallel")
+
+
+class Untouchable:
+    def __eq__(self, other):
+        raise AssertionError("compared an excluded value")
+
+    __hash__ = None
+
+
+def _documents():
+    a = {
+        "cache": {"blob": Untouchable()},
+        "data": {"v": 1, "telemetry": [Untouchable()]},
+        "records": [{"id": 1, "tmp": 1, "v": 1}, {"id": 2, "tmp": 2, "v": 2}],
+    }
+    b = {
+        "cache": {"blob": Untouchable(), "more": 1},
+        "data": {"v": 2, "telemetry": [Untouchable(), 1]},
+        "records": [{"id": 1, "tmp": 9, "v": 1}, {"id": 2, "tmp": 2, "v": 3}],
+        "new": {"tmp": 1, "k": 1},
+    }
+    return a, b
+
+
+def test_excluded_paths_are_left_out():
+    a, b = _documents()
+    exclude = ["/cache", "/data/telemetry", "/*/tmp", Pointer(["records", "*", "tmp"])]
+    ops, rops = diff(a, b, exclude=exclude)
+    # Values that are added whole are kept whole.
+    assert ops == [
+        {"op": "add", "path": Pointer(["new"]), "value": {"tmp": 1, "k": 1}},
+        {"op": "replace", "path": Pointer(["data", "v"]), "value": 2},
+        {"op": "replace", "path": Pointer(["records", 1, "v"]), "value": 3},
+    ]
+    assert rops == [
+        {"op": "replace", "path": Pointer(["records", 1, "v"]), "value": 2},
+        {"op": "replace", "path": Pointer(["data", "v"]), "value": 1},
+        {"op": "remove", "path": Pointer(["new"])},
+    ]
+    assert list(iter_diff(a, b, exclude=exclude)) == ops
+    assert list(iter_diff(a, b, exclude=exclude, stream="reverse")) == rops
+    assert diff_many(a, [b, a], exclude=exclude) == [(ops, rops), ([], [])]
+    # The patch leaves the excluded values as they are.
+    patched = apply({**a, "cache": 1, "data": {"v": 1, "telemetry": 2}}, ops)
+    assert patched["cache"] == 1
+    assert patched["data"] == {"v": 2, "telemetry": 2}
+
+
+def test_included_paths():
+    a, b = _documents()
+    ops, _ = diff(a, b, include=["/records/*/v", "/data/v", "/new"])
+    assert ops == [
+        {"op": "add", "path": Pointer(["new"]), "value": {"tmp": 1, "k": 1}},
+        {"op": "replace", "path": Pointer(["data", "v"]), "value": 2},
+        {"op": "replace", "path": Pointer(["records", 1, "v"]), "value": 3},
+    ]
+    # Excluded below an included path.
+    ops, _ = diff(a, b, include=["/records"], exclude=["/records/*/tmp"])
+    assert ops == [{"op": "replace", "path": Pointer(["records", 1, "v"]), "value": 3}]
+    ops, _ = diff(a, b, include=["/data"], exclude=["/data/telemetry"])
+    assert ops == [{"op": "replace", "path": Pointer(["data", "v"]), "value": 2}]
+    # Nothing included, or the whole document.
+    assert diff(a, b, include=[]) == ([], [])
+    assert diff(a["records"], b["records"], include=[""]) == diff(
+        a["records"], b["records"]
+    )
+
+
+def test_everything_left_out():
+    a, b = _documents()
+    assert diff(a, b, exclude=[""]) == ([], [])
+    assert list(iter_diff(a, b, exclude=[""])) == []
+    assert diff_many(a, [b, b], exclude=[""]) == [([], []), ([], [])]
+    assert diff(a, b, Pointer(["doc", 0]), include=["/other"]) == ([], [])
+
+
+def test_patterns_match_from_the_root():
+    a, b = _documents()
+    ops, _ = diff(
+        a["records"], b["records"], Pointer(["records"]), exclude=["/records/*/tmp"]
+    )
+    assert ops == [{"op": "replace", "path": Pointer(["records", 1, "v"]), "value": 3}]
+    # A pointer prefix inside an included path, or with nothing left out.
+    ops, _ = diff(
+        a["records"], b["records"], Pointer(["records"]), include=["/records"]
+    )
+    assert len(ops) == 2
+    ops, _ = diff(a["records"], b["records"], Pointer(["records"]), exclude=["/x"])
+    assert len(ops) == 2
+
+
+def test_list_elements_left_out_by_wildcard():
+    a = {"items": [{"id": i, "cache": i} for i in range(5)]}
+    b = {"items": [{"id": -1, "cache": 0}] + [{"id": i, "cache": 9} for i in range(5)]}
+    # Elements that only differ in what is left out align as equal.
+    ops, rops = diff(a, b, exclude=["/items/*/cache"])
+    assert ops == [
+        {"op": "add", "path": Pointer(["items", 0]), "value": {"id": -1, "cache": 0}}
+    ]
+    assert rops == [{"op": "remove", "path": Pointer(["items", 0])}]
+    assert diff(a, b, exclude=["/items/*"]) == ([], [])
+    assert diff(a, b, include=["/items/*/id"]) == (ops, rops)
+    assert diff(a, b, include=["/items"], exclude=["/items/*/cache"]) == (ops, rops)
+    # Keyed, or with nothing left out below the elements.
+    assert diff(a, b, exclude=["/items/*/cache"], key=lambda item: item["id"]) == (
+        ops,
+        rops,
+    )
+    assert diff(a, b, exclude=["/items/x"]) == diff(a, b)
+
+
+def test_left_out_values_are_never_compared():
+    a = {"items": [{"id": i, "blob": Untouchable()} for i in range(3)]}
+    b = {"items": [{"id": i, "blob": Untouchable()} for i in range(3)]}
+    exclude = ["/items/*/blob"]
+    assert diff(a, b, exclude=exclude) == ([], [])
+    b["items"].insert(0, {"id": -1, "blob": Untouchable()})
+    ops, _ = diff(a, b, exclude=exclude)
+    assert ops == [{"op": "add", "path": Pointer(["items", 0]), "value": b["items"][0]}]
+    paths = PathFilter(exclude=exclude)
+    element = paths.state(Pointer(["items", 0]))
+    assert paths.equal(element, None, a["items"][0], b["items"][1])
+    assert not paths.equal(element, None, a["items"][0], b["items"][0])
+
+
+def test_list_elements_left_out_by_index():
+    a = {"l": [{"a": 1, "b": 1}, {"a": 1}]}
+    b = {"l": [{"a": 1, "b": 2}, {"a": 2}]}
+    assert diff(a, b, include=["/l/0/a"]) == ([], [])
+    ops, rops = diff(a, b, exclude=["/l/1"])
+    assert ops == [{"op": "replace", "path": Pointer(["l", 0, "b"]), "value": 2}]
+    assert rops == [{"op": "replace", "path": Pointer(["l", 0, "b"]), "value": 1}]
+    assert diff(a, b, exclude=["/l/0/b"]) == (
+        [{"op": "replace", "path": Pointer(["l", 1, "a"]), "value": 2}],
+        [{"op": "replace", "path": Pointer(["l", 1, "a"]), "value": 1}],
+    )
+    # Elements only one list has are added or removed all together,
+    # unless they are all left out.
+    longer = {"l": [*a["l"], 3, 4]}
+    assert diff(a, longer, exclude=["/l/2", "/l/3"]) == ([], [])
+    ops, rops = diff(a, longer, exclude=["/l/2"], reverse=False)
+    assert ops == [
+        {"op": "add", "path": Pointer(["l", "-"]), "value": 3},
+        {"op": "add", "path": Pointer(["l", "-"]), "value": 4},
+    ]
+    assert rops == []
+    ops, rops = diff(longer, a, exclude=["/l/3"])
+    assert ops == [
+        {"op": "remove", "path": Pointer(["l", 2])},
+        {"op": "remove", "path": Pointer(["l", 2])},
+    ]
+    assert apply(longer, ops) == a
+    assert apply(a, rops) == longer
+    assert diff({"l": [1, 2]}, {"l": [1, 3]}, exclude=["/l/0"])[0] == [
+        {"op": "replace", "path": Pointer(["l", 1]), "value": 3}
+    ]
+
+
+def test_nested_elements_left_out():
+    a = {"items": [{"id": 1, "runs": [{"t": 1, "v": 1}, {"t": 2}]}]}
+    b = {"items": [{"id": 1, "runs": [{"t": 9, "v": 1}, {"t": 9}]}]}
+    exclude = ["/items/*/runs/*/t", "/items/*/runs/1"]
+    assert diff(a, b, exclude=exclude) == ([], [])
+    b["items"][0]["runs"][0]["v"] = 2
+    assert diff(a, b, exclude=exclude)[0] == [
+        {"op": "replace", "path": Pointer(["items", 0, "runs", 0, "v"]), "value": 2}
+    ]
+    b["items"][0]["runs"][0]["v"] = 1
+    b["items"][0]["runs"].append(3)
+    assert diff(a, b, exclude=exclude)[0] == [
+        {"op": "add", "path": Pointer(["items", 0, "runs", "-"]), "value": 3}
+    ]
+    # With the cost model, which sees what is left out as well.
+    b["items"][0]["id"] = 2
+    assert diff(a, b, exclude=exclude, max_depth=2)[0] == [
+        {"op": "replace", "path": Pointer(["items", 0]), "value": b["items"][0]}
+    ]
+
+
+def test_set_elements_left_out():
+    a, b = {"s": {"a", "b"}}, {"s": {"b", "c"}}
+    assert diff(a, b, exclude=["/s/a", "/s/c"]) == ([], [])
+    ops, _ = diff(a, b, exclude=["/s/a"])
+    assert ops == [{"op": "add", "path": Pointer(["s", "-"]), "value": "c"}]
+    assert diff(a, a, exclude=["/s/a"]) == ([], [])
+
+
+def test_fingerprint_cache_holds_the_documents_only():
+    fp = Fingerprints()
+    a = {"t": [1, 2], "v": {"x": 1}}
+    b = {"t": [3], "v": {"x": 2}}
+    sizes = []
+    for _ in range(3):
+        assert diff(a, b, fingerprints=fp, exclude=["/t"])[0] == [
+            {"op": "replace", "path": Pointer(["v", "x"]), "value": 2}
+        ]
+        sizes.append(len(fp))
+    assert sizes[0] == sizes[-1]
+
+
+def test_workers_get_the_patterns(monkeypatch):
+    monkeypatch.setattr(parallel_module, "_MIN_WORK", 0)
+    a = {f"k{i}": {"v": i, "cache": i} for i in range(4)}
+    b = {f"k{i}": {"v": -i, "cache": -1} for i in range(4)}
+    with ThreadPoolExecutor(2) as executor:
+        result = diff(a, b, exclude=["/*/cache"], workers=executor)
+    assert result == diff(a, b, exclude=["/*/cache"])
+    assert len(result[0]) == 3
+    paths = PathFilter(exclude=["/*/cache"])
+    assert pickle.loads(pickle.dumps(paths)).state(Pointer(["k0", "cache"])) is (
+        paths.state(Pointer(["k0", "cache"]))
+    )
+
+
+def test_shared_values_are_skipped():
+    record = {"id": 1, "cache": Untouchable(), "nested": [{"cache": 1}]}
+    a = {"records": [record, {"id": 2}], "n": 1}
+    b = {"records": [record, {"id": 3}], "n": 1}
+    ops, _ = diff(a, b, exclude=["/records/*/nested/*/cache"], trust_identity=True)
+    assert ops == [{"op": "replace", "path": Pointer(["records", 1, "id"]), "value": 3}]
+
+
+def test_path_filter_round_trip_property():
+    rng = random.Random(20261018)
+    keys = ["a", "b", "c"]
+
+    def document(depth):
+        if depth == 0 or (depth < 4 and rng.random() < 0.3):
+            return rng.randrange(3)
+        if depth < 4 and rng.random() < 0.3:
+            return [document(depth - 1) for _ in range(rng.randint(0, 3))]
+        return {key: document(depth - 1) for key in rng.sample(keys, rng.randint(0, 3))}
+
+    patterns = ["/a", "/b/c", "/*/a", "/a/*/b", "/c/0", "/*/*/c"]
+    for _ in range(300):
+        a, b = document(4), document(4)
+        include = (
+            rng.sample(patterns, rng.randint(1, 3)) if rng.random() < 0.5 else None
+        )
+        exclude = rng.sample(patterns, rng.randint(0, 2))
+        ops, rops = diff(a, b, include=include, exclude=exclude)
+        patched = apply(a, ops)
+        assert diff(patched, b, include=include, exclude=exclude) == ([], [])
+        assert diff(apply(patched, rops), a, include=include, exclude=exclude) == (
+            [],
+            [],
+        )
+        assert list(iter_diff(a, b, include=include, exclude=exclude)) == ops
+        assert diff_many(a, [deepcopy(b)], include=include, exclude=exclude) == [
+            (ops, rops)
+        ]
+
+
+def test_invalid_pattern():
+    with pytest.raises(ValueError, match="JSON pointer"):
+        diff({"a": 1}, {"a": 2}, exclude=["a"])
@@ -0,0 +1,76 @@
+import random
+from copy import deepcopy
+
+import pytest
+
+from patchdiff import apply, diff, to_json
+from patchdiff.pointer import Pointer
+
+
+def _low_similarity_lists(rng, n):
+    """Lists that share a fifth of their (unique) records, in order."""
+    a = [{"id": i, "tags": [i, i + 1]} for i in range(n)]
+    b = list(a)
+    for _ in range(int(n * 0.8)):
+        del b[rng.randrange(len(b))]
+    for _ in range(int(n * 0.8)):
+        b.insert(rng.randrange(len(b) + 1), {"id": -rng.randint(1, 10**6)})
+    return a, b
+
+
+def test_patience_aligns_where_myers_gives_up():
+    a, b = _low_similarity_lists(random.Random(3), 400)
+    myers_ops, _ = diff(a, b)
+    ops, rops = diff(a, b, algorithm="patience")
+    # Myers pairs everything up element by element and diffs into the
+    # pairs; patience keeps the shared records in place.
+    assert len(to_json(ops)) < 0.8 * len(to_json(myers_ops))
+    assert apply(a, ops) == b
+    assert apply(b, rops) == a
+
+
+def test_patience_anchors_on_unique_elements():
+    a = ["x", "a", "b", "x", "c"]
+    b = ["c", "a", "y", "b", "x"]
+    ops, rops = diff(a, b, algorithm="patience")
+    # a and b are the only elements unique to both sides in the same
+    # order; everything else is solved around them.
+    assert ops[0] == {"op": "replace", "path": Pointer([0]), "value": "c"}
+    assert apply(a, ops) == b
+    assert apply(b, rops) == a
+
+
+def test_patience_with_key():
+    a = [{"id": i, "v": i} for i in range(6)]
+    b = [{"id": 5, "v": 5}, {"id": 1, "v": 10}, {"id": 2, "v": 2}, {"id": 9}]
+    ops, rops = diff(a, b, algorithm="patience", key=lambda record: record["id"])
+    assert {"op": "replace", "path": Pointer([1, "v"]), "value": 10} in ops
+    assert apply(a, ops) == b
+    assert apply(b, rops) == a
+
+
+def test_patience_falls_back_for_repeated_and_unfingerprintable_elements():
+    nan = float("nan")
+    a = [1, 1, [nan], 2, 2]
+    b = [2, 2, [nan], 1, 1]
+    ops, rops = diff(a, b, algorithm="patience")
+    assert apply(a, ops) == b
+    assert apply(b, rops) == a
+
+
+def test_patience_round_trip_property():
+    rng = random.Random(20261022)
+    pool = [0, 1, 2, 3, "x", [1], [2], {"k": 1}, {"k": [1, 2]}, (1, [2])]
+    for _ in range(300):
+        # Copies, so no list holds the same container twice.
+        a = [deepcopy(rng.choice(pool)) for _ in range(rng.randint(0, 12))]
+        b = [deepcopy(rng.choice(pool)) for _ in range(rng.randint(0, 12))]
+        for moves in (False, True):
+            ops, rops = diff(a, b, algorithm="patience", moves=moves)
+            assert apply(a, ops) == b
+            assert apply(b, rops) == a
+
+
+def test_unknown_algorithm():
+    with pytest.raises(ValueError, match="histogram"):
+        diff([1], [2], algorithm="histogram")
@@ -251,3 +251,22 @@ def test_partially_common_large_lists_round_trip():
     ops, rops = diff(a, b)
     assert apply(a, ops) == b
     assert apply(b, rops) == a
+
+
+def test_sliced_trim_matches_element_wise_trim():
+    # Lists of atomic values are trimmed by comparing slices; the
+    # fingerprint cache makes the diff compare them one at a time.
+    rng = random.Random(64)
+    for _ in range(200):
+        a = _random_list(rng, rng.randint(1, 600))
+        b = list(a)
+        for _ in range(rng.randint(0, 3)):
+            index = rng.choice([0, 63, 64, 65, 127, 128, rng.randrange(len(a))])
+            if index < len(b):
+                b[index] = -1
+            if rng.random() < 0.3:
+                b.insert(min(index, len(b)), -2)
+        assert diff(a, b) == diff(a, b, fingerprints=True)
+        ops, rops = diff(a, b)
+        assert apply(a, ops) == b
+        assert apply(b, rops) == a
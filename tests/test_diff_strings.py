@@ -0,0 +1,174 @@
+import json
+import random
+
+from patchdiff import apply, diff, iapply, iter_diff, to_json
+from patchdiff.diff import diff_strings
+from patchdiff.pointer import Pointer
+
+
+def _text(rng, lines):
+    return "".join(f"line {i}: {'x' * rng.randint(0, 60)}\n" for i in range(lines))
+
+
+def test_edit_becomes_a_splice():
+    a = {"text": "The quick brown fox jumps over the lazy dog. " * 10}
+    b = {"text": a["text"].replace("lazy", "sleepy", 1)}
+    ops, rops = diff(a, b, splice_strings=100)
+    assert ops == [
+        {
+            "op": "splice",
+            "path": Pointer(["text"]),
+            "offset": 35,
+            "delete": 3,
+            "value": "sleep",
+        }
+    ]
+    assert rops == [
+        {
+            "op": "splice",
+            "path": Pointer(["text"]),
+            "offset": 35,
+            "delete": 5,
+            "value": "laz",
+        }
+    ]
+    assert apply(a, ops) == b
+    assert apply(b, rops) == a
+
+
+def test_edits_on_separate_lines_are_separate_splices():
+    rng = random.Random(1)
+    text = _text(rng, 1000)
+    lines = text.splitlines(keepends=True)
+    lines[10] = lines[10].replace("line", "LINE")
+    lines[500:502] = ["new\n", "lines\n", "here\n"]
+    del lines[900]
+    edited = "".join(lines)
+    a, b = {"l": [text, 1]}, {"l": [edited, 1]}
+    ops, rops = diff(a, b, splice_strings=1000)
+    assert [op["op"] for op in ops] == ["splice"] * 3
+    assert len(to_json(ops)) < len(text) // 50
+    assert apply(a, ops) == b
+    assert apply(b, rops) == a
+    # Only the forward splices without reverse ops.
+    assert diff(a, b, splice_strings=1000, reverse=False) == (ops, [])
+
+
+def test_edits_far_apart_in_one_line_are_separate_splices():
+    rng = random.Random(2)
+    line = " ".join(rng.choice(["lorem", "ipsum", "dolor"]) for _ in range(40000))
+    a = {"t": line}
+    b = {"t": "X" + line[:100000] + "Y" + line[100000:-3] + "Z"}
+    ops, rops = diff(a, b, splice_strings=1000)
+    assert [(op["offset"], op["delete"], op["value"]) for op in ops] == [
+        (0, 0, "X"),
+        (100001, 0, "Y"),
+        (len(line) - 1, 3, "Z"),
+    ]
+    assert apply(a, ops) == b
+    assert apply(b, rops) == a
+    b = {"t": line[5:100000] + "Y" + line[100000:]}
+    ops, rops = diff(a, b, splice_strings=1000)
+    assert [(op["offset"], op["delete"], op["value"]) for op in ops] == [
+        (0, 5, ""),
+        (99995, 0, "Y"),
+    ]
+    assert apply(b, rops) == a
+
+
+def test_long_string_round_trip_property():
+    rng = random.Random(20261019)
+    for _ in range(200):
+        words = [rng.choice(["foo", "bar", " ", ".", "\n"]) for _ in range(2000)]
+        a = "".join(words)
+        for _ in range(rng.randint(1, 6)):
+            words.insert(rng.randrange(len(words)), rng.choice(["new", "x" * 300]))
+            del words[rng.randrange(len(words))]
+        b = "".join(words)
+        ops, rops = diff({"s": a}, {"s": b}, splice_strings=0)
+        assert apply({"s": a}, ops) == {"s": b}
+        assert apply({"s": b}, rops) == {"s": a}
+
+
+def test_short_or_rewritten_strings_are_replaced():
+    assert diff({"s": "abc"}, {"s": "abd"}, splice_strings=4)[0] == [
+        {"op": "replace", "path": Pointer(["s"]), "value": "abd"}
+    ]
+    a, b = "a" * 100, "b" * 100
+    ops, rops = diff([a], [b], splice_strings=10)
+    assert ops == [{"op": "replace", "path": Pointer([0]), "value": b}]
+    assert rops == [{"op": "replace", "path": Pointer([0]), "value": a}]
+    assert diff([a], [b], splice_strings=10, reverse=False)[1] == []
+    # Without the option, strings are atomic as always.
+    assert diff([a], [a + "b"])[0] == [
+        {"op": "replace", "path": Pointer([0]), "value": a + "b"}
+    ]
+
+
+def test_splices_serialize_to_json():
+    a = {"docs": [_text(random.Random(2), 50)]}
+    b = {"docs": [a["docs"][0].replace("line 7", "line seven")]}
+    ops, rops = diff(a, b, splice_strings=100)
+    assert json.loads(to_json(ops)) == [
+        {
+            "op": "splice",
+            "path": "/docs/0",
+            "offset": ops[0]["offset"],
+            "delete": 1,
+            "value": "seven",
+        }
+    ]
+
+    def reload(ops):
+        return [
+            {**op, "path": Pointer.from_str(op["path"])}
+            for op in json.loads(to_json(ops))
+        ]
+
+    assert iapply(a, reload(ops)) == b
+    assert iapply(b, reload(rops)) == {
+        "docs": [a["docs"][0].replace("line seven", "line 7")]
+    }
+
+
+def test_string_round_trip_property():
+    rng = random.Random(20261018)
+    for _ in range(1000):
+        a = "".join(rng.choice("ab\n") for _ in range(rng.randint(0, 30)))
+        b = "".join(rng.choice("ab\n") for _ in range(rng.randint(0, 30)))
+        ops, rops = diff({"s": a}, {"s": b}, splice_strings=0)
+        assert apply({"s": a}, ops) == {"s": b}
+        assert apply({"s": b}, rops) == {"s": a}
+        assert list(iter_diff({"s": a}, {"s": b}, splice_strings=0)) == ops
+
+
+def test_splices_and_the_cost_model():
+    text = "word " * 100
+    a, b = {"d": {"s": text, "n": 1}}, {"d": {"s": text + "end", "n": 2}}
+    ops, _ = diff(a, b, splice_strings=10, replace_ratio=0.5)
+    assert [op["op"] for op in sorted(ops, key=lambda op: op["op"])] == [
+        "replace",
+        "splice",
+    ]
+
+
+def test_diff_strings_without_context():
+    ops, rops = diff_strings("a" * 50 + "b", "a" * 50 + "c", Pointer(["x"]))
+    assert ops == [
+        {
+            "op": "splice",
+            "path": Pointer(["x"]),
+            "offset": 50,
+            "delete": 1,
+            "value": "c",
+        }
+    ]
+    assert rops == [
+        {
+            "op": "splice",
+            "path": Pointer(["x"]),
+            "offset": 50,
+            "delete": 1,
+            "value": "b",
+        }
+    ]
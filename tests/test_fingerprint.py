@@ -0,0 +1,210 @@
+import random
+from collections import UserDict
+
+import pytest
+
+from patchdiff import apply, diff
+from patchdiff.diff import _intern
+from patchdiff.fingerprint import Fingerprints
+from patchdiff.pointer import Pointer
+
+
+def test_equal_scalars_get_equal_digests():
+    fps = Fingerprints()
+    assert fps.digest(1) == fps.digest(1.0) == fps.digest(True)
+    assert fps.digest(0.0) == fps.digest(-0.0) == fps.digest(0)
+    assert fps.digest(2 + 0j) == fps.digest(2)
+    assert fps.digest(1 + 2j) == fps.digest(1.0 + 2.0j)
+    assert fps.digest(0.5) == fps.digest(0.5)
+    assert fps.digest(float("inf")) == fps.digest(float("inf"))
+    assert fps.digest("é") == fps.digest("é")
+    assert fps.digest(b"x") == fps.digest(b"x")
+    assert fps.digest(None) == fps.digest(None)
+
+
+def test_different_scalars_get_different_digests():
+    fps = Fingerprints()
+    digests = [
+        fps.digest(value)
+        for value in (1, 2, -1, -2, 0.5, 1 + 2j, 1 + 3j, "1", b"1", None, "", b"")
+    ]
+    assert len(set(digests)) == len(digests)
+
+
+def test_unfingerprintable_scalars():
+    fps = Fingerprints()
+    assert fps.digest(float("nan")) is None
+    assert fps.digest(complex(1, float("nan"))) is None
+    assert fps.digest(complex(float("nan"), 1)) is None
+    assert fps.digest(object()) is None
+
+
+def test_container_digests_follow_equality():
+    fps = Fingerprints()
+    assert fps.digest({"a": 1, "b": [1, 2]}) == fps.digest({"b": [1, 2], "a": 1})
+    assert fps.digest({1, 2, 3}) == fps.digest(frozenset({3, 2, 1}))
+    assert fps.digest([1, (2, 3)]) == fps.digest([1.0, (2, 3)])
+    # Lists never equal tuples, and concatenated children stay apart.
+    assert fps.digest([1, 2]) != fps.digest((1, 2))
+    assert fps.digest(["ab"]) != fps.digest(["a", "b"])
+    assert fps.digest([[1], 2]) != fps.digest([1, [2]])
+    assert fps.digest({"a": [1]}) != fps.digest({"a": [2]})
+
+
+def test_unfingerprintable_values_poison_their_containers():
+    fps = Fingerprints()
+    assert fps.digest([1, [float("nan")]]) is None
+    assert fps.digest({"a": object()}) is None
+    assert fps.digest({object(): 1}) is None
+    assert fps.digest({"a": {1, 2}, "b": [UserDict()]}) is None
+
+
+def test_digests_are_cached_per_container():
+    fps = Fingerprints()
+    inner = [1, 2]
+    doc = {"a": inner, "b": {"c": inner}}
+    fps.digest(doc)
+    assert len(fps) == 3  # doc, the nested dict, and the shared list
+    # Cached by identity: a mutation goes unnoticed until cleared.
+    before = fps.digest(inner)
+    inner.append(3)
+    assert fps.digest(inner) == before
+    fps.clear()
+    assert len(fps) == 0
+    assert fps.digest(inner) != before
+
+
+def test_equal():
+    fps = Fingerprints()
+    nan = float("nan")
+    assert fps.equal({"a": [1, 2]}, {"a": [1, 2]})
+    assert not fps.equal({"a": [1, 2]}, {"a": [1, 3]})
+    assert fps.equal(1, 1.0)
+    assert not fps.equal([1], 1)
+    # Unfingerprintable sides fall back to ==, which treats identical
+    # elements as equal.
+    assert fps.equal([nan], [nan]) == ([nan] == [nan])
+    assert fps.equal([1], [nan]) is False
+    assert fps.equal([nan], [1]) is False
+
+
+def test_diff_with_fingerprints_matches_plain_diff():
+    a = {
+        "a": [5, 7, 9, {"a", "b", "c"}],
+        "b": 6,
+        "d": {"x": [{"y": 1}, {"y": 2}, {"y": 3}], "z": (1, 2)},
+    }
+    b = {
+        "a": [5, 2, 9, {"b", "c"}],
+        "b": 6,
+        "c": 7,
+        "d": {"x": [{"y": 1}, {"y": 4}, {"y": 3}], "z": (1, 2)},
+    }
+    expected = diff(a, b)
+    assert diff(a, b, fingerprints=True) == expected
+    assert diff(a, b, fingerprints=Fingerprints()) == expected
+
+
+def test_diff_with_fingerprints_equal_documents():
+    a = {"a": [{"b": 1}] * 3, "c": {1, 2}}
+    b = {"a": [{"b": 1}] * 3, "c": {1, 2}}
+    assert diff(a, b, fingerprints=True) == ([], [])
+
+
+def test_diff_with_fingerprints_trims_list_prefix_and_suffix():
+    a = [{"id": i} for i in range(10)]
+    b = [{"id": i} for i in range(10)]
+    b[5] = {"id": 50}
+    ops, rops = diff(a, b, fingerprints=True)
+    assert ops == [{"op": "replace", "path": Pointer([5, "id"]), "value": 50}]
+    assert rops == [{"op": "replace", "path": Pointer([5, "id"]), "value": 5}]
+
+
+def test_diff_with_fingerprints_falls_back_for_nan():
+    nan = float("nan")
+    a = {"a": [nan, 1], "b": nan}
+    b = {"a": [nan, 2], "b": nan}
+    assert diff(a, b, fingerprints=True) == diff(a, b)
+
+
+def test_fingerprints_kept_across_calls():
+    fps = Fingerprints()
+    base = {"items": [{"id": i, "tags": [i, i + 1]} for i in range(20)]}
+    first = {"items": [*base["items"][:10], {"id": 99}, *base["items"][10:]]}
+    second = {"items": base["items"][1:]}
+    for target in (first, second):
+        ops, rops = diff(base, target, fingerprints=fps)
+        assert (ops, rops) == diff(base, target)
+    assert len(fps) > 0
+
+
+def test_diff_with_fingerprints_round_trip_property():
+    rng = random.Random(20261018)
+    pool = [0, 1, "x", (1, 2), {"k": 1}, {"k": 2}, [1, 2], [1, {"n": 3}]]
+    fps = Fingerprints()
+    for _ in range(30):
+        a = [rng.choice(pool) for _ in range(rng.randint(0, 12))]
+        b = [rng.choice(pool) for _ in range(rng.randint(0, 12))]
+        ops, rops = diff(a, b, fingerprints=fps)
+        assert (ops, rops) == diff(a, b)
+        assert apply(a, ops) == b
+        assert apply(b, rops) == a
+
+
+def test_intern():
+    fps = Fingerprints()
+    a = [{"a": 1}, [1], {"a": 1}]
+    b = [[1], {"a": 1.0}, "x"]
+    assert _intern(a, b, fps) == ([0, 1, 0], [1, 0, 2])
+    assert _intern(a, [*b, float("nan")], fps) is None
+
+
+def test_diff_with_fingerprints_interns_list_elements():
+    nan = float("nan")
+    a = [{"id": 1}, {"id": 2}, {"id": 3}, {"id": 4}]
+    b = [{"id": 0}, {"id": 2}, {"id": 4}, {"id": 5}]
+    assert diff(a, b, fingerprints=True) == diff(a, b)
+    # Elements without a fingerprint are compared one by one instead.
+    a[1]["nan"] = b[1]["nan"] = nan
+    assert diff(a, b, fingerprints=True) == diff(a, b)
+
+
+def test_deep_values():
+    a = b = c = 1
+    for level in range(5000):
+        shared = [level]
+        a = {"a": [a, shared, shared]}
+        b = {"a": [b, [level], [level]]}
+        c = {"a": [c, shared, [level, 2]]}
+    fingerprints = Fingerprints()
+    assert fingerprints.digest(a) == fingerprints.digest(b)
+    assert fingerprints.digest(a) != fingerprints.digest(c)
+    assert fingerprints.digest(a) == Fingerprints().digest(b)
+
+
+def test_values_that_hold_themselves():
+    cycle = [1]
+    cycle.append({"c": cycle})
+    fingerprints = Fingerprints()
+    assert fingerprints.digest(cycle) is None
+    assert fingerprints.digest(cycle[1]) is None
+    assert fingerprints.digest([cycle]) is None
+
+
+def test_cache_size_is_bounded():
+    fps = Fingerprints(maxsize=4)
+    first, second = [[1], [2]], [[3], [4]]
+    digest = fps.digest(first)
+    assert len(fps) == 3
+    # Over 4 containers, the older half is forgotten: the newest 2 stay.
+    fps.digest(second)
+    assert len(fps) == 2
+    fps.digest(second)
+    assert len(fps) == 2
+    assert fps.digest(first) == digest
+    unbounded = Fingerprints(maxsize=None)
+    for value in range(10):
+        unbounded.digest([value])
+    assert len(unbounded) == 10
+    with pytest.raises(ValueError, match="maxsize"):
+        Fingerprints(maxsize=0)
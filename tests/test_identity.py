@@ -0,0 +1,125 @@
+from copy import deepcopy
+
+from patchdiff import apply, diff
+from patchdiff.fingerprint import Fingerprints
+from patchdiff.pointer import Pointer
+
+
+class CountingEq:
+    """A leaf that counts how often it is compared."""
+
+    calls = 0
+
+    def __init__(self, value):
+        self.value = value
+
+    def __eq__(self, other):
+        CountingEq.calls += 1
+        return isinstance(other, CountingEq) and self.value == other.value
+
+    __hash__ = None
+
+
+def _state(n):
+    return {
+        "meta": {"version": 1},
+        "items": [{"id": i, "payload": CountingEq(i)} for i in range(n)],
+        "blob": {"leaf": CountingEq("blob")},
+    }
+
+
+def _copy_on_write_update(state):
+    """Return a new state that copies only the path to meta/version."""
+    return {**state, "meta": {**state["meta"], "version": 2}}
+
+
+def test_identical_objects_are_unchanged():
+    nan = float("nan")
+    assert diff(nan, nan) == ([], [])
+    shared = [nan]
+    assert diff({"a": nan, "b": shared}, {"a": nan, "b": shared}) == ([], [])
+    assert diff([nan, 1, nan], [nan, 2, nan]) == (
+        [{"op": "replace", "path": Pointer([1]), "value": 2}],
+        [{"op": "replace", "path": Pointer([1]), "value": 1}],
+    )
+
+
+def test_identical_elements_match_inside_the_edit_search():
+    shared = {"big": list(range(100))}
+    a = [1, shared, 2]
+    b = [3, shared, 4]
+    ops, rops = diff(a, b)
+    assert ops == [
+        {"op": "replace", "path": Pointer([0]), "value": 3},
+        {"op": "replace", "path": Pointer([2]), "value": 4},
+    ]
+    assert apply(b, rops) == a
+    assert diff(a, b, fingerprints=Fingerprints()) == (ops, rops)
+
+
+def test_shared_subtrees_are_not_compared():
+    state = _state(50)
+    new_state = _copy_on_write_update(state)
+    CountingEq.calls = 0
+    ops, rops = diff(state, new_state)
+    assert CountingEq.calls == 0
+    assert ops == [{"op": "replace", "path": Pointer(["meta", "version"]), "value": 2}]
+    assert rops == [{"op": "replace", "path": Pointer(["meta", "version"]), "value": 1}]
+
+
+def test_trust_identity_matches_plain_diff_for_copy_on_write_updates():
+    state = _state(20)
+    new_state = _copy_on_write_update(state)
+    items = list(state["items"])
+    items.insert(3, {"id": 99, "payload": CountingEq(99)})
+    del items[10]
+    new_state["items"] = items
+    CountingEq.calls = 0
+    ops, rops = diff(state, new_state, trust_identity=True)
+    assert CountingEq.calls == 0
+    assert (ops, rops) == diff(state, new_state)
+    assert apply(state, ops) == new_state
+    assert apply(new_state, rops) == state
+
+
+def test_trust_identity_does_not_compare_distinct_containers():
+    a = {"x": {"leaf": CountingEq(1)}, "y": [{"leaf": CountingEq(2)}]}
+    b = deepcopy(a)
+    b["x"]["other"] = 1
+    CountingEq.calls = 0
+    ops, rops = diff(a, b, trust_identity=True)
+    # The distinct-but-equal leaves are diffed into (CountingEq is not
+    # atomic), never compared with ==.
+    assert sorted(str(op["path"]) for op in ops) == ["/x/leaf", "/x/other", "/y/0/leaf"]
+    assert CountingEq.calls == 0
+    assert apply(a, ops) == b
+    assert apply(b, rops) == a
+
+
+def test_trust_identity_still_compares_atomic_values():
+    # Built at runtime so the two sides are distinct objects.
+    a = {"n": int("9" * 30), "t": (1, int("2")), "s": "x" * int("10")}
+    b = {"n": int("9" * 30), "t": (1, int("2")), "s": "x" * int("10")}
+    assert a["n"] is not b["n"]
+    assert diff(a, b, trust_identity=True) == ([], [])
+    assert diff([10**30, 1, 10**30], [10**30, 2, 10**30], trust_identity=True) == (
+        [{"op": "replace", "path": Pointer([1]), "value": 2}],
+        [{"op": "replace", "path": Pointer([1]), "value": 1}],
+    )
+
+
+def test_trust_identity_round_trips_distinct_lists():
+    a = [{"id": i} for i in range(6)]
+    b = deepcopy(a)
+    b.insert(2, {"id": 10})
+    ops, rops = diff(a, b, trust_identity=True)
+    assert apply(a, ops) == b
+    assert apply(b, rops) == a
+
+
+def test_empty_fingerprints_cache_is_used():
+    fps = Fingerprints()
+    diff({"a": [1]}, {"a": [2]}, fingerprints=fps)
+    assert len(fps) > 0
+    nan_list = [float("nan")]
+    assert fps.equal(nan_list, nan_list)
@@ -0,0 +1,98 @@
+import importlib
+import random
+from copy import deepcopy
+from operator import itemgetter
+
+import pytest
+
+from patchdiff import apply, diff, iter_diff
+from patchdiff.pointer import Pointer
+
+stream_module = importlib.import_module("patchdiff.stream")
+
+
+def _documents(seed):
+    rng = random.Random(seed)
+    a = {
+        f"k{i}": [
+            {"id": j, "tags": [rng.randint(0, 9) for _ in range(4)]} for j in range(8)
+        ]
+        for i in range(6)
+    }
+    a["scalar"] = 1
+    a["gone"] = {"x": {"y": [1, 2]}}
+    b = deepcopy(a)
+    for records in b.values():
+        if isinstance(records, list):
+            for record in rng.sample(records, 2):
+                record["tags"][rng.randrange(4)] = -1
+            records.insert(rng.randint(0, len(records)), {"id": 100})
+            records.append(records.pop(rng.randrange(len(records))))
+    b["scalar"] = 2
+    del b["gone"]
+    b["new"] = [1, 2]
+    return a, b
+
+
+@pytest.mark.parametrize(
+    "kwargs",
+    [
+        {},
+        {"moves": True},
+        {"key": {"/k0": itemgetter("id"), "/1": itemgetter("id")}},
+        {"fingerprints": True},
+        {"trust_identity": True},
+        {"algorithm": "patience"},
+    ],
+)
+def test_iter_diff_matches_diff(kwargs):
+    for seed in range(3):
+        a, b = _documents(seed)
+        ops, rops = diff(a, b, **kwargs)
+        assert list(iter_diff(a, b, **kwargs)) == ops
+        assert list(iter_diff(a, b, stream="reverse", **kwargs)) == rops
+        list_a, list_b = list(a.values()), list(b.values())
+        ops, rops = diff(list_a, list_b, **kwargs)
+        assert list(iter_diff(list_a, list_b, **kwargs)) == ops
+        assert list(iter_diff(list_a, list_b, stream="reverse", **kwargs)) == rops
+
+
+def test_iter_diff_round_trip():
+    a, b = _documents(3)
+    assert apply(a, iter_diff(a, b)) == b
+    assert apply(b, iter_diff(a, b, stream="reverse")) == a
+
+
+def test_iter_diff_leaves_and_prefix():
+    assert list(iter_diff(1, 1)) == []
+    assert list(iter_diff(1, 2, Pointer(["x"]))) == [
+        {"op": "replace", "path": Pointer(["x"]), "value": 2}
+    ]
+    assert list(iter_diff({1, 2}, {2, 3}, stream="reverse")) == diff({1, 2}, {2, 3})[1]
+
+
+def test_iter_diff_unknown_stream():
+    with pytest.raises(ValueError, match="Unknown diff stream"):
+        list(iter_diff(1, 2, stream="both"))
+
+
+def test_iter_diff_is_lazy(monkeypatch):
+    levels = []
+
+    def diff_level(input, output, ptr, ctx):
+        levels.append(ptr)
+        return diff_level.wrapped(input, output, ptr, ctx)
+
+    diff_level.wrapped = stream_module._diff_level
+    monkeypatch.setattr(stream_module, "_diff_level", diff_level)
+
+    a = {"a": {"x": [1]}, "b": {"y": [1]}}
+    b = {"a": {"x": [2]}, "b": {"y": [2]}}
+    ops = iter_diff(a, b)
+    assert levels == []
+    first = next(ops)
+    # Only the containers on the way to the first operation were diffed.
+    assert len(levels) == 4
+    assert levels[-1] == first["path"]
+    assert len(list(ops)) == 1
+    assert len(levels) == 7
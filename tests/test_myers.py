@@ -0,0 +1,70 @@
+"""The linear-space Myers search must find scripts as short as the greedy
+search's, and diff() must switch to it transparently for large edit
+distances."""
+
+import importlib
+import random
+
+from patchdiff import apply, diff
+
+edits = importlib.import_module("patchdiff.edits")
+
+
+def _replay(a, b, script):
+    """Apply an edit script to `a`, checking its cursors along the way."""
+    out = []
+    i = 0
+    for kind, x, y in script:
+        out.extend(a[i:x])
+        i = x
+        assert y == len(out)
+        if kind == "del":
+            i += 1
+        else:
+            out.append(b[y])
+    out.extend(a[i:])
+    return out
+
+
+def test_linear_script_is_a_shortest_script():
+    rng = random.Random(20261021)
+    for _ in range(2000):
+        a = [rng.randint(0, 4) for _ in range(rng.randint(1, 16))]
+        b = [rng.randint(0, 4) for _ in range(rng.randint(1, 16))]
+        greedy = edits._myers_script(a, b)
+        for equal in (None, lambda x, y: x == y):
+            script = edits._linear_myers_script(a, b, equal, len(a) + len(b))
+            assert len(script) == len(greedy)
+            assert _replay(a, b, script) == b
+
+
+def test_linear_script_gives_up_past_max_cost():
+    a = list(range(10))
+    b = list(range(10, 20))
+    script = edits._linear_myers_script(a, b, None, 8)
+    assert script == [("del", i, 0) for i in range(10)] + [
+        ("ins", 10, j) for j in range(10)
+    ]
+
+
+def test_diff_switches_to_linear_space(monkeypatch):
+    rng = random.Random(5)
+    a = [rng.randint(0, 1000) for _ in range(300)]
+    b = list(a)
+    for _ in range(60):
+        if rng.random() < 0.5:
+            del b[rng.randrange(len(b))]
+        else:
+            b.insert(rng.randrange(len(b)), rng.randint(0, 1000))
+    expected_length = len(edits._myers_script(a, b))
+
+    monkeypatch.setattr(edits, "_MAX_TRACE_COST", 8)
+    assert len(edits._myers_script(a, b)) == expected_length
+    ops, rops = diff(a, b)
+    assert apply(a, ops) == b
+    assert apply(b, rops) == a
+    # The cutoff still applies: lists with little in common become a
+    # single hunk of element-wise replaces.
+    disjoint = list(range(1000, 1300))
+    ops, _ = diff(a, disjoint)
+    assert [op["op"] for op in ops] == ["replace"] * 300
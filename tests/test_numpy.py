@@ -0,0 +1,241 @@
+"""Test diffing and patching NumPy arrays."""
+
+import json
+
+import pytest
+
+try:
+    import numpy as np
+
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
+from patchdiff import apply, diff, diff_stats, first_difference, iapply, to_json
+from patchdiff.pointer import Pointer
+
+pytestmark = pytest.mark.skipif(not NUMPY_AVAILABLE, reason="numpy not installed")
+
+
+def assert_round_trip(a, b, ops, rops):
+    patched = apply(a, ops)
+    assert patched.keys() == b.keys()
+    for key in b:
+        np.testing.assert_array_equal(patched[key], b[key])
+    restored = apply(b, rops)
+    for key in a:
+        np.testing.assert_array_equal(restored[key], a[key])
+
+
+def test_changed_elements_become_range_replaces():
+    a = {"w": np.arange(1000, dtype=float)}
+    b = {"w": a["w"].copy()}
+    b["w"][[10, 11, 12, 15, 500]] = -1
+
+    ops, rops = diff(a, b)
+
+    # 10..15 are close enough to share a range, 500 gets its own.
+    assert [op["path"] for op in ops] == [
+        Pointer(["w", "10:16"]),
+        Pointer(["w", "500:501"]),
+    ]
+    np.testing.assert_array_equal(ops[0]["value"], [-1, -1, -1, 13, 14, -1])
+    np.testing.assert_array_equal(rops[0]["value"], [10, 11, 12, 13, 14, 15])
+    # Range values are copies, not views into the (large) input.
+    assert ops[0]["value"].base is None
+    assert_round_trip(a, b, ops, rops)
+
+
+def test_forward_only_array_diff():
+    a = {"w": np.arange(100), "m": np.zeros(3)}
+    b = {"w": a["w"].copy(), "m": np.ones(3)}
+    b["w"][3] = 0
+    ops, rops = diff(a, b, reverse=False)
+    assert rops == []
+    assert [str(op["path"]) for op in sorted(ops, key=str)] == ["/m", "/w/3:4"]
+    assert diff(np.zeros(3), np.ones(3), reverse=False)[1] == []
+
+
+def test_arrays_under_the_cost_model():
+    a = {"w": np.arange(100), "d": {"v": np.arange(10)}}
+    b = {"w": a["w"].copy(), "d": {"v": np.arange(10), "new": np.zeros(50)}}
+    b["w"][:30] = -1
+    # 30 of 100 elements changed: within the default ratio, not within 0.2.
+    assert _paths(diff(a, b)[0]) == ["/d/new", "/w/0:30"]
+    assert _paths(diff(a, b, replace_ratio=0.2)[0]) == ["/d", "/w"]
+    assert _paths(diff(a, b, max_depth=1)[0]) == ["/d", "/w"]
+
+
+def _paths(ops):
+    return sorted(str(op["path"]) for op in ops)
+
+
+def test_equal_arrays():
+    a = {"w": np.array([1.0, np.nan, 3.0])}
+    assert diff(a, {"w": a["w"].copy()}) == ([], [])
+    assert diff(np.arange(0), np.arange(0)) == ([], [])
+
+
+def test_mostly_changed_array_is_replaced_wholesale():
+    a = {"w": np.zeros(100)}
+    b = {"w": np.ones(100)}
+    ops, rops = diff(a, b)
+    assert ops == [{"op": "replace", "path": Pointer(["w"]), "value": b["w"]}]
+    assert rops == [{"op": "replace", "path": Pointer(["w"]), "value": a["w"]}]
+
+
+@pytest.mark.parametrize(
+    "value",
+    [np.zeros(4, dtype=np.float32), np.zeros(5), np.zeros((2, 2)), [0.0] * 4, 0.0],
+)
+def test_other_shape_dtype_or_type_is_replaced_wholesale(value):
+    ops, _ = diff({"w": np.zeros(4)}, {"w": value})
+    assert [(op["op"], op["path"]) for op in ops] == [("replace", Pointer(["w"]))]
+
+
+def test_multidimensional_arrays_use_flat_positions():
+    a = {"w": np.zeros((100, 100))}
+    b = {"w": a["w"].copy()}
+    b["w"][1, 2] = 1
+    b["w"][50, 50] = 2
+    ops, rops = diff(a, b)
+    assert [str(op["path"]) for op in ops] == ["/w/102:103", "/w/5050:5051"]
+    assert_round_trip(a, b, ops, rops)
+
+
+def test_arrays_in_lists_and_nested_containers():
+    arrays = [np.arange(100) * i for i in range(4)]
+    changed = arrays[2].copy()
+    changed[7] = -7
+    a = {"l": [arrays[0], {"x": arrays[1]}, arrays[2]]}
+    b = {"l": [{"x": arrays[1].copy()}, changed, arrays[3]]}
+
+    ops, rops = diff(a, b)
+
+    assert ops[0] == {"op": "remove", "path": Pointer(["l", 0])}
+    assert {"op": "replace", "path": Pointer(["l", 1, "7:8"]), "value": [-7]} in ops
+    patched = apply(a, ops)
+    restored = apply(b, rops)
+    assert json.dumps(patched, default=np.ndarray.tolist) == json.dumps(
+        b, default=np.ndarray.tolist
+    )
+    assert json.dumps(restored, default=np.ndarray.tolist) == json.dumps(
+        a, default=np.ndarray.tolist
+    )
+
+
+@pytest.mark.parametrize("kwargs", [{"trust_identity": True}, {"fingerprints": True}])
+def test_arrays_with_other_equality_modes(kwargs):
+    a = {"w": np.arange(100), "l": [np.arange(10)]}
+    b = {"w": a["w"].copy(), "l": [np.arange(10)]}
+    assert first_difference(a, b, **kwargs) is None
+    b["w"][3] = 0
+    ops, rops = diff(a, b, **kwargs)
+    assert ops == [{"op": "replace", "path": Pointer(["w", "3:4"]), "value": [0]}]
+    assert_round_trip(a, b, ops, rops)
+    assert first_difference(a, b, **kwargs) == Pointer(["w"])
+
+
+def test_diff_arrays_at_the_root():
+    a = np.arange(100)
+    b = a.copy()
+    b[4] = 0
+    ops, _ = diff(a, b)
+    assert ops == [{"op": "replace", "path": Pointer(["4:5"]), "value": [0]}]
+    iapply(a, ops)
+    np.testing.assert_array_equal(a, b)
+
+
+def test_iapply_writes_ranges_in_place():
+    doc = {"w": np.zeros(6), "m": np.zeros((2, 3))}
+    w, m = doc["w"], doc["m"]
+    iapply(
+        doc,
+        [
+            {"op": "replace", "path": Pointer.from_str("/w/1:3"), "value": [1, 2]},
+            {"op": "replace", "path": Pointer.from_str("/w/5"), "value": 5},
+            {"op": "replace", "path": Pointer(["m", "2:4"]), "value": np.ones(2)},
+        ],
+    )
+    assert doc["w"] is w and doc["m"] is m
+    np.testing.assert_array_equal(w, [0, 1, 2, 0, 0, 5])
+    np.testing.assert_array_equal(m, [[0, 0, 1], [1, 0, 0]])
+    with pytest.raises(ValueError, match="NumPy array"):
+        iapply(doc, [{"op": "remove", "path": Pointer(["w", "0:1"])}])
+
+
+def test_array_patches_serialize_to_json():
+    a = {"w": np.arange(100)}
+    b = {"w": a["w"].copy()}
+    b["w"][50:52] = 0
+    ops, _ = diff(a, b)
+    ops_json = to_json(ops, default=np.ndarray.tolist)
+    assert json.loads(ops_json) == [
+        {"op": "replace", "path": "/w/50:52", "value": [0, 0]}
+    ]
+    loaded = [
+        {**op, "path": Pointer.from_str(op["path"])} for op in json.loads(ops_json)
+    ]
+    np.testing.assert_array_equal(apply(a, loaded)["w"], b["w"])
+
+
+def test_lists_holding_arrays_align_by_value():
+    a = [[np.zeros(3), 1], {"x": np.zeros(3)}, np.zeros(3), np.zeros(3)]
+    b = [[np.zeros(3), 1], [np.zeros(3)], {"x": np.zeros(3)}, np.zeros(4)]
+    ops, _ = diff(a, b)
+    assert ops == [
+        {"op": "add", "path": Pointer([1]), "value": b[1]},
+        {"op": "replace", "path": Pointer([3]), "value": b[3]},
+        {"op": "remove", "path": Pointer([4])},
+    ]
+    patched = apply(a, ops)
+    assert json.dumps(patched, default=np.ndarray.tolist) == json.dumps(
+        b, default=np.ndarray.tolist
+    )
+
+
+class Ambiguous:
+    """Like a NumPy array or a pandas frame: `==` has no truth value."""
+
+    def __eq__(self, other):
+        raise ValueError("ambiguous")
+
+    __hash__ = None
+
+
+def test_other_values_without_truth_value_for_equality():
+    a, b = Ambiguous(), Ambiguous()
+    ops, _ = diff({"x": a, "l": [a, 1]}, {"x": b, "l": [b, 1]})
+    assert sorted(ops, key=lambda op: str(op["path"])) == [
+        {"op": "replace", "path": Pointer(["l", 0]), "value": b},
+        {"op": "replace", "path": Pointer(["x"]), "value": b},
+    ]
+
+
+def test_arrays_next_to_paths_left_out():
+    a = {"d": {"x": np.array([1, 2]), "c": 1}, "l": [np.array([1]), np.array([2, 2])]}
+    b = {"d": {"x": np.array([1, 3]), "c": 2}, "l": [np.array([0]), np.array([2, 3])]}
+    ops, _ = diff(a, b, exclude=["/d/c", "/l/0"])
+    assert [op["path"] for op in ops] == [Pointer(["d", "x"]), Pointer(["l", 1])]
+
+
+def test_first_difference_in_arrays():
+    a = {"x": np.array([1, 2]), "l": [np.array([1]), np.array([2, 2])]}
+    assert first_difference(a, {**a, "x": np.array([1, 2])}) is None
+    assert first_difference(a, {**a, "x": np.array([1, 3])}) == Pointer(["x"])
+    b = {**a, "l": [np.array([1]), np.array([2, 3])]}
+    assert first_difference(a, b) == Pointer(["l", 1])
+
+
+def test_diff_stats_of_arrays():
+    a = {"x": np.arange(100), "l": [np.array([1]), np.array([2, 2])], "r": np.ones(3)}
+    b = {"x": np.arange(100), "l": [np.array([1]), np.array([2, 3])], "r": np.zeros(3)}
+    b["x"][[20, 50, 51]] = 0
+    ops, rops = diff(a, b)
+    stats, rstats = diff_stats(a, b, default=np.ndarray.tolist)
+    assert stats.ops == {"replace": len(ops)}
+    assert stats.paths == len(ops)
+    assert stats.size == len(to_json(ops, default=np.ndarray.tolist))
+    assert rstats.size == len(to_json(rops, default=np.ndarray.tolist))
+    assert diff_stats(a["x"], a["x"].copy())[0].ops == {}
+    assert diff_stats(a["r"], b["r"])[0].paths == 1
@@ -0,0 +1,95 @@
+import importlib
+import random
+from concurrent.futures import Executor, ThreadPoolExecutor
+from copy import deepcopy
+from operator import itemgetter
+
+import pytest
+
+from patchdiff import apply, diff
+
+parallel_module = importlib.import_module("patchdiff.parallel")
+
+
+def _record(rng, i):
+    return {"id": i, "tags": [rng.randint(0, 9) for _ in range(5)], "n": {"v": i}}
+
+
+def _documents(seed):
+    rng = random.Random(seed)
+    a = {f"k{i}": [_record(rng, j) for j in range(20)] for i in range(30)}
+    a["scalar"] = 1
+    a["gone"] = {"x": 1}
+    b = deepcopy(a)
+    for records in b.values():
+        if isinstance(records, list):
+            for record in rng.sample(records, 3):
+                record["tags"] = [rng.randint(0, 9) for _ in range(5)]
+                record["n"]["v"] = -1
+            records.insert(rng.randint(0, len(records)), _record(rng, 100))
+            records.append(records.pop(rng.randrange(len(records))))
+    b["scalar"] = 2
+    del b["gone"]
+    b["new"] = [1, 2]
+    return a, b
+
+
+@pytest.fixture
+def min_work(monkeypatch):
+    monkeypatch.setattr(parallel_module, "_MIN_WORK", 0)
+
+
+@pytest.mark.parametrize(
+    "kwargs",
+    [
+        {},
+        {"moves": True},
+        {"key": {"/k0": itemgetter("id"), "/1": itemgetter("id")}},
+        {"fingerprints": True},
+        {"reverse": False},
+        {"max_ops_per_node": 3, "replace_ratio": 0.5},
+    ],
+)
+def test_process_pool_matches_serial_diff(min_work, kwargs):
+    a, b = _documents(1)
+    expected = diff(a, b, **kwargs)
+    assert diff(a, b, workers=2, **kwargs) == expected
+    # A top-level list is split up by its paired elements.
+    list_a, list_b = list(a.values()), list(b.values())
+    expected = diff(list_a, list_b, **kwargs)
+    assert diff(list_a, list_b, workers=2, **kwargs) == expected
+
+
+def test_executor_matches_serial_diff(min_work):
+    a, b = _documents(2)
+    with ThreadPoolExecutor(3) as executor:
+        ops, rops = diff(a, b, workers=executor, moves=True)
+    assert (ops, rops) == diff(a, b, moves=True)
+    assert apply(a, ops) == b
+    assert apply(b, rops) == a
+
+
+class NoExecutor(Executor):
+    def submit(self, fn, /, *args, **kwargs):
+        raise AssertionError("diffed in a worker")
+
+
+def test_small_diffs_stay_in_process():
+    a, b = _documents(3)
+    assert diff(a, b, workers=NoExecutor()) == diff(a, b)
+    # Nothing to recurse into, or a single pair of children.
+    assert diff({"a": 1}, {"b": 1}, workers=NoExecutor()) == diff({"a": 1}, {"b": 1})
+    assert diff({"a": 1}, {"a": 2}, workers=NoExecutor()) == diff({"a": 1}, {"a": 2})
+    assert diff({"a": [1]}, {"a": [2]}, workers=NoExecutor()) == diff(
+        {"a": [1]}, {"a": [2]}
+    )
+
+
+def test_one_worker_stays_in_process(min_work):
+    a, b = _documents(4)
+    assert diff(a, b, workers=1) == diff(a, b)
+
+
+def test_invalid_worker_count():
+    with pytest.raises(ValueError, match="at least 1"):
+        diff({"a": 1}, {"a": 2}, workers=0)
@@ -1,3 +1,5 @@
+import pickle
+
 import pytest
 
 from patchdiff.pointer import Pointer, escape, unescape
@@ -110,3 +112,11 @@ def test_parsed_pointer_evaluates_through_lists():
 def test_parsed_pointer_evaluate_raises_on_non_numeric_list_token():
     with pytest.raises(ValueError):
         Pointer.from_str("/a/foo/b").evaluate({"a": [{"b": 1}]})
+
+
+def test_pointer_pickle():
+    ptr = Pointer(["a", 0, ("t", 1)])
+    data = pickle.dumps(ptr)
+    assert pickle.loads(data) == ptr
+    # Only the tokens are pickled, not the slot state.
+    assert b"tokens" not in data
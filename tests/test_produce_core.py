@@ -991,3 +991,57 @@ def test_reading_scalars_and_atomics_from_draft():
     result, patches, _reverse_patches = produce(base, recipe)
     assert result["n"] == 11
     assert patches == [{"op": "replace", "path": Pointer(["n"]), "value": 11}]
+
+
+def test_deep_base():
+    """Bases and values of any depth are copied, and their proxies
+    located and unwrapped, without recursion."""
+    base = leaf = {"d": {"x": 1}}
+    for _ in range(3000):
+        leaf["a"] = [{}]
+        leaf = leaf["a"][0]
+    leaf["v"] = 1
+
+    def recipe(draft):
+        node = draft
+        for _ in range(3000):
+            node = node["a"][0]
+        node["v"] = 2
+        shared = [1]
+        value = {"p": [draft["d"]], "t": (draft["d"], 1), "s": [shared, shared]}
+        for _ in range(3000):
+            value = {"a": value, "b": [0]}
+        draft["copy"] = value
+
+    result, patches, reverse = produce(base, recipe)
+
+    path = Pointer(["a", 0] * 3000 + ["v"])
+    assert patches[0] == {"op": "replace", "path": path, "value": 2}
+    assert reverse[-1] == {"op": "replace", "path": path, "value": 1}
+    assert result["a"][0]["a"][0]["a"] is not base["a"][0]["a"][0]["a"]
+    for value in result["copy"], patches[1]["value"]:
+        for _ in range(3000):
+            value = value["a"]
+        # Proxies are copied as plain data.
+        assert type(value["p"][0]) is dict
+        assert type(value["t"][0]) is dict
+        assert value == {"p": [{"x": 1}], "t": ({"x": 1}, 1), "s": [[1], [1]]}
+
+
+def test_snapshot_unwraps_deep_proxies_passed_directly():
+    """Like `test_snapshot_unwraps_proxy_passed_directly`, for proxies
+    nested too deeply to snapshot by recursion."""
+    from patchdiff.produce import PatchRecorder, _snapshot
+
+    recorder = PatchRecorder()
+    proxy = ListProxy([1], recorder)
+    value = {"p": proxy}
+    for _ in range(3000):
+        value = [{"a": value}]
+
+    snap = _snapshot(value)
+
+    for _ in range(3000):
+        snap = snap[0]["a"]
+    assert type(snap["p"]) is list
+    assert snap == {"p": [1]}
@@ -99,6 +99,12 @@ def test_diff_apply_round_trip(pair):
     assert apply(b, reverse_ops) == a
 
 
+@given(pair=diffable_pairs)
+def test_forward_only_diff_matches_forward_ops(pair):
+    a, b = pair
+    assert diff(a, b, reverse=False) == (diff(a, b)[0], [])
+
+
 @given(a=diffables)
 def test_diff_of_equal_objects_is_empty(a):
     assert diff(a, deepcopy(a)) == ([], [])
@@ -0,0 +1,193 @@
+import importlib
+import json
+from collections import OrderedDict, defaultdict
+from dataclasses import dataclass, field
+from types import MappingProxyType
+from typing import NamedTuple
+
+import pytest
+
+from patchdiff import apply, diff, iapply, iter_diff, produce, to_json
+from patchdiff.pointer import Pointer
+from patchdiff.registry import TypeAdapter, register, snapshot
+
+
+@dataclass
+class Point:
+    x: int
+    y: int
+    tags: list = field(default_factory=list)
+
+
+@dataclass(frozen=True)
+class Frozen:
+    name: str
+    items: tuple
+
+
+class Pair(NamedTuple):
+    left: int
+    right: dict
+
+
+class Row:
+    def __init__(self, *cells):
+        self.cells = list(cells)
+
+    def __eq__(self, other):
+        return other.__class__ is Row and self.cells == other.cells
+
+
+def _set_cells(row, cells):
+    row.cells = cells
+    return row
+
+
+@pytest.fixture
+def row_adapter():
+    register(Row, TypeAdapter("list", view=lambda row: row.cells, build=_set_cells))
+    yield
+    register(Row, None)
+
+
+def test_dataclasses_are_diffed_by_field():
+    a = {"p": Point(1, 2, ["a"])}
+    b = {"p": Point(1, 3, ["a", "b"])}
+    ops, rops = diff(a, b)
+    assert sorted(ops, key=lambda op: str(op["path"])) == [
+        {"op": "add", "path": Pointer(["p", "tags", "-"]), "value": "b"},
+        {"op": "replace", "path": Pointer(["p", "y"]), "value": 3},
+    ]
+    # Mutable dataclasses are patched in place.
+    point = a["p"]
+    assert iapply(a, ops) == b
+    assert a["p"] is point
+    assert iapply(b, rops) == {"p": Point(1, 2, ["a"])}
+    assert list(iter_diff(a, {"p": Point(0, 3, ["a", "b"])})) == [
+        {"op": "replace", "path": Pointer(["p", "x"]), "value": 0}
+    ]
+
+
+def test_immutable_values_are_rebuilt_in_their_parent():
+    a = {"list": [Frozen("a", (1, 2)), Pair(1, {"k": [1]})]}
+    b = {"list": [Frozen("b", (1, 2)), Pair(1, {"k": [2]})]}
+    ops, rops = diff(a, b)
+    assert [str(op["path"]) for op in ops] == ["/list/0/name", "/list/1/right/k/0"]
+    assert apply(a, ops) == b
+    assert apply(b, rops) == a
+    # A rebuilt root is returned.
+    ops, rops = diff(Pair(1, {}), Pair(2, {}))
+    assert ops == [{"op": "replace", "path": Pointer(["left"]), "value": 2}]
+    assert iapply(Pair(1, {}), ops) == Pair(2, {})
+
+
+def test_different_types_are_replaced():
+    ops, _ = diff([Point(1, 2)], [Frozen("a", ())])
+    assert ops == [{"op": "replace", "path": Pointer([0]), "value": Frozen("a", ())}]
+    assert diff((1, 2), Pair(1, {}))[0] == [
+        {"op": "replace", "path": Pointer([]), "value": Pair(1, {})}
+    ]
+
+
+def test_dict_subclasses():
+    a = OrderedDict(a=1, b=[1])
+    b = OrderedDict(a=1, b=[2], c=3)
+    ops, rops = diff(a, b)
+    assert apply(a, ops) == b
+    assert apply(b, rops) == a
+    a = {"d": defaultdict(list, a=[1])}
+    b = {"d": defaultdict(list, a=[1, 2], b=[])}
+    ops, rops = diff(a, b)
+    patched = apply(a, ops)
+    assert patched == b
+    assert patched["d"]["new"] == []
+    assert apply(b, rops) == a
+
+
+def test_mapping_proxies():
+    a = {"m": MappingProxyType({"a": 1, "b": [1]})}
+    b = {"m": MappingProxyType({"a": 2, "b": [1, 2]})}
+    ops, _ = diff(a, b)
+    assert sorted(str(op["path"]) for op in ops) == ["/m/a", "/m/b/-"]
+    proxy = a["m"]
+    iapply(a, ops)
+    assert a["m"] is not proxy
+    assert dict(a["m"]) == dict(b["m"])
+    # Patch values are copied with the type's snapshot function.
+    source = {"a": MappingProxyType({"x": [1]})}
+    target = iapply({}, diff({}, source)[0])
+    assert target == source
+    assert target["a"]["x"] is not source["a"]["x"]
+
+
+def test_apply_copies_mapping_proxies():
+    shared = [1]
+    before = {"m": MappingProxyType({"a": 1, "b": [1]}), "l": [shared, (shared,)]}
+    after = {"m": MappingProxyType({"a": 2, "b": [1]}), "l": [shared, (shared,)]}
+    patched = apply(before, diff(before, after)[0])
+    assert patched == after
+    assert before["m"]["a"] == 1
+    assert patched["m"]["b"] is not before["m"]["b"]
+    # Values shared within the object stay shared in the copy.
+    copied = patched["l"][0]
+    assert copied is not shared
+    assert patched["l"][1][0] is copied
+    atomic = ("a", 1)
+    assert snapshot([atomic])[0] is atomic
+
+
+def test_produce_snapshots_registered_types():
+    proxy = MappingProxyType({"x": [1]})
+
+    def recipe(draft):
+        draft["m"] = proxy
+
+    result, patches, _ = produce({}, recipe)
+    assert patches[0]["value"] == proxy
+    assert patches[0]["value"]["x"] is not proxy["x"]
+    assert result["m"] is proxy
+
+
+def test_registered_types(row_adapter):
+    a = {"rows": [Row(1, 2, 3)]}
+    b = {"rows": [Row(1, 5, 6)]}
+    ops, rops = diff(a, b)
+    assert [str(op["path"]) for op in ops] == ["/rows/0/1", "/rows/0/2"]
+    assert apply(a, ops) == b
+    assert apply(b, rops) == a
+    # Parsed pointers carry string tokens.
+    reloaded = [
+        {**op, "path": Pointer.from_str(op["path"])} for op in json.loads(to_json(ops))
+    ]
+    assert apply(a, reloaded) == b
+    ops, _ = diff(Row(1), Row(1, 2))
+    assert ops == [{"op": "add", "path": Pointer(["-"]), "value": 2}]
+    assert iapply(Row(1), ops) == Row(1, 2)
+
+
+def test_unregistering(row_adapter):
+    register(Row, None)
+    ops, _ = diff([Row(1)], [Row(2)])
+    assert ops == [{"op": "replace", "path": Pointer([0]), "value": Row(2)}]
+
+
+def test_resolved_classes_are_bounded(monkeypatch, row_adapter):
+    registry = importlib.import_module("patchdiff.registry")
+    monkeypatch.setattr(registry, "_MAX_RESOLVED", 2)
+    adapters = registry._adapters
+    for _ in range(10):
+        point = dataclass(type("Point", (), {"__annotations__": {"x": int}}))
+        assert diff(point(1), point(2))[0] == [
+            {"op": "replace", "path": Pointer(["x"]), "value": 2}
+        ]
+        assert len(adapters) <= len(adapters.registered) + 2
+    # Registered adapters outlive the resolved ones.
+    assert adapters[Row] is adapters.registered[Row]
+    assert diff(Row(1), Row(2))[0] == [
+        {"op": "replace", "path": Pointer([0]), "value": 2}
+    ]
+
+
+def test_invalid_kind():
+    with pytest.raises(ValueError, match="kind"):
+        TypeAdapter("tuple")  # type: ignore[arg-type]
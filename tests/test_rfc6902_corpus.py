@@ -9,7 +9,7 @@ Patchdiff deliberately implements a subset-plus-extensions of RFC 6902
 that subset are skipped with an explicit reason rather than silently
 dropped:
 
-* ``move``, ``copy`` and ``test`` operations are not implemented.
+* ``copy`` and ``test`` operations are not implemented.
 * Operations on the document root (path ``""``) are not supported;
   patches always address a location *inside* a container.
 * Invalid-patch cases (the corpus' ``error`` records) are skipped
@@ -32,7 +32,7 @@ from patchdiff.pointer import Pointer
 
 CORPUS_DIR = Path(__file__).parent / "rfc6902"
 
-SUPPORTED_OPS = {"add", "remove", "replace"}
+SUPPORTED_OPS = {"add", "remove", "replace", "move"}
 
 
 def corpus_cases():
@@ -63,6 +63,8 @@ def skip_reason(case):
 
 def to_patchdiff_op(op):
     converted = {"op": op["op"], "path": Pointer.from_str(op["path"])}
+    if "from" in op:
+        converted["from"] = Pointer.from_str(op["from"])
     if "value" in op:
         converted["value"] = op["value"]
     return converted
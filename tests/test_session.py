@@ -0,0 +1,120 @@
+import random
+from copy import deepcopy
+from itertools import pairwise
+from types import MappingProxyType
+from typing import NamedTuple
+
+from patchdiff import DiffSession, apply, diff, produce
+
+
+def _versions(seed, count):
+    rng = random.Random(seed)
+    state = {"items": [{"id": i, "tags": [i, i + 1]} for i in range(50)], "n": 0}
+    versions = [state]
+    for _ in range(count):
+
+        def recipe(draft):
+            for _ in range(rng.randint(0, 3)):
+                item = draft["items"][rng.randrange(len(draft["items"]))]
+                item["tags"].append(rng.randint(0, 9))
+            if rng.random() < 0.3:
+                draft["items"].insert(rng.randint(0, 10), {"id": -1, "tags": []})
+            draft["n"] += 1
+
+        state = produce(state, recipe)[0]
+        versions.append(state)
+    return versions
+
+
+def test_session_matches_diff():
+    versions = _versions(1, 20)
+    session = DiffSession(versions[0])
+    for previous, state in pairwise(versions):
+        assert session.diff(state) == diff(previous, state)
+        assert session.state is state
+
+
+def test_session_passes_options_on():
+    versions = _versions(2, 5)
+    session = DiffSession(versions[0], reverse=False, moves=True)
+    for previous, state in pairwise(versions):
+        ops, rops = session.diff(state)
+        assert (ops, rops) == diff(previous, state, reverse=False, moves=True)
+        assert rops == []
+
+
+def test_copy_session_follows_in_place_changes():
+    rng = random.Random(3)
+    state = {"items": [{"id": i, "tags": [i]} for i in range(20)], "s": {1, 2}}
+    session = DiffSession(state, copy=True)
+    assert session.state == state
+    assert session.state is not state
+    for i in range(30):
+        previous = deepcopy(state)
+        item = state["items"][rng.randrange(len(state["items"]))]
+        item["tags"].append(i)
+        if i % 3 == 0:
+            state["items"].insert(rng.randint(0, 5), {"id": -i, "tags": []})
+        if i % 4 == 0:
+            state["s"].add(i)
+        ops, rops = session.diff(state)
+        assert (ops, rops) == diff(previous, state)
+        assert apply(previous, ops) == state
+        assert session.state == state
+    # The copy shares nothing with the state.
+    state["items"][0]["tags"].append("later")
+    assert "later" not in session.state["items"][0]["tags"]
+
+
+def test_copy_session_with_replaced_root():
+    state = [1, 2]
+    session = DiffSession(state, copy=True)
+    ops, _ = session.diff({"a": [1]})
+    assert [op["op"] for op in ops] == ["replace"]
+    assert session.state == {"a": [1]}
+    new = {"a": [1, 2]}
+    assert session.diff(new)[0] == diff({"a": [1]}, new)[0]
+    assert session.state == new
+    assert session.state["a"] is not new["a"]
+
+
+def test_copy_session_with_immutable_roots():
+    class Point(NamedTuple):
+        x: int
+        tags: tuple
+
+    session = DiffSession(Point(1, (1,)), copy=True)
+    assert session.diff(Point(2, (1,)))[0] == diff(Point(1, (1,)), Point(2, (1,)))[0]
+    assert session.state == Point(2, (1,))
+    session = DiffSession((1, [2]), copy=True, immutables=True)
+    ops, _ = session.diff((3, [2, 4]))
+    assert [str(op["path"]) for op in ops] == ["/0", "/1/-"]
+    assert session.state == (3, [2, 4])
+
+
+def test_copy_session_with_mapping_proxies():
+    state = {"m": MappingProxyType({"a": [1]})}
+    session = DiffSession(state, copy=True)
+    assert session.state == state
+    assert session.state["m"]["a"] is not state["m"]["a"]
+    new = {"m": MappingProxyType({"a": [1, 2]})}
+    session.diff(new)
+    assert session.state == new
+
+
+def test_copy_session_with_deep_documents():
+    depth = 3000
+    a: dict = {"v": 0}
+    for _ in range(depth):
+        a = {"c": a}
+    session = DiffSession(a, copy=True)
+    leaf = a
+    for _ in range(depth):
+        leaf = leaf["c"]
+    leaf["v"] = 1
+    ops, rops = session.diff(a)
+    assert len(ops) == 1
+    assert ops[0]["value"] == 1
+    assert len(ops[0]["path"].tokens) == depth + 1
+    assert rops[0]["value"] == 0
+    assert session.diff(a) == ([], [])
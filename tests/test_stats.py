@@ -0,0 +1,258 @@
+"""Test diff_stats, which counts and measures the operations of a diff
+without building them."""
+
+import random
+from collections import Counter, UserDict, UserList
+from dataclasses import dataclass
+from datetime import date
+from typing import NamedTuple
+
+from hypothesis import given
+from hypothesis import strategies as st
+
+from patchdiff import diff, diff_stats, to_json
+from patchdiff.pointer import Pointer
+from patchdiff.registry import TypeAdapter, register
+from patchdiff.stats import PatchStats
+
+
+def _stats(ops, **kwargs):
+    return PatchStats(
+        dict(Counter(op["op"] for op in ops)),
+        len({str(op["path"]) for op in ops}),
+        len(to_json(ops, **kwargs)),
+    )
+
+
+def assert_stats(a, b, ptr=None, default=None, **kwargs):
+    """diff_stats agrees with the operations of diff, as JSON."""
+    ops, rops = diff(a, b, ptr, **kwargs)
+    json_kwargs = {"default": str if default is None else default}
+    expected = _stats(ops, **json_kwargs), _stats(rops, **json_kwargs)
+    assert diff_stats(a, b, ptr, default=default, **kwargs) == expected
+    return expected
+
+
+def test_counts():
+    a = {"a": 1, "b": [1, 2, 3], "c": {"d": "x"}}
+    b = {"a": 2, "b": [1, 3, 4, 5], "e": None}
+    stats, rstats = assert_stats(a, b)
+    assert stats.ops == {"add": 3, "remove": 2, "replace": 1}
+    assert rstats.ops == {"add": 2, "remove": 3, "replace": 1}
+    assert stats.paths == 5  # Two adds go to /b/-.
+    nothing = PatchStats({}, 0, 2), PatchStats({}, 0, 2)
+    assert diff_stats(a, a) == nothing
+    assert diff_stats(1, 1.0) == nothing
+    assert diff_stats((1, 2), tuple(range(1, 3))) == nothing
+    assert diff_stats([1.0], [1.0000001], rel_tol=1e-6) == nothing
+    assert diff_stats(1, 2) == (
+        PatchStats(
+            {"replace": 1}, 1, len('[{"op": "replace", "path": "/", "value": 2}]')
+        ),
+        PatchStats(
+            {"replace": 1}, 1, len('[{"op": "replace", "path": "/", "value": 1}]')
+        ),
+    )
+
+
+def test_paths_and_values_that_escape():
+    assert_stats({"a/b": 1, "c~": [1], 'q"': "é"}, {"a/b": 2, "c~": [], 'q"': "\n"})
+    assert_stats({1: "a", "1": "c"}, {2: "a", "1": "d"})
+    nan = float("nan")
+    assert_stats([1.5, 0.1], [nan, float("inf"), float("-inf"), 1e300, -0.0])
+    assert_stats("a", "b", Pointer(["doc", "x/y"]))
+
+
+def test_sets():
+    assert_stats({"s": {1, 2, "1"}}, {"s": {2, 3, 4}})
+    assert_stats({"s": {1, 2}}, {"s": {1, 2, 3}})
+    assert_stats({"s": {1, 2}}, {"s": {2}})
+    assert_stats({"s": {1, 2}}, {"s": {1, 2}, "t": set()})
+    assert_stats({"s": frozenset({1})}, {"s": frozenset({2})}, immutables=True)
+
+
+def test_lists():
+    rng = random.Random(24)
+    for _ in range(100):
+        a = [rng.randint(0, 5) for _ in range(rng.randint(0, 10))]
+        b = [rng.randint(0, 5) for _ in range(rng.randint(0, 10))]
+        assert_stats(a, b)
+        assert_stats(a, b, algorithm="patience")
+    assert_stats([(1, 2), [1, 2]], [(1, 3), [1, 3]], immutables=True)
+    records = [{"id": i, "tags": [str(i)], "n": i} for i in range(6)]
+    changed = [
+        {"id": 5, "tags": ["5"], "n": 5},
+        {"id": 1, "tags": ["1"], "n": 10},
+        {"id": 0, "tags": ["x"], "n": 0},
+        {"id": 9, "tags": [], "n": 9},
+        {"id": 2, "tags": ["2"], "n": 2},
+    ]
+    assert_stats(records, changed)
+    assert_stats(records, changed, pairing="similarity")
+    assert_stats(records, changed, key=lambda record: record["id"])
+    # Equal records that are kept are not replaced.
+    copies = [dict(record) for record in records]
+    assert_stats(
+        records[:3],
+        [changed[3], copies[0], changed[1], copies[2]],
+        key=lambda record: record["id"],
+    )
+    assert_stats(
+        {"r": records}, {"r": changed}, key={"/r": lambda record: record["id"]}
+    )
+    assert_stats(
+        {"r": [records]}, {"r": [changed]}, key={"/r/0": lambda record: record["id"]}
+    )
+
+
+def test_similarity_pairing():
+    # The changed elements of a hunk are paired by similarity, not by
+    # position, which makes other operations.
+    a = [{"name": "a", "x": 1, "y": 1, "z": 1}, {"name": "b", "x": 2, "y": 2, "z": 2}]
+    b = [{"name": "b", "x": 2, "y": 2, "z": 3}, {"name": "q"}]
+    stats, rstats = assert_stats(a, b, pairing="similarity")
+    assert stats.ops == {"add": 1, "remove": 1, "replace": 1}
+    assert rstats.ops == {"add": 1, "remove": 1, "replace": 1}
+    assert assert_stats(a, b)[0].ops == {"remove": 3, "replace": 5}
+    assert_stats({"l": a, "m": [a]}, {"l": b, "m": [b, 1]}, pairing="similarity")
+
+
+def test_options_that_build_the_operations():
+    a = {"l": list(range(10)), "s": "x" * 50, "d": {"k": {"v": [1, 2]}}, "t": 1}
+    b = {"l": [9, *range(9)], "s": "x" * 49 + "y", "d": {"k": {"v": [2]}}, "t": 2}
+    assert_stats(a, b, moves=True)
+    assert_stats(a, b, splice_strings=10)
+    assert_stats(a, b, max_depth=2)
+    assert_stats(a, b, max_ops_per_node=1)
+    assert_stats(a, b, replace_ratio=0.1)
+    assert_stats(a, b, include=["/d"])
+    assert_stats(a, b, exclude=["/l", "/d/k/v/0"])
+    stats, rstats = assert_stats(a, b, reverse=False)
+    assert stats.ops and rstats == PatchStats({}, 0, 2)
+    assert assert_stats(a, b, reverse=False, moves=True)[1] == rstats
+
+
+def test_tolerances():
+    a = {"t": 20.0, "readings": [1.0, 2.0, 3.0], "name": "a"}
+    b = {"t": 20.0000001, "readings": [1.0000001, 7.0, 3.0], "name": "A"}
+    stats, _ = assert_stats(a, b, rel_tol=1e-6)
+    assert stats.ops == {"replace": 2}
+    stats, _ = assert_stats(a, b, rel_tol=1e-6, eq=lambda x, y: x == y or x == "a")
+    assert stats.ops == {"replace": 1}
+    shared = [1.0]
+    assert_stats({"s": shared, "c": [1]}, {"s": shared, "c": [2]}, trust_identity=True)
+    assert_stats({"a": [1, [2]]}, {"a": [1, [3]]}, fingerprints=True)
+
+
+@dataclass
+class Reading:
+    value: float
+    tags: list
+
+
+class Span(NamedTuple):
+    start: int
+    end: int
+
+
+class Row:
+    def __init__(self, cells):
+        self.cells = cells
+
+    def __eq__(self, other):
+        return other.__class__ is Row and self.cells == other.cells
+
+    def __str__(self):
+        return f"Row({self.cells})"
+
+
+class Tags(set):
+    pass
+
+
+def test_registered_and_duck_typed_containers():
+    a = [Reading(1.0, ["a"]), Span(1, 2), UserList([1]), UserDict(a=1)]
+    b = [Reading(2.0, ["b", "c"]), Span(1, 3), UserList([2, 3]), UserDict(b=1)]
+    assert_stats(a, b)
+    register(Row, TypeAdapter("list", view=lambda row: row.cells))
+    try:
+        assert_stats([Row([1, 2])], [Row([1, 3, 4])])
+    finally:
+        register(Row, None)
+    register(Tags, TypeAdapter("set", build=lambda value, items: Tags(items)))
+    try:
+        assert_stats({"t": Tags({1})}, {"t": Tags({2})})
+    finally:
+        register(Tags, None)
+    assert_stats({"t": Tags({1})}, {"t": Tags({2})})
+    # Other values are replaced whole, and measured as JSON measures them.
+    assert_stats({"d": date(2020, 1, 1)}, {"d": date(2021, 1, 1)})
+    stats, _ = assert_stats(
+        {"d": date(2020, 1, 1)}, {"d": date(2021, 1, 1)}, default=date.isoformat
+    )
+    assert stats.size == len('[{"op": "replace", "path": "/d", "value": "2021-01-01"}]')
+    # Values JSON can't encode, where `to_json` fails, are measured by
+    # their str() as well.
+    stats, _ = diff_stats({"r": 1}, {"r": {(1, 2): 3}})
+    assert stats.size == len(
+        '[{"op": "replace", "path": "/r", "value": "{(1, 2): 3}"}]'
+    )
+    cycle = []
+    cycle.append(cycle)
+    stats, _ = diff_stats({"r": 1}, {"r": cycle})
+    assert stats.size == len('[{"op": "replace", "path": "/r", "value": "[[...]]"}]')
+
+
+class Ambiguous:
+    """Has no truth value for `==`, like a NumPy array."""
+
+    def __eq__(self, other):
+        raise ValueError("ambiguous")
+
+    __hash__ = None
+
+    def __str__(self):
+        return "ambiguous"
+
+
+def test_values_without_truth_value():
+    a, b = Ambiguous(), Ambiguous()
+    assert_stats({"x": a, "l": [a, 1]}, {"x": b, "l": [b, 1, 2]})
+    assert_stats({"x": [a]}, {"x": [a, 2]}, key=id)
+
+
+def test_deep_documents():
+    a = b = {"x": 1, "y": [1, 2]}
+    for _ in range(600):
+        a = {"a": [a], "b": 1}
+        b = {"a": [b], "b": 1}
+    c = {"x": 2, "y": [1, 3, 4]}
+    for _ in range(600):
+        c = {"a": [c], "b": 1}
+    assert_stats(a, c)
+    assert_stats(a, b)
+    assert_stats(a, c, Pointer(["doc", "a/b"]))
+
+
+scalars = (
+    st.none()
+    | st.booleans()
+    | st.integers(-3, 3)
+    | st.floats(allow_nan=False, width=16)
+    | st.text(max_size=2)
+)
+documents = st.recursive(
+    scalars,
+    lambda children: (
+        st.lists(children, max_size=4)
+        | st.dictionaries(st.sampled_from(["a", "b", "c/", "~"]), children, max_size=3)
+        | st.frozensets(st.integers(0, 3), max_size=3).map(set)
+    ),
+    max_leaves=12,
+)
+
+
+@given(documents, documents)
+def test_stats_agree_with_diff(a, b):
+    assert_stats(a, b)
+    assert_stats({"doc": a}, {"doc": b}, pairing="similarity")